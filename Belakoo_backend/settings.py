@@ -12,10 +12,10 @@ https://docs.djangoproject.com/en/5.1/ref/settings/
 
 import dj_database_url
 import os
+import tempfile
 from pathlib import Path
 from datetime import timedelta
 from dotenv import load_dotenv
-import json
 
 load_dotenv()
 
@@ -100,10 +100,30 @@ DATABASES = {
         },
     }
 }
+# Curriculum read payloads are cached per node and invalidated by signals
+# (content_management/signals.py). The file backend is shared by every
+# gunicorn worker on a host; locmem is only safe with a single process.
+CACHES = {
+    'default': {
+        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+    },
+    'curriculum': {
+        'BACKEND': os.getenv('CURRICULUM_CACHE_BACKEND', 'django.core.cache.backends.filebased.FileBasedCache'),
+        'LOCATION': os.getenv('CURRICULUM_CACHE_LOCATION', os.path.join(tempfile.gettempdir(), 'belakoo_curriculum_cache')),
+        'OPTIONS': {
+            'MAX_ENTRIES': 10000,
+        },
+    },
+}
+
 REST_FRAMEWORK = {
     'DEFAULT_AUTHENTICATION_CLASSES': (
         'rest_framework_simplejwt.authentication.JWTAuthentication',
     ),
+    'DEFAULT_RENDERER_CLASSES': (
+        'utils.renderers.ORJSONRenderer',
+        'rest_framework.renderers.BrowsableAPIRenderer',
+    ),
 }
 
 SIMPLE_JWT = {
@@ -112,11 +132,18 @@ SIMPLE_JWT = {
     'USER_ID_CLAIM': 'user_id',
 }
 
-# Load Firebase Admin SDK credentials from the secret file in the root directory
-FIREBASE_ADMIN_CREDENTIALS_PATH = os.path.join(os.path.dirname(__file__), '..', 'firebase-admin-sdk.json')
+# Firebase Admin SDK credentials, by default the secret file in the root
+# directory. Only read when the first push notification is sent.
+FIREBASE_ADMIN_CREDENTIALS_PATH = os.getenv(
+    'FIREBASE_ADMIN_CREDENTIALS_PATH', os.path.join(os.path.dirname(__file__), '..', 'firebase-admin-sdk.json')
+)
+
+# Dotted path of the class that delivers push notification batches
+PUSH_NOTIFICATION_TRANSPORT = os.getenv('PUSH_NOTIFICATION_TRANSPORT', 'utils.notifications.FirebaseTransport')
 
-with open(FIREBASE_ADMIN_CREDENTIALS_PATH) as f:
-    FIREBASE_ADMIN_CREDENTIALS = json.load(f)
+# Seconds over which lesson completions are coalesced into one digest
+# notification per admin; 0 sends a notification per completion
+NOTIFICATION_DIGEST_WINDOW = int(os.getenv('NOTIFICATION_DIGEST_WINDOW', '0'))
 
 # Password validation
 # https://docs.djangoproject.com/en/5.1/ref/settings/#auth-password-validators
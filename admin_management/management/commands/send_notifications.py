@@ -0,0 +1,25 @@
+import time
+from django.core.management.base import BaseCommand
+from admin_management.outbox import OUTBOX_BATCH_SIZE, process_outbox
+from utils.notifications import deliver_notifications
+
+
+class Command(BaseCommand):
+    help = 'Delivers pending admin push notifications from the outbox'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=OUTBOX_BATCH_SIZE)
+        parser.add_argument('--interval', type=float, default=5.0, help='Seconds to wait when the outbox is empty')
+        parser.add_argument('--once', action='store_true', help='Drain the due notifications and exit')
+
+    def handle(self, *args, **options):
+        while True:
+            results = process_outbox(deliver_notifications, batch_size=options['batch_size'])
+            if any(results.values()):
+                self.stdout.write(
+                    f"Sent {results['sent']}, retrying {results['retried']}, dead-lettered {results['dead']}"
+                )
+            if sum(results.values()) < options['batch_size']:
+                if options['once']:
+                    return
+                time.sleep(options['interval'])
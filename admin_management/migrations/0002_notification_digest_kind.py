@@ -0,0 +1,18 @@
+# Generated by Django 5.1.1 on 2026-10-18 11:28
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('admin_management', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='notification',
+            name='kind',
+            field=models.CharField(choices=[('lesson_completion', 'Lesson completion'), ('lesson_digest', 'Lesson completion digest')], max_length=50),
+        ),
+    ]
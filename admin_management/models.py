@@ -1,3 +1,40 @@
 from django.db import models
+from django.utils import timezone
+import uuid
 
-# Create your models here.
+
+class Notification(models.Model):
+    """Outbox row for a push notification to the admins.
+
+    Rows are written in the same transaction as the change they announce and
+    delivered later by the send_notifications command.
+    """
+    class Kind(models.TextChoices):
+        LESSON_COMPLETION = 'lesson_completion', 'Lesson completion'
+        LESSON_DIGEST = 'lesson_digest', 'Lesson completion digest'
+
+    class Status(models.TextChoices):
+        PENDING = 'PENDING', 'Pending'
+        SENT = 'SENT', 'Sent'
+        DEAD = 'DEAD', 'Dead'
+
+    id = models.UUIDField(primary_key=True, default=uuid.uuid4, editable=False)
+    kind = models.CharField(max_length=50, choices=Kind.choices)
+    payload = models.JSONField(default=dict)
+    status = models.CharField(max_length=10, choices=Status.choices, default=Status.PENDING)
+    attempts = models.IntegerField(default=0)
+    available_at = models.DateTimeField(default=timezone.now)
+    last_error = models.TextField(blank=True, default='')
+    created_at = models.DateTimeField(auto_now_add=True)
+    sent_at = models.DateTimeField(null=True, blank=True)
+
+    class Meta:
+        indexes = [
+            models.Index(
+                fields=['available_at'], name='notification_pending_idx',
+                condition=models.Q(status='PENDING'),
+            ),
+        ]
+
+    def __str__(self):
+        return f'{self.kind} ({self.status})'
@@ -0,0 +1,81 @@
+from collections import defaultdict
+from datetime import timedelta
+from django.db import transaction
+from django.utils import timezone
+from .models import Notification
+
+OUTBOX_BATCH_SIZE = 100
+MAX_ATTEMPTS = 8
+BACKOFF_BASE = timedelta(seconds=30)
+BACKOFF_MAX = timedelta(hours=1)
+# How long a claimed batch is hidden from other workers while it is delivered
+CLAIM_LEASE = timedelta(minutes=5)
+# Due rows of these kinds are handed to the deliverer together.
+COALESCED_KINDS = (Notification.Kind.LESSON_DIGEST,)
+
+
+def retry_delay(attempts):
+    """Exponential backoff after the ``attempts``-th failed delivery."""
+    return min(BACKOFF_BASE * 2 ** (attempts - 1), BACKOFF_MAX)
+
+
+def claim_due(batch_size, now):
+    """Lease up to ``batch_size`` due notifications to this worker, plus
+    every due row of a COALESCED_KIND so those go out as one group.
+
+    The rows stay PENDING but are pushed CLAIM_LEASE into the future, so
+    other workers skip them while they are being delivered, and they come
+    due again if this worker dies before recording the outcome.
+    """
+    with transaction.atomic():
+        due = Notification.objects.select_for_update(skip_locked=True).filter(
+            status=Notification.Status.PENDING, available_at__lte=now
+        )
+        batch = list(due.exclude(kind__in=COALESCED_KINDS).order_by('available_at')[:batch_size])
+        batch += due.filter(kind__in=COALESCED_KINDS).order_by('available_at')
+        Notification.objects.filter(id__in=[notification.id for notification in batch]).update(
+            available_at=now + CLAIM_LEASE
+        )
+    return batch
+
+
+def process_outbox(deliver, batch_size=OUTBOX_BATCH_SIZE, now=None):
+    """Deliver one batch of due notifications with ``deliver(notifications)``.
+
+    Rows of a COALESCED_KIND are delivered as one group, any other row on its
+    own. A delivery that raises is retried with backoff, and given up on
+    (status DEAD) after MAX_ATTEMPTS. The batch is claimed with a lease (see
+    claim_due) and delivered outside any transaction; each group's outcome
+    is saved as soon as it is known, so a crash part way through does not
+    resend the groups already delivered. Returns the number of
+    notifications sent, retried and dead-lettered.
+    """
+    now = now or timezone.now()
+    results = {'sent': 0, 'retried': 0, 'dead': 0}
+    groups = defaultdict(list)
+    for notification in claim_due(batch_size, now):
+        groups[notification.kind if notification.kind in COALESCED_KINDS else notification.id].append(notification)
+    for group in groups.values():
+        try:
+            deliver(group)
+        except Exception as e:
+            error = str(e)
+        else:
+            error = None
+        for notification in group:
+            notification.attempts += 1
+            if error is None:
+                notification.status = Notification.Status.SENT
+                notification.sent_at = timezone.now()
+                results['sent'] += 1
+                continue
+            notification.last_error = error
+            if notification.attempts >= MAX_ATTEMPTS:
+                notification.status = Notification.Status.DEAD
+                results['dead'] += 1
+            else:
+                notification.available_at = now + retry_delay(notification.attempts)
+                results['retried'] += 1
+        with transaction.atomic():
+            Notification.objects.bulk_update(group, ['status', 'attempts', 'available_at', 'last_error', 'sent_at'])
+    return results
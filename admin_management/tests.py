@@ -1,3 +1,523 @@
-from django.test import TestCase
+import importlib
+import json
+from datetime import timedelta
+from io import StringIO
+from unittest import mock
+from django.apps import apps as django_apps
+from django.core.management import call_command
+from django.db import connection
+from django.test import TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.utils import timezone
+from rest_framework.test import APIClient
+from user_management.models import User
+from content_management.models import Campus, Grade, Subject, Proficiency, Lesson
+from utils.fcm_testing import FakeFCMServer
+from utils.lazy import lazy_client
+from utils.notifications import (
+    DeliveryError, FirebaseTransport, TokenResult, dead_tokens, deliver_notifications, prune_dead_tokens,
+    send_lesson_completion, send_multicast,
+)
+from .models import Notification
+from .outbox import CLAIM_LEASE, MAX_ATTEMPTS, process_outbox
+from .views import stream_json_array
 
-# Create your tests here.
+
+@override_settings(CACHES={
+    'default': {'BACKEND': 'django.core.cache.backends.locmem.LocMemCache'},
+    'curriculum': {'BACKEND': 'django.core.cache.backends.locmem.LocMemCache', 'LOCATION': 'curriculum-tests'},
+})
+class AdminTestCase(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.admin = User.objects.create_user(
+            email='admin@belakoo.com', password='pass', name='Admin', role=User.Role.ADMIN
+        )
+        cls.volunteer = User.objects.create_user(email='volunteer@belakoo.com', password='pass', name='Volunteer')
+        cls.campus = Campus.objects.create(campus_code='c1', name='Campus 1', description='First campus')
+        cls.other_campus = Campus.objects.create(campus_code='c2', name='Campus 2', description='Second campus')
+        cls.grade = Grade.objects.create(grade_code='K1', name='K1', campus=cls.campus)
+        cls.other_grade = Grade.objects.create(grade_code='K1', name='K1', campus=cls.other_campus)
+        cls.subject = Subject.objects.create(
+            subject_code='LI', name='Learning and Innovation', icon='https://example.com/icon.png',
+            grade=cls.grade, colorcode='#00FF00'
+        )
+        cls.other_subject = Subject.objects.create(
+            subject_code='M', name='Maths', icon='https://example.com/icon.png',
+            grade=cls.other_grade, colorcode='#0000FF'
+        )
+        cls.proficiency = Proficiency.objects.create(proficiency_code='P1', name='P1', subject=cls.subject)
+        cls.other_proficiency = Proficiency.objects.create(proficiency_code='P1', name='P1', subject=cls.other_subject)
+        for n in range(7):
+            Lesson.objects.create(
+                lesson_code=f'LI.K1.C{n}.P1', name=f'Lesson {n}', subject=cls.subject, grade=cls.grade,
+                proficiency=cls.proficiency, is_done=n < 3, verified=n == 0,
+                completed_by=cls.volunteer if n < 3 else None
+            )
+        for n in range(3):
+            Lesson.objects.create(
+                lesson_code=f'M.K1.C{n}.P1', name=f'Lesson {n}', subject=cls.other_subject,
+                grade=cls.other_grade, proficiency=cls.other_proficiency
+            )
+
+    def setUp(self):
+        self.client = APIClient()
+        self.client.force_authenticate(self.admin)
+
+
+class AllLessonsViewTests(AdminTestCase):
+    def collect(self, url, **params):
+        ids, cursor = [], None
+        while True:
+            if cursor:
+                params['cursor'] = cursor
+            response = self.client.get(url, params)
+            self.assertEqual(response.status_code, 200)
+            ids += [lesson['id'] for lesson in response.data['results']]
+            cursor = response.data['next_cursor']
+            if cursor is None:
+                return ids
+
+    def test_pages_cover_every_lesson_once(self):
+        ids = self.collect('/admin-api/lessons/', page_size=3)
+        self.assertEqual(len(ids), 10)
+        self.assertEqual(len(set(ids)), 10)
+
+    def test_page_size_is_capped(self):
+        response = self.client.get('/admin-api/lessons/', {'page_size': 100000})
+        self.assertEqual(response.data['page_size'], 200)
+
+    def test_campus_and_status_filters(self):
+        self.assertEqual(len(self.collect(f'/admin-api/lessons/campus/{self.other_campus.id}/')), 3)
+        self.assertEqual(len(self.collect('/admin-api/lessons/', is_done='true', verified='false')), 2)
+        self.assertEqual(len(self.collect('/admin-api/lessons/', completed_by=str(self.volunteer.id))), 3)
+        self.assertEqual(len(self.collect('/admin-api/lessons/', subject=str(self.other_subject.id))), 3)
+
+    def test_page_query_count_does_not_grow_with_page_size(self):
+        with self.assertNumQueries(1):
+            self.client.get('/admin-api/lessons/', {'page_size': 10})
+
+    def test_invalid_parameters(self):
+        self.assertEqual(self.client.get('/admin-api/lessons/', {'cursor': 'nope'}).status_code, 400)
+        self.assertEqual(self.client.get('/admin-api/lessons/', {'grade': 'nope'}).status_code, 400)
+        self.assertEqual(self.client.get('/admin-api/lessons/', {'is_done': 'maybe'}).status_code, 400)
+        self.assertEqual(self.client.get('/admin-api/lessons/', {'page_size': '0'}).status_code, 400)
+
+    def test_requires_admin(self):
+        self.client.force_authenticate(self.volunteer)
+        self.assertEqual(self.client.get('/admin-api/lessons/').status_code, 403)
+
+
+class AllLessonsExportViewTests(AdminTestCase):
+    def export(self, url, **params):
+        response = self.client.get(url, params)
+        self.assertEqual(response.status_code, 200)
+        self.assertTrue(response.streaming)
+        return json.loads(b''.join(response.streaming_content))
+
+    def test_export_streams_every_lesson(self):
+        lessons = self.export('/admin-api/lessons/export/')
+        self.assertEqual(len(lessons), 10)
+        self.assertEqual(lessons[0]['grade']['campus']['campus_code'], 'c1')
+        completed = [l for l in lessons if l['completed_by']]
+        self.assertEqual(completed[0]['completed_by']['email'], 'volunteer@belakoo.com')
+
+    def test_export_matches_listing_entries(self):
+        listed = self.client.get('/admin-api/lessons/', {'page_size': 200}).json()['results']
+        self.assertEqual(listed, self.export('/admin-api/lessons/export/'))
+
+    def test_export_chunks_output(self):
+        rows = list(stream_json_array(range(5), chunk_size=2))
+        self.assertEqual(rows, [b'[', b'0,1', b',2,3', b',4', b']'])
+        self.assertEqual(json.loads(b''.join(stream_json_array([]))), [])
+
+    def test_export_filters(self):
+        self.assertEqual(len(self.export(f'/admin-api/lessons/campus/{self.other_campus.id}/export/')), 3)
+        self.assertEqual(len(self.export('/admin-api/lessons/export/', verified='true')), 1)
+
+
+class SparseFieldsetTests(AdminTestCase):
+    def get_with_sql(self, url, params):
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.get(url, params)
+        self.assertEqual(response.status_code, 200)
+        return response, ' '.join(query['sql'] for query in queries)
+
+    def test_fields_restrict_payload_and_select_list(self):
+        response, sql = self.get_with_sql('/admin-api/lessons/', {'fields': 'lesson_code,is_done'})
+        self.assertEqual(set(response.data['results'][0]), {'id', 'lesson_code', 'is_done'})
+        self.assertNotIn('"objective"', sql)
+        self.assertNotIn('content_management_subject', sql)
+
+    def test_exclude_drops_text_columns(self):
+        response, sql = self.get_with_sql('/admin-api/unverified-completed-lessons/', {'exclude': 'completed_by'})
+        self.assertEqual(len(response.data), 2)
+        self.assertNotIn('completed_by', response.data[0])
+        self.assertNotIn('"objective"', sql)
+        self.assertNotIn('user_management_user', sql)
+
+    def test_nested_fields_still_render(self):
+        response = self.client.get('/admin-api/lessons/', {'fields': 'grade,completed_by', 'is_done': 'true'})
+        lesson = response.data['results'][0]
+        self.assertEqual(lesson['grade']['campus']['campus_code'], 'c1')
+        self.assertEqual(lesson['completed_by']['name'], 'Volunteer')
+
+    def test_lesson_detail_fields(self):
+        lesson = Lesson.objects.first()
+        response, sql = self.get_with_sql(f'/api/lessons/{lesson.id}/', {'fields': 'lesson_code,subject'})
+        self.assertEqual(response.json(), {'id': str(lesson.id), 'lesson_code': lesson.lesson_code, 'subject': lesson.subject.name})
+        self.assertNotIn('"activate"', sql)
+
+    def test_invalid_fieldsets(self):
+        self.assertEqual(self.client.get('/admin-api/lessons/', {'fields': 'password'}).status_code, 400)
+        self.assertEqual(
+            self.client.get('/admin-api/lessons/', {'fields': 'name', 'exclude': 'objective'}).status_code, 400
+        )
+
+
+class LessonPhaseJSONTests(AdminTestCase):
+    def test_put_stores_phase_fields_natively(self):
+        lesson = Lesson.objects.first()
+        activate = [{'title': 'HOOK', 'desc': 'Sing a song'}]
+        response = self.client.put(f'/admin-api/lesson/{lesson.id}/', {'activate': activate}, format='json')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.data['data']['activate'], activate)
+        lesson.refresh_from_db()
+        self.assertEqual(lesson.activate, activate)
+
+    def test_migration_decodes_double_encoded_rows(self):
+        migration = importlib.import_module('content_management.migrations.0013_decode_lesson_phase_json')
+        lesson = Lesson.objects.first()
+        Lesson.objects.filter(id=lesson.id).update(
+            activate=json.dumps([{'title': 'HOOK', 'desc': 'x'}]), acquire=[], apply='not json'
+        )
+        migration.decode_phase_fields(django_apps, None)
+        lesson.refresh_from_db()
+        self.assertEqual(lesson.activate, [{'title': 'HOOK', 'desc': 'x'}])
+        self.assertEqual(lesson.acquire, [])
+        self.assertEqual(lesson.apply, 'not json')
+
+
+class CampusProgressViewTests(AdminTestCase):
+    def test_progress_reads_counters(self):
+        with self.assertNumQueries(4):
+            response = self.client.get(f'/admin-api/progress/campus/{self.campus.id}/')
+        data = response.json()
+        self.assertEqual((data['total'], data['done'], data['verified']), (7, 3, 1))
+        self.assertEqual(data['done_pct'], 42.9)
+        grade = data['grades'][0]
+        subject = grade['subjects'][0]
+        proficiency = subject['proficiencies'][0]
+        for node in (grade, subject, proficiency):
+            self.assertEqual((node['total'], node['done'], node['verified']), (7, 3, 1))
+        self.assertEqual(proficiency['proficiency_code'], 'P1')
+
+    def test_campus_without_lessons(self):
+        campus = Campus.objects.create(campus_code='c3', name='Empty', description='No lessons')
+        data = self.client.get(f'/admin-api/progress/campus/{campus.id}/').json()
+        self.assertEqual((data['total'], data['done_pct'], data['grades']), (0, 0.0, []))
+
+    def test_unknown_campus(self):
+        response = self.client.get('/admin-api/progress/campus/00000000-0000-0000-0000-000000000000/')
+        self.assertEqual(response.status_code, 404)
+
+
+class ProgressCounterTests(AdminTestCase):
+    def counters(self, node):
+        node.refresh_from_db()
+        return (node.lesson_count, node.done_count, node.verified_count)
+
+    def assertCounters(self, expected, *nodes):
+        for node in nodes:
+            self.assertEqual(self.counters(node), expected)
+
+    def test_counters_track_creates(self):
+        self.assertCounters((7, 3, 1), self.campus, self.grade, self.subject, self.proficiency)
+        self.assertCounters((3, 0, 0), self.other_campus, self.other_grade, self.other_subject)
+
+    def test_mark_done_and_not_done(self):
+        lesson = Lesson.objects.filter(grade=self.grade, is_done=False).first()
+        self.client.force_authenticate(self.volunteer)
+        self.client.post(f'/api/lessons/{lesson.id}/mark-done/')
+        self.assertCounters((7, 4, 1), self.campus, self.proficiency)
+        self.client.post(f'/api/lessons/{lesson.id}/mark-not-done/')
+        self.client.post(f'/api/lessons/{lesson.id}/mark-not-done/')
+        self.assertCounters((7, 3, 1), self.campus, self.proficiency)
+
+    def test_delete_and_move(self):
+        Lesson.objects.filter(verified=True).get().delete()
+        self.assertCounters((6, 2, 0), self.campus, self.subject)
+        lesson = Lesson.objects.filter(grade=self.grade, is_done=True).first()
+        lesson.grade, lesson.subject, lesson.proficiency = self.other_grade, self.other_subject, self.other_proficiency
+        lesson.save()
+        self.assertCounters((5, 1, 0), self.campus, self.grade, self.proficiency)
+        self.assertCounters((4, 1, 0), self.other_campus, self.other_grade, self.other_proficiency)
+
+    def test_cascading_deletes_update_each_counter_once(self):
+        self.proficiency.delete()
+        self.assertCounters((0, 0, 0), self.campus, self.grade, self.subject)
+        with CaptureQueriesContext(connection) as queries:
+            Grade.objects.filter(id=self.other_grade.id).delete()
+        self.assertCounters((0, 0, 0), self.other_campus)
+        # Only the surviving campus is updated, whatever the number of lessons
+        self.assertEqual(sum(query['sql'].startswith('UPDATE') for query in queries), 1)
+
+    def test_grade_move_transfers_campus_counts(self):
+        stale = Grade.objects.get(id=self.grade.id)
+        self.grade.campus = self.other_campus
+        self.grade.save()
+        self.assertCounters((0, 0, 0), self.campus)
+        self.assertCounters((10, 3, 1), self.other_campus)
+        stale.name = 'Renamed'
+        stale.lesson_count = 0
+        stale.save()
+        self.assertCounters((7, 3, 1), self.grade)
+
+    def test_rebuild_command(self):
+        Campus.objects.update(lesson_count=0, done_count=0, verified_count=0)
+        out = StringIO()
+        call_command('rebuild_progress_counters', '--check', stdout=out)
+        self.assertIn(f'campus {self.campus.id}: stored 0/0/0, expected 7/3/1', out.getvalue())
+        call_command('rebuild_progress_counters', stdout=StringIO())
+        self.assertCounters((7, 3, 1), self.campus)
+        out = StringIO()
+        call_command('rebuild_progress_counters', '--check', stdout=out)
+        self.assertIn('up to date', out.getvalue())
+
+
+class NotificationOutboxTests(AdminTestCase):
+    def mark_done(self):
+        lesson = Lesson.objects.filter(is_done=False).first()
+        self.client.force_authenticate(self.volunteer)
+        with mock.patch('firebase_admin.messaging.send') as send:
+            response = self.client.post(f'/api/lessons/{lesson.id}/mark-done/')
+        self.assertEqual(response.status_code, 200)
+        send.assert_not_called()
+        return lesson
+
+    def test_mark_done_only_queues(self):
+        for n in range(5):
+            User.objects.create_user(
+                email=f'admin{n}@belakoo.com', password='pass', name='Admin', role=User.Role.ADMIN, fcm_token=f'token{n}'
+            )
+        lesson = self.mark_done()
+        notification = Notification.objects.get()
+        self.assertEqual(notification.status, Notification.Status.PENDING)
+        self.assertEqual(notification.payload['lesson_id'], str(lesson.id))
+        self.assertEqual(notification.payload['completed_by_name'], 'Volunteer')
+
+    def test_delivery_marks_sent(self):
+        self.mark_done()
+        delivered = []
+        self.assertEqual(process_outbox(delivered.append), {'sent': 1, 'retried': 0, 'dead': 0})
+        self.assertEqual([len(group) for group in delivered], [1])
+        self.assertEqual(Notification.objects.get().status, Notification.Status.SENT)
+        self.assertEqual(process_outbox(delivered.append)['sent'], 0)
+
+    def test_failures_back_off_then_dead_letter(self):
+        self.mark_done()
+
+        def fail(notifications):
+            raise RuntimeError('FCM unavailable')
+
+        now = timezone.now()
+        self.assertEqual(process_outbox(fail, now=now)['retried'], 1)
+        notification = Notification.objects.get()
+        self.assertEqual((notification.attempts, notification.last_error), (1, 'FCM unavailable'))
+        self.assertGreater(notification.available_at, now)
+        self.assertEqual(sum(process_outbox(fail, now=now).values()), 0)
+        for _ in range(2, MAX_ATTEMPTS + 1):
+            process_outbox(fail, now=Notification.objects.get().available_at)
+        notification = Notification.objects.get()
+        self.assertEqual((notification.status, notification.attempts), (Notification.Status.DEAD, MAX_ATTEMPTS))
+
+    def test_delivered_groups_survive_a_crash_later_in_the_batch(self):
+        now = timezone.now()
+        for n in range(2):
+            Notification.objects.create(kind=Notification.Kind.LESSON_COMPLETION, payload={'n': n}, available_at=now)
+        delivered = []
+
+        def deliver_then_crash(notifications):
+            if delivered:
+                raise SystemExit
+            delivered.append(notifications[0].payload['n'])
+
+        with self.assertRaises(SystemExit):
+            process_outbox(deliver_then_crash, now=now)
+        sent = Notification.objects.get(status=Notification.Status.SENT)
+        self.assertEqual(sent.payload['n'], delivered[0])
+        # The other row stays leased to the dead worker until the lease runs out
+        self.assertEqual(sum(process_outbox(delivered.append, now=now).values()), 0)
+        self.assertEqual(process_outbox(delivered.append, now=now + CLAIM_LEASE)['sent'], 1)
+
+    def test_worker_command_sends_to_admins(self):
+        User.objects.filter(id=self.admin.id).update(fcm_token='admin-token')
+        self.mark_done()
+        with FakeFCMServer() as server, mock.patch(
+            'utils.notifications.get_transport', return_value=FirebaseTransport(app=server.app)
+        ):
+            call_command('send_notifications', '--once', stdout=StringIO())
+        self.assertEqual(server.delivered, ['admin-token'])
+        self.assertEqual(Notification.objects.get().status, Notification.Status.SENT)
+
+
+class MulticastDeliveryTests(TestCase):
+    def test_batches_at_multicast_limit(self):
+        batches = []
+
+        class RecordingTransport:
+            def send(self, tokens, title, message, data):
+                batches.append(len(tokens))
+                return [TokenResult(token, True, None, None) for token in tokens]
+
+        results = send_multicast([f't{n}' for n in range(1201)], 'Title', 'Body', transport=RecordingTransport())
+        self.assertEqual(batches, [500, 500, 201])
+        self.assertEqual(len(results), 1201)
+
+    def test_per_token_results_from_fake_fcm(self):
+        with FakeFCMServer(dead_tokens={'gone'}, invalid_tokens={'bad'}) as server:
+            results = send_multicast(
+                ['ok', 'gone', 'bad'], 'Title', 'Body', {'lesson_id': '1'}, transport=FirebaseTransport(app=server.app)
+            )
+        self.assertEqual(
+            [(result.token, result.success, result.error_code) for result in results],
+            [('ok', True, None), ('gone', False, 'UNREGISTERED'), ('bad', False, 'INVALID_ARGUMENT')],
+        )
+        self.assertEqual(server.delivered, ['ok'])
+
+
+class DeadTokenPruningTests(AdminTestCase):
+    def fan_out(self, server):
+        with mock.patch('utils.notifications.get_transport', return_value=FirebaseTransport(app=server.app)):
+            return send_lesson_completion({
+                'lesson_id': '1', 'lesson_code': 'LI.K1.C0.P1', 'lesson_name': 'Lesson 0',
+                'completed_by_id': str(self.volunteer.id), 'completed_by_name': 'Volunteer',
+            })
+
+    def add_admins(self, *tokens):
+        return [
+            User.objects.create_user(
+                email=f'{token}@belakoo.com', password='pass', name='Admin', role=User.Role.ADMIN, fcm_token=token
+            ) for token in tokens
+        ]
+
+    def test_unregistered_and_invalid_tokens_are_cleared(self):
+        live, gone, bad = self.add_admins('live', 'gone', 'bad')
+        with FakeFCMServer(dead_tokens={'gone'}, invalid_tokens={'bad'}) as server:
+            self.fan_out(server)
+            self.assertEqual(server.requests, 3)
+            self.fan_out(server)
+            self.assertEqual(server.requests, 4)
+        tokens = dict(User.objects.filter(id__in=[live.id, gone.id, bad.id]).values_list('email', 'fcm_token'))
+        self.assertEqual(tokens, {'live@belakoo.com': 'live', 'gone@belakoo.com': None, 'bad@belakoo.com': None})
+
+    def test_invalid_argument_alone_is_not_blamed_on_tokens(self):
+        self.add_admins('a', 'b')
+        results = [TokenResult('a', False, 'INVALID_ARGUMENT', ''), TokenResult('b', False, 'INVALID_ARGUMENT', '')]
+        self.assertEqual(dead_tokens(results), set())
+        self.assertEqual(prune_dead_tokens(dead_tokens(results)), 0)
+
+    def test_only_dead_tokens_is_not_retried(self):
+        admin, = self.add_admins('gone')
+        with FakeFCMServer(dead_tokens={'gone'}) as server:
+            results = self.fan_out(server)
+        self.assertEqual([result.error_code for result in results], ['UNREGISTERED'])
+        admin.refresh_from_db()
+        self.assertIsNone(admin.fcm_token)
+
+    def test_transient_failure_is_retried(self):
+        self.add_admins('live')
+        transport = mock.Mock(send=mock.Mock(return_value=[TokenResult('live', False, 'UNAVAILABLE', 'down')]))
+        with mock.patch('utils.notifications.get_transport', return_value=transport):
+            with self.assertRaises(DeliveryError):
+                send_lesson_completion({
+                    'lesson_id': '1', 'lesson_code': 'x', 'lesson_name': 'x',
+                    'completed_by_id': '1', 'completed_by_name': 'x',
+                })
+        self.assertEqual(User.objects.get(fcm_token='live').fcm_token, 'live')
+
+
+@override_settings(NOTIFICATION_DIGEST_WINDOW=300)
+class NotificationDigestTests(AdminTestCase):
+    def test_completions_in_a_window_go_out_as_one_digest(self):
+        User.objects.filter(id=self.admin.id).update(fcm_token='admin-token')
+        lessons = list(Lesson.objects.filter(is_done=False)[:4])
+        self.client.force_authenticate(self.volunteer)
+        for lesson in lessons:
+            self.client.post(f'/api/lessons/{lesson.id}/mark-done/')
+        due = set(Notification.objects.values_list('available_at', flat=True))
+        self.assertEqual(len(due), 1)
+        self.assertEqual(due.pop().timestamp() % 300, 0)
+        self.assertEqual(sum(process_outbox(deliver_notifications).values()), 0)
+
+        transport = mock.Mock(send=mock.Mock(return_value=[TokenResult('admin-token', True, None, None)]))
+        with mock.patch('utils.notifications.get_transport', return_value=transport):
+            results = process_outbox(deliver_notifications, now=timezone.now() + timedelta(seconds=300))
+        self.assertEqual(results['sent'], 4)
+        transport.send.assert_called_once()
+        tokens, title, message, data = transport.send.call_args.args
+        self.assertEqual(message, '4 lessons awaiting review')
+        self.assertEqual(set(json.loads(data['lesson_ids'])), {str(lesson.id) for lesson in lessons})
+
+    def test_digest_rows_are_not_split_by_the_batch_size(self):
+        now = timezone.now()
+        Notification.objects.bulk_create([
+            Notification(kind=Notification.Kind.LESSON_DIGEST, payload={'lesson_ids': [str(n)]}, available_at=now)
+            for n in range(5)
+        ])
+        delivered = []
+        self.assertEqual(process_outbox(delivered.append, batch_size=2, now=now)['sent'], 5)
+        self.assertEqual([len(group) for group in delivered], [5])
+
+
+class LazyClientTests(TestCase):
+    def test_factory_runs_once_until_reset(self):
+        calls = []
+        client = lazy_client(lambda: calls.append(1) or object())
+        first = client()
+        self.assertIs(client(), first)
+        self.assertEqual(len(calls), 1)
+        client.reset()
+        self.assertIsNot(client(), first)
+        self.assertEqual(len(calls), 2)
+
+
+class LessonReviewViewTests(AdminTestCase):
+    def review(self, url='/admin-api/lessons/review/', **data):
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.post(url, data, format='json')
+        updates = [q['sql'] for q in queries if q['sql'].startswith('UPDATE "content_management_lesson"')]
+        return response, updates
+
+    def test_verify_by_ids_only_changes_lessons_awaiting_review(self):
+        ids = [str(lesson_id) for lesson_id in Lesson.objects.filter(grade=self.grade).values_list('id', flat=True)]
+        response, updates = self.review(action='verify', lesson_ids=ids)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.data['changed'], 2)
+        self.assertEqual(len(updates), 1)
+        self.assertEqual(Lesson.objects.filter(verified=True).count(), 3)
+        self.assertEqual(Lesson.objects.filter(verified=True, is_done=False).count(), 0)
+        self.campus.refresh_from_db()
+        self.assertEqual(self.campus.verified_count, 3)
+        self.assertEqual(self.review(action='verify', lesson_ids=ids)[0].data['changed'], 0)
+
+    def test_reject_by_volunteer_in_campus(self):
+        response, _ = self.review(
+            f'/admin-api/lessons/campus/{self.campus.id}/review/', action='reject', completed_by=str(self.volunteer.id)
+        )
+        self.assertEqual(response.data['changed'], 2)
+        self.assertEqual(Lesson.objects.filter(is_done=True).count(), 1)
+        self.grade.refresh_from_db()
+        self.assertEqual((self.grade.done_count, self.grade.verified_count), (1, 1))
+        response, _ = self.review(
+            f'/admin-api/lessons/campus/{self.other_campus.id}/review/', action='verify', completed_by=str(self.volunteer.id)
+        )
+        self.assertEqual(response.data['changed'], 0)
+
+    def test_invalid_requests(self):
+        self.assertEqual(self.review(action='approve', lesson_ids=[])[0].status_code, 400)
+        self.assertEqual(self.review(action='verify')[0].status_code, 400)
+        self.assertEqual(self.review(action='verify', lesson_ids=['nope'])[0].status_code, 400)
+        self.assertEqual(self.review(action='verify', grade='nope')[0].status_code, 400)
+        self.client.force_authenticate(self.volunteer)
+        self.assertEqual(self.review(action='verify', lesson_ids=[])[0].status_code, 403)
@@ -18,4 +18,10 @@ urlpatterns = [
     path('unverified-completed-lessons/', views.UnverifiedCompletedLessonsView.as_view(), name='unverified-completed-lessons'),
     path('lessons/', views.AllLessonsView.as_view(), name='all-lessons'),
     path('lessons/campus/<uuid:campus_id>/', views.AllLessonsView.as_view(), name='campus-lessons'),
+    path('lessons/review/', views.LessonReviewView.as_view(), name='review-lessons'),
+    path('lessons/campus/<uuid:campus_id>/review/', views.LessonReviewView.as_view(), name='review-campus-lessons'),
+    path('lessons/export/', views.AllLessonsExportView.as_view(), name='export-lessons'),
+    path('lessons/campus/<uuid:campus_id>/export/', views.AllLessonsExportView.as_view(), name='export-campus-lessons'),
+    path('progress/campus/<uuid:campus_id>/', views.CampusProgressView.as_view(), name='campus-progress'),
+    path('cache/curriculum/', views.CurriculumCacheStatsView.as_view(), name='curriculum-cache-stats'),
 ]
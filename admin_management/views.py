@@ -1,4 +1,5 @@
 from django.shortcuts import render
+from django.http import StreamingHttpResponse
 from rest_framework.views import APIView
 from rest_framework.response import Response
 from rest_framework import status
@@ -7,7 +8,15 @@ from user_management.models import User
 from rest_framework.decorators import permission_classes
 from rest_framework_simplejwt.authentication import JWTAuthentication
 from content_management.models import Campus, Grade, Subject, Proficiency, Lesson
-import json
+from content_management.cache import cache_stats
+from content_management.pagination import InvalidPageRequest, keyset_page, parse_page_size
+from content_management.fieldsets import InvalidFieldset, LessonFieldset
+from content_management.projection import Projection
+from content_management.progress import campus_progress
+from content_management.transitions import transition_lessons
+from utils.renderers import dumps
+import uuid
+from operator import itemgetter
 
 class AdminPermission(BasePermission):
     def has_permission(self, request, view):
@@ -26,19 +35,20 @@ class AdminPermission(BasePermission):
             request.user.role == User.Role.ADMIN
         )
 
+VOLUNTEER_PROJECTION = Projection({
+    'id': 'id',
+    'email': 'email',
+    'name': 'name',
+    'is_active': 'is_active'
+})
+
 class VolunteerListView(APIView):
     authentication_classes = [JWTAuthentication]
     permission_classes = [IsAuthenticated, AdminPermission]
 
     def get(self, request):
         volunteers = User.objects.filter(role=User.Role.VOLUNTEER)
-        data = [{
-            'id': str(volunteer.id),
-            'email': volunteer.email,
-            'name': volunteer.name,
-            'is_active': volunteer.is_active
-        } for volunteer in volunteers]
-        return Response(data)
+        return Response(VOLUNTEER_PROJECTION.rows(volunteers))
 
 class CreateVolunteerView(APIView):
     authentication_classes = [JWTAuthentication]
@@ -727,13 +737,13 @@ class LessonManagementView(APIView):
 
             # Update JSON fields if provided
             if 'activate' in request.data:
-                lesson.activate = json.dumps(request.data['activate'])
+                lesson.activate = request.data['activate']
             if 'acquire' in request.data:
-                lesson.acquire = json.dumps(request.data['acquire'])
+                lesson.acquire = request.data['acquire']
             if 'assess' in request.data:
-                lesson.assess = json.dumps(request.data['assess'])
+                lesson.assess = request.data['assess']
             if 'apply' in request.data:
-                lesson.apply = json.dumps(request.data['apply'])
+                lesson.apply = request.data['apply']
 
             lesson.save()
 
@@ -787,97 +797,231 @@ class LessonManagementView(APIView):
                 'msg': f'Error deleting lesson: {str(e)}'
             }, status=status.HTTP_400_BAD_REQUEST)
 
+UNVERIFIED_LESSON_FIELDSET = LessonFieldset({
+    'id': 'id',
+    'lesson_code': 'lesson_code',
+    'name': 'name',
+    'subject': {'id': 'subject_id', 'name': 'subject__name'},
+    'grade': {'id': 'grade_id', 'name': 'grade__name'},
+    'proficiency': {'id': 'proficiency_id', 'name': 'proficiency__name'},
+    'completed_by': {'id': 'completed_by_id', 'email': 'completed_by__email', 'name': 'completed_by__name'},
+})
+
 class UnverifiedCompletedLessonsView(APIView):
     permission_classes = [IsAuthenticated, AdminPermission]
 
     def get(self, request):
+        try:
+            selected = UNVERIFIED_LESSON_FIELDSET.select(request.query_params)
+        except InvalidFieldset as e:
+            return Response({'msg': str(e)}, status=status.HTTP_400_BAD_REQUEST)
+
         unverified_lessons = Lesson.objects.filter(
             is_done=True,
             verified=False
-        ).select_related('completed_by', 'subject', 'grade', 'proficiency')
-
-        data = [{
-            'id': str(lesson.id),
-            'lesson_code': lesson.lesson_code,
-            'name': lesson.name,
-            'subject': {
-                'id': str(lesson.subject.id),
-                'name': lesson.subject.name
-            },
-            'grade': {
-                'id': str(lesson.grade.id),
-                'name': lesson.grade.name
-            },
-            'proficiency': {
-                'id': str(lesson.proficiency.id),
-                'name': lesson.proficiency.name
-            },
-            'completed_by': {
-                'id': str(lesson.completed_by.id),
-                'email': lesson.completed_by.email,
-                'name': lesson.completed_by.name
-            } if lesson.completed_by else None
-        } for lesson in unverified_lessons]
+        ).order_by('completed_at')
+        data = UNVERIFIED_LESSON_FIELDSET.projection(selected).rows(unverified_lessons)
 
         return Response(data)
     
+LESSON_ID_FILTERS = {
+    'subject': 'subject_id',
+    'grade': 'grade_id',
+    'proficiency': 'proficiency_id',
+    'completed_by': 'completed_by_id',
+}
+LESSON_BOOLEAN_FILTERS = ('is_done', 'verified')
+
+def parse_lesson_filters(params):
+    filters = {}
+    for param, lookup in LESSON_ID_FILTERS.items():
+        value = params.get(param)
+        if value:
+            try:
+                filters[lookup] = uuid.UUID(value)
+            except ValueError:
+                raise InvalidPageRequest(f'{param} must be a valid id.')
+    for param in LESSON_BOOLEAN_FILTERS:
+        value = params.get(param)
+        if value:
+            if value.lower() not in ('true', 'false', '1', '0'):
+                raise InvalidPageRequest(f'{param} must be true or false.')
+            filters[param] = value.lower() in ('true', '1')
+    return filters
+
+MAX_REVIEW_BATCH = 500
+REVIEW_ACTIONS = {
+    'verify': {'verified': True},
+    'reject': {'is_done': False},
+}
+
+class LessonReviewView(APIView):
+    """Verify or reject completed lessons in bulk: the lessons in
+    ``lesson_ids``, or every one matching the subject, grade, proficiency,
+    completed_by and campus filters. Only lessons still awaiting review
+    (done and not verified) change."""
+    permission_classes = [IsAuthenticated, AdminPermission]
+
+    def post(self, request, campus_id=None):
+        action = request.data.get('action')
+        if action not in REVIEW_ACTIONS:
+            return Response({'msg': 'action must be verify or reject.'}, status=status.HTTP_400_BAD_REQUEST)
+        try:
+            filters = parse_lesson_filters({
+                param: str(request.data[param]) for param in LESSON_ID_FILTERS if request.data.get(param)
+            })
+        except InvalidPageRequest as e:
+            return Response({'msg': str(e)}, status=status.HTTP_400_BAD_REQUEST)
+        if campus_id:
+            filters['grade__campus_id'] = campus_id
+
+        lesson_ids = request.data.get('lesson_ids')
+        if lesson_ids is not None:
+            if not isinstance(lesson_ids, list) or len(lesson_ids) > MAX_REVIEW_BATCH:
+                return Response({
+                    'msg': f'lesson_ids must be a list of at most {MAX_REVIEW_BATCH} ids.'
+                }, status=status.HTTP_400_BAD_REQUEST)
+            try:
+                filters['id__in'] = [uuid.UUID(str(value)) for value in lesson_ids]
+            except ValueError:
+                return Response({'msg': 'lesson_ids must be valid ids.'}, status=status.HTTP_400_BAD_REQUEST)
+        elif not filters:
+            return Response({'msg': 'Provide lesson_ids or at least one filter.'}, status=status.HTTP_400_BAD_REQUEST)
+
+        changed = transition_lessons(
+            Lesson.objects.filter(is_done=True, verified=False, **filters), REVIEW_ACTIONS[action]
+        )
+        return Response({
+            'msg': f"{len(changed)} lessons {'verified' if action == 'verify' else 'rejected'}",
+            'changed': len(changed)
+        }, status=status.HTTP_200_OK)
+
+ALL_LESSONS_FIELDSET = LessonFieldset({
+    'id': 'id',
+    'lesson_code': 'lesson_code',
+    'name': 'name',
+    'subject': {
+        'id': 'subject_id',
+        'name': 'subject__name',
+        'subject_code': 'subject__subject_code'
+    },
+    'grade': {
+        'id': 'grade_id',
+        'name': 'grade__name',
+        'grade_code': 'grade__grade_code',
+        'campus': {
+            'id': 'grade__campus_id',
+            'name': 'grade__campus__name',
+            'campus_code': 'grade__campus__campus_code'
+        }
+    },
+    'proficiency': {
+        'id': 'proficiency_id',
+        'name': 'proficiency__name',
+        'proficiency_code': 'proficiency__proficiency_code'
+    },
+    'is_done': 'is_done',
+    'verified': 'verified',
+    'completed_by': {
+        'id': 'completed_by_id',
+        'name': 'completed_by__name',
+        'email': 'completed_by__email'
+    },
+    'objective': 'objective',
+    'duration': 'duration',
+    'specific_learning_outcome': 'specific_learning_outcome',
+    'behavioral_outcome': 'behavioral_outcome',
+    'materials_required': 'materials_required',
+    'created_at': 'created_at',
+    'completed_at': 'completed_at',
+    'last_update': 'last_update',
+})
+
 class AllLessonsView(APIView):
     permission_classes = [IsAuthenticated, AdminPermission]
 
     def get(self, request, campus_id=None):
-        # Start with all lessons
-        lessons = Lesson.objects.select_related(
-            'subject', 
-            'grade', 
-            'proficiency', 
-            'completed_by',
-            'grade__campus'
-        )
+        try:
+            filters = parse_lesson_filters(request.query_params)
+            page_size = parse_page_size(request.query_params.get('page_size'))
+            selected = ALL_LESSONS_FIELDSET.select(request.query_params)
+        except (InvalidPageRequest, InvalidFieldset) as e:
+            return Response({'msg': str(e)}, status=status.HTTP_400_BAD_REQUEST)
+
+        projection = ALL_LESSONS_FIELDSET.projection(selected)
+        lessons = Lesson.objects.filter(**filters)
 
         # Filter by campus if campus_id is provided
         if campus_id:
             lessons = lessons.filter(grade__campus_id=campus_id)
 
-        # Convert queryset to list of dictionaries
-        data = [{
-            'id': str(lesson.id),
-            'lesson_code': lesson.lesson_code,
-            'name': lesson.name,
-            'subject': {
-                'id': str(lesson.subject.id),
-                'name': lesson.subject.name,
-                'subject_code': lesson.subject.subject_code
-            },
-            'grade': {
-                'id': str(lesson.grade.id),
-                'name': lesson.grade.name,
-                'grade_code': lesson.grade.grade_code,
-                'campus': {
-                    'id': str(lesson.grade.campus.id),
-                    'name': lesson.grade.campus.name,
-                    'campus_code': lesson.grade.campus.campus_code
-                }
-            },
-            'proficiency': {
-                'id': str(lesson.proficiency.id),
-                'name': lesson.proficiency.name,
-                'proficiency_code': lesson.proficiency.proficiency_code
-            },
-            'is_done': lesson.is_done,
-            'verified': lesson.verified,
-            'completed_by': {
-                'id': str(lesson.completed_by.id),
-                'name': lesson.completed_by.name,
-                'email': lesson.completed_by.email
-            } if lesson.completed_by else None,
-            'objective': lesson.objective,
-            'duration': lesson.duration,
-            'specific_learning_outcome': lesson.specific_learning_outcome,
-            'behavioral_outcome': lesson.behavioral_outcome,
-            'materials_required': lesson.materials_required,
-            'created_at': lesson.created_at,
-            'completed_at': lesson.completed_at,
-            'last_update': lesson.last_update
-        } for lesson in lessons]
-
-        return Response(data)
\ No newline at end of file
+        # created_at and id always trail the projected columns: they are the
+        # keyset the pages seek on.
+        rows = lessons.values_list(*projection.lookups, 'created_at', 'id')
+        try:
+            page, next_cursor = keyset_page(rows, request.query_params.get('cursor'), page_size, key=itemgetter(-2, -1))
+        except InvalidPageRequest as e:
+            return Response({'msg': str(e)}, status=status.HTTP_400_BAD_REQUEST)
+
+        return Response({
+            'results': [projection.build(row) for row in page],
+            'next_cursor': next_cursor,
+            'page_size': page_size
+        })
+
+EXPORT_CHUNK_SIZE = 2000
+
+def stream_json_array(rows, chunk_size=EXPORT_CHUNK_SIZE):
+    yield b'['
+    separator = b''
+    chunk = []
+    for row in rows:
+        chunk.append(dumps(row))
+        if len(chunk) == chunk_size:
+            yield separator + b','.join(chunk)
+            separator = b','
+            chunk = []
+    if chunk:
+        yield separator + b','.join(chunk)
+    yield b']'
+
+class AllLessonsExportView(APIView):
+    """Every matching lesson as one JSON array, streamed from a server-side
+    cursor so worker memory stays flat regardless of the catalogue size."""
+    permission_classes = [IsAuthenticated, AdminPermission]
+
+    def get(self, request, campus_id=None):
+        try:
+            filters = parse_lesson_filters(request.query_params)
+            selected = ALL_LESSONS_FIELDSET.select(request.query_params)
+        except (InvalidPageRequest, InvalidFieldset) as e:
+            return Response({'msg': str(e)}, status=status.HTTP_400_BAD_REQUEST)
+
+        lessons = Lesson.objects.filter(**filters)
+        if campus_id:
+            lessons = lessons.filter(grade__campus_id=campus_id)
+        rows = ALL_LESSONS_FIELDSET.projection(selected).iterator(
+            lessons.order_by('created_at', 'id'), chunk_size=EXPORT_CHUNK_SIZE
+        )
+
+        response = StreamingHttpResponse(
+            stream_json_array(rows),
+            content_type='application/json'
+        )
+        response['Content-Disposition'] = 'attachment; filename="lessons.json"'
+        return response
+
+class CampusProgressView(APIView):
+    permission_classes = [IsAuthenticated, AdminPermission]
+
+    def get(self, request, campus_id):
+        progress = campus_progress(campus_id)
+        if progress is None:
+            return Response({'msg': 'Campus not found'}, status=status.HTTP_404_NOT_FOUND)
+        return Response(progress)
+
+class CurriculumCacheStatsView(APIView):
+    permission_classes = [IsAuthenticated, AdminPermission]
+
+    def get(self, request):
+        return Response(cache_stats())
@@ -0,0 +1,149 @@
+"""Rows/sec for the admin lesson list: model instances + DRF's JSONRenderer
+(the old path) against values_list() projection + ORJSONRenderer.
+
+Runs against a throwaway in-memory SQLite database:
+
+    python benchmarks/lesson_list.py [--lessons 50000] [--repeat 3]
+"""
+import argparse
+import json
+import os
+import sys
+import time
+import uuid
+
+import django
+from django.conf import settings
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+settings.configure(
+    INSTALLED_APPS=[
+        'django.contrib.auth',
+        'django.contrib.contenttypes',
+        'rest_framework',
+        'user_management',
+        'content_management',
+    ],
+    DATABASES={'default': {'ENGINE': 'django.db.backends.sqlite3', 'NAME': ':memory:'}},
+    CACHES={
+        'default': {'BACKEND': 'django.core.cache.backends.locmem.LocMemCache'},
+        'curriculum': {'BACKEND': 'django.core.cache.backends.locmem.LocMemCache'},
+    },
+    AUTH_USER_MODEL='user_management.User',
+    DEFAULT_AUTO_FIELD='django.db.models.BigAutoField',
+    USE_TZ=True,
+    SECRET_KEY='benchmark',
+)
+django.setup()
+
+from django.core.management import call_command  # noqa: E402
+from rest_framework.renderers import JSONRenderer  # noqa: E402
+from admin_management.views import ALL_LESSONS_FIELDSET  # noqa: E402
+from content_management.models import Campus, Grade, Subject, Proficiency, Lesson  # noqa: E402
+from utils.renderers import ORJSONRenderer  # noqa: E402
+
+
+def populate(count):
+    campus = Campus.objects.create(campus_code='c1', name='Campus', description='Benchmark campus')
+    grade = Grade.objects.create(grade_code='K1', name='K1', campus=campus)
+    subject = Subject.objects.create(
+        subject_code='LI', name='Learning and Innovation', icon='https://example.com/icon.png',
+        grade=grade, colorcode='#00FF00'
+    )
+    proficiencies = Proficiency.objects.bulk_create([
+        Proficiency(id=uuid.uuid4(), proficiency_code=f'P{n}', name=f'P{n}', subject=subject) for n in range(10)
+    ])
+    Lesson.objects.bulk_create([
+        Lesson(
+            lesson_code=f'LI.K1.C{n}.P{n % 10}', name=f'Lesson {n}', subject=subject, grade=grade,
+            proficiency=proficiencies[n % 10], objective='Objective ' * 20, duration='40 minutes',
+            specific_learning_outcome='Outcome ' * 20, behavioral_outcome='Behaviour ' * 20,
+            materials_required='Paper, pencils'
+        ) for n in range(count)
+    ], batch_size=2000)
+
+
+def instance_path():
+    lessons = Lesson.objects.select_related(
+        'subject', 'grade', 'proficiency', 'completed_by', 'grade__campus'
+    ).order_by('created_at', 'id')
+    data = [{
+        'id': str(lesson.id),
+        'lesson_code': lesson.lesson_code,
+        'name': lesson.name,
+        'subject': {
+            'id': str(lesson.subject.id),
+            'name': lesson.subject.name,
+            'subject_code': lesson.subject.subject_code
+        },
+        'grade': {
+            'id': str(lesson.grade.id),
+            'name': lesson.grade.name,
+            'grade_code': lesson.grade.grade_code,
+            'campus': {
+                'id': str(lesson.grade.campus.id),
+                'name': lesson.grade.campus.name,
+                'campus_code': lesson.grade.campus.campus_code
+            }
+        },
+        'proficiency': {
+            'id': str(lesson.proficiency.id),
+            'name': lesson.proficiency.name,
+            'proficiency_code': lesson.proficiency.proficiency_code
+        },
+        'is_done': lesson.is_done,
+        'verified': lesson.verified,
+        'completed_by': {
+            'id': str(lesson.completed_by.id),
+            'name': lesson.completed_by.name,
+            'email': lesson.completed_by.email
+        } if lesson.completed_by else None,
+        'objective': lesson.objective,
+        'duration': lesson.duration,
+        'specific_learning_outcome': lesson.specific_learning_outcome,
+        'behavioral_outcome': lesson.behavioral_outcome,
+        'materials_required': lesson.materials_required,
+        'created_at': lesson.created_at,
+        'completed_at': lesson.completed_at,
+        'last_update': lesson.last_update
+    } for lesson in lessons]
+    return JSONRenderer().render(data)
+
+
+def projection_path():
+    projection = ALL_LESSONS_FIELDSET.projection(list(ALL_LESSONS_FIELDSET.shape))
+    return ORJSONRenderer().render(projection.rows(Lesson.objects.order_by('created_at', 'id')))
+
+
+def measure(fn, rows, repeat):
+    best = min(timed(fn) for _ in range(repeat))
+    return rows / best, best
+
+
+def timed(fn):
+    start = time.perf_counter()
+    fn()
+    return time.perf_counter() - start
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--lessons', type=int, default=50000)
+    parser.add_argument('--repeat', type=int, default=3)
+    args = parser.parse_args()
+
+    call_command('migrate', verbosity=0)
+    populate(args.lessons)
+    assert json.loads(instance_path()) == json.loads(projection_path()), 'both paths must produce the same JSON'
+
+    before, before_time = measure(instance_path, args.lessons, args.repeat)
+    after, after_time = measure(projection_path, args.lessons, args.repeat)
+    print(f'{args.lessons} lessons, best of {args.repeat}')
+    print(f'instances + JSONRenderer:     {before:>10,.0f} rows/s ({before_time:.2f}s)')
+    print(f'projection + ORJSONRenderer:  {after:>10,.0f} rows/s ({after_time:.2f}s)')
+    print(f'speedup: {after / before:.1f}x')
+
+
+if __name__ == '__main__':
+    main()
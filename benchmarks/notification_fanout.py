@@ -0,0 +1,62 @@
+"""Fan-out time for one notification to many admin devices: one
+messaging.send per token (the old path) against send_multicast batches.
+
+Both paths talk to a local fake FCM endpoint that answers each send after a
+fixed latency, so no Firebase credentials are needed:
+
+    python benchmarks/notification_fanout.py [--devices 300] [--latency 0.05]
+"""
+import argparse
+import os
+import sys
+import time
+
+import django
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'Belakoo_backend.settings')
+django.setup()
+
+from firebase_admin import messaging  # noqa: E402
+from utils.fcm_testing import FakeFCMServer  # noqa: E402
+from utils.notifications import FirebaseTransport, send_multicast  # noqa: E402
+
+
+def sequential_path(server, tokens):
+    for token in tokens:
+        messaging.send(
+            messaging.Message(notification=messaging.Notification(title='Title', body='Body'), token=token),
+            app=server.app,
+        )
+
+
+def multicast_path(server, tokens):
+    send_multicast(tokens, 'Title', 'Body', transport=FirebaseTransport(app=server.app))
+
+
+def measure(fn, tokens, latency):
+    with FakeFCMServer(latency=latency) as server:
+        start = time.perf_counter()
+        fn(server, tokens)
+        elapsed = time.perf_counter() - start
+        assert sorted(server.delivered) == sorted(tokens), 'every token must be delivered once'
+    return elapsed
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--devices', type=int, default=300)
+    parser.add_argument('--latency', type=float, default=0.05, help='Seconds the fake FCM takes per send')
+    args = parser.parse_args()
+
+    tokens = [f'device-{n}' for n in range(args.devices)]
+    before = measure(sequential_path, tokens, args.latency)
+    after = measure(multicast_path, tokens, args.latency)
+    print(f'{args.devices} devices, {args.latency * 1000:.0f} ms per FCM send')
+    print(f'one send per token:  {before:.2f}s')
+    print(f'send_multicast:      {after:.2f}s')
+    print(f'speedup: {before / after:.1f}x')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,106 @@
+"""Sheets/sec for parsing lesson worksheets: the per-label df.iterrows()
+scans the importer used before (the old path) against
+content_management.lesson_parser, over a corpus of synthetic worksheets.
+
+    python benchmarks/sheet_parser.py [--sheets 500] [--repeat 3]
+"""
+import argparse
+import os
+import random
+import sys
+import time
+
+import pandas as pd
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from content_management.lesson_parser import PHASE_FIELDS, TEXT_FIELDS, parse_lesson_sheet  # noqa: E402
+
+WIDTH = 6
+
+
+def synthetic_sheet(rng, n):
+    """A worksheet laid out like the lesson workbook, with filler rows and
+    the labels in varying columns."""
+    rows = [['LESSON CODE', f'LI.K1.C{n}.P1'] + [''] * (WIDTH - 2)]
+    labels = list(TEXT_FIELDS.values()) + [label for labels in PHASE_FIELDS.values() for label in labels]
+    for label in labels:
+        col = rng.randrange(0, 3)
+        row = [''] * WIDTH
+        row[col] = label
+        row[col + 1] = ' '.join(rng.choice(['sing', 'draw', 'count', 'read', 'share']) for _ in range(30))
+        rows.append(row)
+        rows.extend([f'note {rng.random():.6f}'] + [''] * (WIDTH - 1) for _ in range(rng.randrange(0, 3)))
+    rows.append(['RESOURCES', '', f'https://example.com/{n}'] + [''] * (WIDTH - 3))
+    return rows
+
+
+def legacy_parse(data):
+    df = pd.DataFrame(data)
+
+    def get_field_value(field_name):
+        for i, row in df.iterrows():
+            if field_name in row.values:
+                col_index = row.tolist().index(field_name)
+                if col_index + 1 < len(row):
+                    return row[col_index + 1]
+        return ''
+
+    def get_structured_field_value(field_name):
+        for i, row in df.iterrows():
+            if field_name in row.values:
+                col_index = row.tolist().index(field_name)
+                if col_index + 1 < len(row):
+                    return [{"title": field_name, "desc": row[col_index + 1]}]
+        return []
+
+    def get_resources_value(field_name):
+        for i, row in df.iterrows():
+            if field_name in row.values:
+                col_index = row.tolist().index(field_name)
+                if col_index + 2 < len(row):
+                    return row[col_index + 2]
+        return ''
+
+    fields = {name: get_field_value(label) for name, label in TEXT_FIELDS.items()}
+    for name, labels in PHASE_FIELDS.items():
+        fields[name] = []
+        for label in labels:
+            fields[name].extend(get_structured_field_value(label))
+    fields['resources'] = get_resources_value('RESOURCES')
+    return fields
+
+
+def measure(parse, corpus, repeat):
+    best = min(timed(parse, corpus) for _ in range(repeat))
+    return len(corpus) / best, best
+
+
+def timed(parse, corpus):
+    start = time.perf_counter()
+    for sheet in corpus:
+        parse(sheet)
+    return time.perf_counter() - start
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--sheets', type=int, default=500)
+    parser.add_argument('--repeat', type=int, default=3)
+    args = parser.parse_args()
+
+    rng = random.Random(0)
+    corpus = [synthetic_sheet(rng, n) for n in range(args.sheets)]
+    for sheet in corpus:
+        assert legacy_parse(sheet) == parse_lesson_sheet(sheet), 'both parsers must extract the same fields'
+
+    before, before_time = measure(legacy_parse, corpus, args.repeat)
+    after, after_time = measure(parse_lesson_sheet, corpus, args.repeat)
+    print(f'{args.sheets} worksheets, best of {args.repeat}')
+    print(f'iterrows() per label:  {before:>10,.0f} sheets/s ({before_time:.2f}s)')
+    print(f'lesson_parser:         {after:>10,.0f} sheets/s ({after_time:.2f}s)')
+    print(f'speedup: {after / before:.1f}x')
+
+
+if __name__ == '__main__':
+    main()
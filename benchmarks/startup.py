@@ -0,0 +1,67 @@
+"""Cold-start import cost of a web worker: loads the WSGI application and
+the URLconf (and so every view module) in a fresh interpreter under
+``python -X importtime``, and reports the wall time and the slowest imports.
+
+Uses the project settings with the database left unconfigured, as gunicorn
+would before serving its first request:
+
+    python benchmarks/startup.py [--repeat 5] [--top 15]
+"""
+import argparse
+import os
+import re
+import statistics
+import subprocess
+import sys
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+WORKER_BOOT = (
+    'import os; '
+    "os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'Belakoo_backend.settings'); "
+    'from Belakoo_backend.wsgi import application; '
+    'import Belakoo_backend.urls'
+)
+
+IMPORT_LINE = re.compile(r'import time:\s+(\d+)\s+\|\s+(\d+)\s+\|(\s*)(\S+)')
+
+
+def boot():
+    """Boot one worker; return (wall seconds, {top-level package: cumulative us})."""
+    start = time.perf_counter()
+    result = subprocess.run(
+        [sys.executable, '-X', 'importtime', '-c', WORKER_BOOT],
+        cwd=ROOT, capture_output=True, text=True,
+    )
+    elapsed = time.perf_counter() - start
+    if result.returncode:
+        sys.exit(result.stderr)
+    packages = {}
+    for line in result.stderr.splitlines():
+        match = IMPORT_LINE.match(line)
+        if match:
+            cumulative, name = int(match.group(2)), match.group(4)
+            package = name.split('.')[0]
+            # The outermost import of a package carries its full cumulative time
+            packages[package] = max(packages.get(package, 0), cumulative)
+    return elapsed, packages
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--repeat', type=int, default=5)
+    parser.add_argument('--top', type=int, default=15)
+    args = parser.parse_args()
+
+    runs = [boot() for _ in range(args.repeat)]
+    times = [elapsed for elapsed, _ in runs]
+    print(f'worker boot, {args.repeat} runs: median {statistics.median(times):.3f}s, best {min(times):.3f}s')
+    _, packages = min(runs, key=lambda run: run[0])
+    print(f'slowest top-level imports (cumulative, best run):')
+    for package, micros in sorted(packages.items(), key=lambda item: -item[1])[:args.top]:
+        print(f'  {package:<30} {micros / 1000:>8.1f} ms')
+
+
+if __name__ == '__main__':
+    main()
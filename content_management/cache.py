@@ -0,0 +1,148 @@
+import threading
+import time
+from django.core.cache import caches
+from django.db import transaction
+
+# Cached payloads are keyed by the version of the node they were built from.
+# Signals (see signals.py) bump a node's version whenever it or anything under
+# it changes, so an old payload can never be read again and simply expires.
+CACHE_ALIAS = 'curriculum'
+PAYLOAD_TIMEOUT = 60 * 60 * 24
+KEY_PREFIX = 'curriculum'
+STATS_KEYS = ('%s:stats:hits' % KEY_PREFIX, '%s:stats:misses' % KEY_PREFIX)
+# Hits and misses are counted in process and added to the shared counters at
+# most this often, so a cached GET does not pay a cache write of its own.
+STATS_FLUSH_INTERVAL = 10
+
+_stats_lock = threading.Lock()
+_pending_stats = [0, 0]
+_last_flush = time.monotonic()
+_version_lock = threading.Lock()
+_last_version = 0
+
+
+def _cache():
+    return caches[CACHE_ALIAS]
+
+
+def _version_key(node, node_id):
+    return f'{KEY_PREFIX}:v:{node}:{node_id}'
+
+
+def _fresh_version():
+    # A version is the time of the bump in nanoseconds, unique within the
+    # process. Bumps overwrite the key instead of incrementing it: incr is a
+    # get and a set on the file and local-memory backends, so two concurrent
+    # bumps could both write v + 1 and one invalidation would be lost. A key
+    # that was evicted comes back with a value no earlier payload used, and
+    # the value doubles as the node's Last-Modified (see conditional.py).
+    global _last_version
+    with _version_lock:
+        _last_version = max(time.time_ns(), _last_version + 1)
+        return _last_version
+
+
+def _incr(key, delta):
+    cache = _cache()
+    try:
+        cache.incr(key, delta)
+    except ValueError:
+        cache.set(key, delta, None)
+
+
+def _take_pending_stats():
+    global _last_flush
+    counts = tuple(_pending_stats)
+    _pending_stats[:] = [0, 0]
+    _last_flush = time.monotonic()
+    return counts
+
+
+def _count(index):
+    with _stats_lock:
+        _pending_stats[index] += 1
+        if time.monotonic() - _last_flush < STATS_FLUSH_INTERVAL:
+            return
+        counts = _take_pending_stats()
+    _add_stats(counts)
+
+
+def _add_stats(counts):
+    for key, count in zip(STATS_KEYS, counts):
+        if count:
+            _incr(key, count)
+
+
+def flush_cache_stats():
+    """Add this process's pending hit/miss counts to the shared counters."""
+    with _stats_lock:
+        counts = _take_pending_stats()
+    _add_stats(counts)
+
+
+def get_version(node, node_id=None):
+    cache = _cache()
+    key = _version_key(node, node_id)
+    version = cache.get(key)
+    if version is None:
+        cache.add(key, _fresh_version(), None)
+        version = cache.get(key)
+    return version
+
+
+def bump_versions(nodes):
+    """Invalidate every cached payload built from the given (node, id) pairs."""
+    _cache().set_many({
+        _version_key(node, node_id): _fresh_version()
+        for node, node_id in set(nodes)
+        if node_id is not None or node == 'campuses'
+    }, None)
+
+
+def bump_versions_on_commit(nodes):
+    """bump_versions once the current transaction commits.
+
+    Bumping earlier lets a concurrent reader pick up the new version, build
+    the payload from the rows still committed and cache that under it.
+    """
+    nodes = set(nodes)
+    transaction.on_commit(lambda: bump_versions(nodes))
+
+
+def get_or_build(node, node_id, build, name=None, track=True):
+    """Return the cached payload for a node, building and storing it on a miss.
+
+    ``name`` distinguishes several payloads cached under the same node version;
+    ``track=False`` keeps auxiliary lookups out of the hit-rate figures.
+    """
+    cache = _cache()
+    key = f'{KEY_PREFIX}:{name or node}:{node_id}:{get_version(node, node_id)}'
+    payload = cache.get(key)
+    if payload is not None:
+        if track:
+            _count(0)
+        return payload
+    if track:
+        _count(1)
+    payload = build()
+    cache.set(key, payload, PAYLOAD_TIMEOUT)
+    return payload
+
+
+def cache_stats():
+    flush_cache_stats()
+    counts = _cache().get_many(STATS_KEYS)
+    hits = counts.get(STATS_KEYS[0], 0)
+    misses = counts.get(STATS_KEYS[1], 0)
+    total = hits + misses
+    return {
+        'hits': hits,
+        'misses': misses,
+        'hit_rate': round(hits / total, 4) if total else None,
+    }
+
+
+def reset_cache_stats():
+    with _stats_lock:
+        _take_pending_stats()
+    _cache().delete_many(STATS_KEYS)
@@ -0,0 +1,83 @@
+import hashlib
+import time
+from datetime import datetime, timezone
+from functools import wraps
+from django.utils.cache import get_conditional_response
+from django.utils.http import http_date
+from .cache import get_version
+from .models import Lesson
+
+
+def make_etag(*parts):
+    return '"%s"' % hashlib.md5(':'.join(str(part) for part in parts).encode()).hexdigest()
+
+
+def conditional_get(validators):
+    """Answer If-None-Match / If-Modified-Since on an APIView GET with a 304.
+
+    ``validators(request, **kwargs)`` returns ``(etag, last_modified)`` and
+    must stay cheap: it runs before the view loads anything. ``last_modified``
+    may be a callable, in which case it is only evaluated when the client did
+    not send If-None-Match (which takes precedence) or a body is sent.
+    """
+    def decorator(method):
+        @wraps(method)
+        def wrapper(view, request, *args, **kwargs):
+            etag, last_modified = validators(request, **kwargs)
+            if etag is None:
+                return method(view, request, *args, **kwargs)
+
+            if callable(last_modified) and 'HTTP_IF_NONE_MATCH' not in request.META:
+                last_modified = last_modified()
+            timestamp = int(last_modified.timestamp()) if last_modified and not callable(last_modified) else None
+            not_modified = get_conditional_response(request, etag=etag, last_modified=timestamp)
+            if not_modified is not None:
+                not_modified['ETag'] = etag
+                return not_modified
+
+            response = method(view, request, *args, **kwargs)
+            if response.status_code == 200:
+                if callable(last_modified):
+                    last_modified = last_modified()
+                response['ETag'] = etag
+                if last_modified:
+                    response['Last-Modified'] = http_date(last_modified.timestamp())
+            return response
+        return wrapper
+    return decorator
+
+
+def version_last_modified(version):
+    """The time of the bump that produced a node version.
+
+    None while that is still the current second: HTTP dates have one-second
+    resolution, so another bump later in the same second would carry the same
+    Last-Modified and If-Modified-Since would miss it.
+    """
+    seconds = version // 10 ** 9
+    if seconds >= int(time.time()):
+        return None
+    return datetime.fromtimestamp(seconds, tz=timezone.utc)
+
+
+def node_validators(node):
+    """Validators for a cached tree node, both taken from its cache version,
+    so checking them costs no database query at all. The version is bumped
+    on any change under the node, deletes, renames and moves included."""
+    def validators(request, **kwargs):
+        node_id = kwargs.get(f'{node}_id')
+        version = get_version(node, node_id)
+        return make_etag(node, node_id, version), version_last_modified(version)
+    return validators
+
+
+def lesson_validators(request, lesson_id):
+    # The detail payload also shows the parent names, so they are part of the
+    # tag; the joins are on primary keys and no lesson content is read.
+    row = Lesson.objects.filter(id=lesson_id).values_list(
+        'last_update', 'proficiency__name', 'subject__name', 'grade__name'
+    ).first()
+    if row is None:
+        return None, None
+    last_update = row[0]
+    return make_etag('lesson', lesson_id, last_update.isoformat(), *row[1:]), last_update
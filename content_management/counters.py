@@ -0,0 +1,90 @@
+from django.db.models import Count, F, IntegerField, OuterRef, Q, Subquery, Value
+from django.db.models.functions import Coalesce
+from .models import LessonCounters, Campus, Grade, Subject, Proficiency, Lesson
+
+COUNTED_LEVELS = (
+    (Proficiency, 'proficiency'),
+    (Subject, 'subject'),
+    (Grade, 'grade'),
+    (Campus, 'grade__campus'),
+)
+
+
+def lesson_counts(is_done, verified, sign=1):
+    """The (lesson, done, verified) contribution of one lesson."""
+    return (sign, sign * bool(is_done), sign * bool(verified))
+
+
+def _increments(counts):
+    return {
+        field: F(field) + count
+        for field, count in zip(LessonCounters.COUNTER_FIELDS, counts)
+        if count
+    }
+
+
+def add_counts(model, node_id, counts):
+    """Add ``counts`` to the counters of a single node."""
+    updates = _increments(counts)
+    if updates:
+        model.objects.filter(id=node_id).update(**updates)
+
+
+def apply_counts(proficiency_id, subject_id, grade_id, counts):
+    """Add ``counts`` to a lesson's proficiency, subject, grade and campus.
+
+    Each level is one UPDATE with F() increments, so concurrent writers never
+    lose each other's changes. Call inside the transaction that changes the
+    lessons.
+    """
+    updates = _increments(counts)
+    if not updates:
+        return
+    Proficiency.objects.filter(id=proficiency_id).update(**updates)
+    Subject.objects.filter(id=subject_id).update(**updates)
+    Grade.objects.filter(id=grade_id).update(**updates)
+    Campus.objects.filter(grades__id=grade_id).update(**updates)
+
+
+def move_grade_counts(grade, old_campus_id):
+    """Move a grade's lessons from its old campus's counters to the new one's."""
+    counts = Grade.objects.filter(id=grade.id).values_list(*Grade.COUNTER_FIELDS).first()
+    if counts is None or not any(counts):
+        return
+    for campus_id, sign in ((old_campus_id, -1), (grade.campus_id, 1)):
+        Campus.objects.filter(id=campus_id).update(**{
+            field: F(field) + sign * value for field, value in zip(Grade.COUNTER_FIELDS, counts)
+        })
+
+
+def _expected(lesson_path):
+    lessons = Lesson.objects.filter(**{lesson_path: OuterRef('pk')}).order_by().values(lesson_path)
+    return {
+        field: Coalesce(Subquery(lessons.annotate(n=aggregate).values('n')), Value(0), output_field=IntegerField())
+        for field, aggregate in (
+            ('lesson_count', Count('id')),
+            ('done_count', Count('id', filter=Q(is_done=True))),
+            ('verified_count', Count('id', filter=Q(verified=True))),
+        )
+    }
+
+
+def rebuild_counters():
+    """Recount every node from the lesson table, one UPDATE per level."""
+    for model, lesson_path in COUNTED_LEVELS:
+        model.objects.update(**_expected(lesson_path))
+
+
+def counter_mismatches():
+    """Nodes whose stored counters differ from a fresh count."""
+    mismatches = []
+    for model, lesson_path in COUNTED_LEVELS:
+        expected = {f'expected_{field}': value for field, value in _expected(lesson_path).items()}
+        mismatch = Q()
+        for field in model.COUNTER_FIELDS:
+            mismatch |= ~Q(**{field: F(f'expected_{field}')})
+        rows = model.objects.annotate(**expected).filter(mismatch).values(
+            'id', *model.COUNTER_FIELDS, *expected
+        )
+        mismatches += [{'node': model.__name__.lower(), **row} for row in rows]
+    return mismatches
@@ -0,0 +1,33 @@
+from .projection import Projection
+
+
+class InvalidFieldset(ValueError):
+    pass
+
+
+class LessonFieldset:
+    """Payload keys of a lesson endpoint and the projection shape of each.
+
+    Only the selected keys are projected, so the SELECT list and joins are
+    limited to the columns the client asked for.
+    """
+
+    def __init__(self, shape):
+        self.shape = shape
+
+    def select(self, params):
+        """Return the payload keys chosen by ``?fields=`` or ``?exclude=``."""
+        fields = params.get('fields')
+        exclude = params.get('exclude')
+        if fields and exclude:
+            raise InvalidFieldset('Use either fields or exclude, not both.')
+        requested = [name.strip() for name in (fields or exclude or '').split(',') if name.strip()]
+        unknown = [name for name in requested if name not in self.shape]
+        if unknown:
+            raise InvalidFieldset(f"Unknown fields: {', '.join(unknown)}")
+        if fields:
+            return [name for name in self.shape if name in requested or name == 'id']
+        return [name for name in self.shape if name not in requested or name == 'id']
+
+    def projection(self, selected):
+        return Projection({name: self.shape[name] for name in selected})
@@ -0,0 +1,212 @@
+import hashlib
+import json
+from collections import Counter
+from django.db import IntegrityError, transaction
+from django.utils import timezone
+from .cache import bump_versions_on_commit
+from .counters import apply_counts
+from .lesson_parser import PHASE_FIELDS, TEXT_FIELDS, parse_lesson_code, parse_lesson_sheet
+from .models import Grade, Subject, Proficiency, Lesson
+
+# Lessons inserted per bulk_create, each batch in its own transaction
+IMPORT_BATCH_SIZE = 200
+# Subject codes mistyped in the workbook
+SUBJECT_CODE_FIXES = {'L1': 'LI'}
+NEW_SUBJECT_DEFAULTS = {
+    'name': 'Learning and Innovation',
+    'icon': 'https://drive.google.com/file/d/17MXDDSH42Xsfj7Q7pJqEaiTYAUKJlmUk/view?usp=drive_link',
+    'colorcode': '#00FF00',
+}
+# Lesson columns filled from the worksheet; an upsert rewrites only these
+CONTENT_FIELDS = ('name', *TEXT_FIELDS, *PHASE_FIELDS, 'resources')
+
+
+def content_hash(fields):
+    """sha256 of a lesson's imported content, independent of key order."""
+    content = json.dumps({field: fields.get(field) for field in CONTENT_FIELDS}, sort_keys=True, ensure_ascii=False)
+    return hashlib.sha256(content.encode()).hexdigest()
+
+
+class LessonImporter:
+    """Imports parsed lesson worksheets into a campus.
+
+    The grade/subject/proficiency hierarchy is loaded in three queries and
+    the missing nodes are created in bulk; lessons are then inserted with
+    bulk_create. Problems are reported per worksheet in ``error_details``
+    and do not stop the rest of the import.
+
+    With ``upsert`` a worksheet whose lesson already exists updates it
+    instead: lessons whose content hash is unchanged are skipped, the rest
+    are rewritten with bulk_update. Progress (is_done, verified, ...) is
+    never touched.
+    """
+
+    def __init__(self, campus, batch_size=IMPORT_BATCH_SIZE, upsert=False):
+        self.campus = campus
+        self.batch_size = batch_size
+        self.upsert = upsert
+        self.created_lessons = []
+        self.updated_lessons = []
+        self.unchanged_lessons = []
+        self.error_details = []
+
+    def run(self, sheets):
+        """Import ``{title: rows}``; the title of each worksheet is its lesson code."""
+        parsed = self.parse(sheets)
+        existing = Lesson.objects.filter(lesson_code__in=parsed).only(
+            'lesson_code', 'content_hash', 'proficiency_id', 'subject_id', 'grade_id'
+        )
+        changed = []
+        for lesson in existing:
+            _, fields = parsed.pop(lesson.lesson_code)
+            if not self.upsert:
+                self.error_details.append({
+                    'sheet': lesson.lesson_code,
+                    'lesson_code': lesson.lesson_code,
+                    'error': 'Lesson with this lesson code already exists.',
+                })
+            elif lesson.content_hash == fields['content_hash']:
+                self.unchanged_lessons.append(lesson.lesson_code)
+            else:
+                for field, value in fields.items():
+                    setattr(lesson, field, value)
+                changed.append(lesson)
+        if changed:
+            self.update(changed)
+        if parsed:
+            proficiencies = self.resolve_hierarchy({codes for codes, _ in parsed.values()})
+            self.insert([
+                self.build_lesson(lesson_code, codes, fields, proficiencies)
+                for lesson_code, (codes, fields) in parsed.items()
+            ])
+        return self.created_lessons, self.error_details
+
+    def parse(self, sheets):
+        parsed = {}
+        for title, rows in sheets.items():
+            try:
+                subject_code, grade_code, lesson_number, proficiency_code = parse_lesson_code(title)
+                subject_code = SUBJECT_CODE_FIXES.get(subject_code, subject_code)
+                fields = {'name': f"Lesson {lesson_number}", **parse_lesson_sheet(rows)}
+                fields['content_hash'] = content_hash(fields)
+                parsed[title] = ((grade_code, subject_code, proficiency_code), fields)
+            except Exception as e:
+                self.error_details.append({'sheet': title, 'error': str(e)})
+        return parsed
+
+    def resolve_hierarchy(self, code_paths):
+        """Map (grade, subject, proficiency) codes to Proficiency objects with
+        their subject and grade attached, creating whatever is missing."""
+        # Ordered so the lowest pk wins among duplicates, as filter().first() picked
+        grades = {grade.grade_code: grade for grade in Grade.objects.filter(campus=self.campus).order_by('-pk')}
+        subjects = {
+            (subject.grade_id, subject.subject_code): subject
+            for subject in Subject.objects.filter(grade__campus=self.campus).order_by('-pk')
+        }
+        proficiencies = {
+            (proficiency.subject_id, proficiency.proficiency_code): proficiency
+            for proficiency in Proficiency.objects.filter(subject__grade__campus=self.campus).order_by('-pk')
+        }
+
+        with transaction.atomic():
+            new_grades = [
+                Grade(grade_code=code, campus=self.campus, name=code)
+                for code in sorted({grade_code for grade_code, _, _ in code_paths} - set(grades))
+            ]
+            for grade in Grade.objects.bulk_create(new_grades):
+                grades[grade.grade_code] = grade
+
+            new_subjects = {}
+            for grade_code, subject_code, _ in code_paths:
+                key = (grades[grade_code].id, subject_code)
+                if key not in subjects and key not in new_subjects:
+                    new_subjects[key] = Subject(subject_code=subject_code, grade=grades[grade_code], **NEW_SUBJECT_DEFAULTS)
+            subjects.update(zip(new_subjects, Subject.objects.bulk_create(new_subjects.values())))
+
+            new_proficiencies = {}
+            for grade_code, subject_code, proficiency_code in code_paths:
+                subject = subjects[(grades[grade_code].id, subject_code)]
+                key = (subject.id, proficiency_code)
+                if key not in proficiencies and key not in new_proficiencies:
+                    new_proficiencies[key] = Proficiency(proficiency_code=proficiency_code, subject=subject, name=proficiency_code)
+            proficiencies.update(zip(new_proficiencies, Proficiency.objects.bulk_create(new_proficiencies.values())))
+
+            # bulk_create sends no signals
+            bump_versions_on_commit(
+                [('campuses', None), ('campus', self.campus.id)]
+                + [('grade', grade.id) for grade in new_grades]
+                + [node for subject in new_subjects.values() for node in (('subject', subject.id), ('grade', subject.grade_id))]
+                + [
+                    node for proficiency in new_proficiencies.values()
+                    for node in (('subject', proficiency.subject_id), ('grade', proficiency.subject.grade_id))
+                ]
+            )
+
+        resolved = {}
+        for grade_code, subject_code, proficiency_code in code_paths:
+            grade = grades[grade_code]
+            subject = subjects[(grade.id, subject_code)]
+            proficiency = proficiencies[(subject.id, proficiency_code)]
+            proficiency.subject = subject
+            subject.grade = grade
+            resolved[(grade_code, subject_code, proficiency_code)] = proficiency
+        return resolved
+
+    def build_lesson(self, lesson_code, codes, fields, proficiencies):
+        proficiency = proficiencies[codes]
+        return Lesson(
+            lesson_code=lesson_code,
+            subject=proficiency.subject,
+            grade=proficiency.subject.grade,
+            proficiency=proficiency,
+            **fields
+        )
+
+    def insert(self, lessons):
+        for start in range(0, len(lessons), self.batch_size):
+            batch = lessons[start:start + self.batch_size]
+            try:
+                with transaction.atomic():
+                    Lesson.objects.bulk_create(batch)
+                    self.count_inserted(batch)
+            except IntegrityError:
+                # Another import raced this one; fall back to row by row so
+                # only the conflicting worksheets are reported.
+                for lesson in batch:
+                    self.insert_one(lesson)
+                continue
+            self.created_lessons += [{'sheet': lesson.lesson_code, 'lesson_code': lesson.lesson_code} for lesson in batch]
+
+    def insert_one(self, lesson):
+        try:
+            with transaction.atomic():
+                lesson.save(force_insert=True)
+        except Exception as e:
+            self.error_details.append({'sheet': lesson.lesson_code, 'lesson_code': lesson.lesson_code, 'error': str(e)})
+            return
+        self.created_lessons.append({'sheet': lesson.lesson_code, 'lesson_code': lesson.lesson_code})
+
+    def update(self, lessons):
+        now = timezone.now()
+        for lesson in lessons:
+            lesson.last_update = now
+        for start in range(0, len(lessons), self.batch_size):
+            batch = lessons[start:start + self.batch_size]
+            with transaction.atomic():
+                Lesson.objects.bulk_update(batch, [*CONTENT_FIELDS, 'content_hash', 'last_update'])
+                # bulk_update sends no signals
+                bump_versions_on_commit(
+                    (node, node_id)
+                    for lesson in batch
+                    for node, node_id in zip(('proficiency', 'subject', 'grade'), (lesson.proficiency_id, lesson.subject_id, lesson.grade_id))
+                )
+            self.updated_lessons += [{'sheet': lesson.lesson_code, 'lesson_code': lesson.lesson_code} for lesson in batch]
+
+    def count_inserted(self, lessons):
+        """Progress counters and cached trees for lessons added by bulk_create."""
+        groups = Counter((lesson.proficiency_id, lesson.subject_id, lesson.grade_id) for lesson in lessons)
+        for parents, count in groups.items():
+            apply_counts(*parents, (count, 0, 0))
+        bump_versions_on_commit(
+            (node, node_id) for parents in groups for node, node_id in zip(('proficiency', 'subject', 'grade'), parents)
+        )
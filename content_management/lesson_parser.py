@@ -0,0 +1,87 @@
+"""Extracts lesson fields from the cell values of a lesson worksheet.
+
+A worksheet holds label cells ('OBJECTIVE', 'HOOK', ...) with the value in
+the next cell to the right (two to the right for 'RESOURCES'). The labels
+are located in one pass over the cells; every field is then a lookup.
+"""
+import numpy as np
+from .sheets import pad_rows
+
+TEXT_FIELDS = {
+    'objective': 'OBJECTIVE',
+    'duration': 'Duration',
+    'specific_learning_outcome': 'Specific Learning Outcome ',
+    'behavioral_outcome': 'Behavioural Outcome',
+    'materials_required': 'Materials Required',
+}
+PHASE_FIELDS = {
+    'activate': ('HOOK', 'ASSESS', 'INFORM'),
+    'acquire': ('ENGAGE', 'TEACH'),
+    'apply': ('GUIDED PRACTICE', 'INDEPENDENT PRACTICE'),
+    'assess': ('ASSESSMENT', 'SHARE'),
+}
+RESOURCES_LABEL = 'RESOURCES'
+LABELS = [*TEXT_FIELDS.values(), *(label for labels in PHASE_FIELDS.values() for label in labels), RESOURCES_LABEL]
+
+
+class SheetFormatError(ValueError):
+    pass
+
+
+def parse_lesson_code(lesson_code):
+    """Split 'LI.K1.C3.P1' into (subject, grade, lesson number, proficiency) codes."""
+    if not lesson_code:
+        raise SheetFormatError('LESSON CODE not found')
+    code_parts = lesson_code.split('.')
+    if len(code_parts) != 4:
+        raise SheetFormatError('Invalid LESSON CODE format')
+    return tuple(code_parts)
+
+
+class LabelIndex:
+    """Positions of the known labels in a worksheet.
+
+    ``positions[label]`` lists, in row order, the (row, column) of the
+    label's first occurrence in each row that contains it.
+    """
+
+    def __init__(self, rows):
+        # np.array needs a rectangle; the rows of a CSV export can be ragged
+        rows = pad_rows(rows)
+        self.rows = rows
+        self.width = len(rows[0]) if rows else 0
+        self.positions = {}
+        if not rows:
+            return
+        cells = np.array(rows, dtype=object)
+        found_rows, found_cols = np.nonzero(np.isin(cells, LABELS))
+        seen = set()
+        # np.nonzero returns row-major order, so the first hit per
+        # (label, row) is the leftmost one.
+        for row, col in zip(found_rows.tolist(), found_cols.tolist()):
+            label = rows[row][col]
+            if (label, row) not in seen:
+                seen.add((label, row))
+                self.positions.setdefault(label, []).append((row, col))
+
+    def value(self, label, offset=1, default=''):
+        """The cell ``offset`` columns right of the first occurrence of
+        ``label`` that has such a cell."""
+        for row, col in self.positions.get(label, ()):
+            if col + offset < self.width:
+                return self.rows[row][col + offset]
+        return default
+
+
+def parse_lesson_sheet(rows):
+    """Lesson model field values from a worksheet's padded rows."""
+    index = LabelIndex(rows)
+    fields = {name: index.value(label) for name, label in TEXT_FIELDS.items()}
+    for name, labels in PHASE_FIELDS.items():
+        fields[name] = []
+        for label in labels:
+            desc = index.value(label, default=None)
+            if desc is not None:
+                fields[name].append({'title': label, 'desc': desc})
+    fields['resources'] = index.value(RESOURCES_LABEL, offset=2)
+    return fields
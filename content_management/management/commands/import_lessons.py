@@ -0,0 +1,30 @@
+from django.core.management.base import BaseCommand, CommandError
+from content_management.models import Campus
+from content_management.sheets import SKIPPED_SHEETS, GoogleSheetsSource
+
+
+class Command(BaseCommand):
+    help = 'Imports the lesson workbook, updating the lessons whose worksheet changed since the last import'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--campus', default='c1', help='Code of the campus new lessons are added to')
+        parser.add_argument('--create-only', action='store_true', help='Report existing lessons instead of updating them')
+
+    def handle(self, *args, **options):
+        from content_management.importer import LessonImporter
+
+        try:
+            campus = Campus.objects.get(campus_code=options['campus'])
+        except Campus.DoesNotExist:
+            raise CommandError(f"Campus {options['campus']} not found")
+
+        source = GoogleSheetsSource()
+        sheets = source.fetch([title for title in source.titles() if title not in SKIPPED_SHEETS])
+        importer = LessonImporter(campus, upsert=not options['create_only'])
+        created_lessons, error_details = importer.run(sheets)
+        for error in error_details:
+            self.stderr.write(f"{error['sheet']}: {error['error']}")
+        self.stdout.write(self.style.SUCCESS(
+            f'{len(created_lessons)} created, {len(importer.updated_lessons)} updated, '
+            f'{len(importer.unchanged_lessons)} unchanged, {len(error_details)} failed'
+        ))
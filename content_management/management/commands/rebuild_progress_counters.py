@@ -0,0 +1,26 @@
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from content_management.counters import counter_mismatches, rebuild_counters
+
+
+class Command(BaseCommand):
+    help = 'Recounts the lesson progress counters of every campus, grade, subject and proficiency'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--check', action='store_true', help='Only report counters that are out of date')
+
+    def handle(self, *args, **options):
+        if options['check']:
+            mismatches = counter_mismatches()
+            for row in mismatches:
+                self.stdout.write(self.style.WARNING(
+                    f"{row['node']} {row['id']}: stored "
+                    f"{row['lesson_count']}/{row['done_count']}/{row['verified_count']}, expected "
+                    f"{row['expected_lesson_count']}/{row['expected_done_count']}/{row['expected_verified_count']}"
+                ))
+            if not mismatches:
+                self.stdout.write(self.style.SUCCESS('All progress counters are up to date'))
+            return
+        with transaction.atomic():
+            rebuild_counters()
+        self.stdout.write(self.style.SUCCESS('Rebuilt progress counters'))
@@ -0,0 +1,27 @@
+# Generated by Django 5.1.1 on 2026-10-18 11:10
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('content_management', '0010_alter_lesson_duration'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='lesson',
+            index=models.Index(fields=['created_at', 'id'], name='lesson_created_id_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='lesson',
+            index=models.Index(fields=['is_done', 'verified', 'created_at', 'id'], name='lesson_status_created_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='lesson',
+            index=models.Index(fields=['completed_by', 'created_at', 'id'], name='lesson_completer_created_idx'),
+        ),
+    ]
@@ -0,0 +1,54 @@
+import json
+
+from django.db import migrations
+from django.utils import timezone
+
+PHASE_FIELDS = ('activate', 'acquire', 'apply', 'assess')
+BATCH_SIZE = 500
+
+
+def decode(value):
+    # Older writes stored json.dumps(...) in the JSONField, i.e. a JSON string
+    # holding the encoded list. Anything that doesn't decode to a list or an
+    # object is left alone.
+    decoded = value
+    while isinstance(decoded, str):
+        try:
+            decoded = json.loads(decoded)
+        except ValueError:
+            return value
+    return decoded if isinstance(decoded, (list, dict)) else value
+
+
+def decode_phase_fields(apps, schema_editor):
+    Lesson = apps.get_model('content_management', 'Lesson')
+    now = timezone.now()
+    batch = []
+    for lesson in Lesson.objects.only('id', *PHASE_FIELDS).iterator(chunk_size=BATCH_SIZE):
+        changed = False
+        for field in PHASE_FIELDS:
+            value = getattr(lesson, field)
+            decoded = decode(value)
+            if decoded is not value:
+                setattr(lesson, field, decoded)
+                changed = True
+        if changed:
+            # Bump last_update so clients holding the old ETag refetch.
+            lesson.last_update = now
+            batch.append(lesson)
+        if len(batch) == BATCH_SIZE:
+            Lesson.objects.bulk_update(batch, PHASE_FIELDS + ('last_update',))
+            batch = []
+    if batch:
+        Lesson.objects.bulk_update(batch, PHASE_FIELDS + ('last_update',))
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('content_management', '0012_sync_timestamps_and_tombstones'),
+    ]
+
+    operations = [
+        migrations.RunPython(decode_phase_fields, migrations.RunPython.noop),
+    ]
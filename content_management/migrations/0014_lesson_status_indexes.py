@@ -0,0 +1,31 @@
+# Generated by Django 5.1.1 on 2026-10-18 11:18
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('content_management', '0013_decode_lesson_phase_json'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='lesson',
+            index=models.Index(condition=models.Q(('is_done', True), ('verified', False)), fields=['completed_at'], name='lesson_unverified_queue_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='lesson',
+            index=models.Index(fields=['proficiency', 'lesson_code'], name='lesson_proficiency_code_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='lesson',
+            index=models.Index(fields=['grade', 'subject'], name='lesson_grade_subject_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='lesson',
+            index=models.Index(fields=['completed_by', 'completed_at'], name='lesson_completer_completed_idx'),
+        ),
+    ]
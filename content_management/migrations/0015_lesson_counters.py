@@ -0,0 +1,95 @@
+# Generated by Django 5.1.1 on 2026-10-18 11:21
+
+from django.db import migrations, models
+from django.db.models import Count, IntegerField, OuterRef, Q, Subquery, Value
+from django.db.models.functions import Coalesce
+
+
+def count_lessons(apps, schema_editor):
+    Lesson = apps.get_model('content_management', 'Lesson')
+    for model_name, lesson_path in (
+        ('Proficiency', 'proficiency'),
+        ('Subject', 'subject'),
+        ('Grade', 'grade'),
+        ('Campus', 'grade__campus'),
+    ):
+        lessons = Lesson.objects.filter(**{lesson_path: OuterRef('pk')}).order_by().values(lesson_path)
+        apps.get_model('content_management', model_name).objects.update(**{
+            field: Coalesce(Subquery(lessons.annotate(n=aggregate).values('n')), Value(0), output_field=IntegerField())
+            for field, aggregate in (
+                ('lesson_count', Count('id')),
+                ('done_count', Count('id', filter=Q(is_done=True))),
+                ('verified_count', Count('id', filter=Q(verified=True))),
+            )
+        })
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('content_management', '0014_lesson_status_indexes'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='campus',
+            name='done_count',
+            field=models.IntegerField(default=0),
+        ),
+        migrations.AddField(
+            model_name='campus',
+            name='lesson_count',
+            field=models.IntegerField(default=0),
+        ),
+        migrations.AddField(
+            model_name='campus',
+            name='verified_count',
+            field=models.IntegerField(default=0),
+        ),
+        migrations.AddField(
+            model_name='grade',
+            name='done_count',
+            field=models.IntegerField(default=0),
+        ),
+        migrations.AddField(
+            model_name='grade',
+            name='lesson_count',
+            field=models.IntegerField(default=0),
+        ),
+        migrations.AddField(
+            model_name='grade',
+            name='verified_count',
+            field=models.IntegerField(default=0),
+        ),
+        migrations.AddField(
+            model_name='proficiency',
+            name='done_count',
+            field=models.IntegerField(default=0),
+        ),
+        migrations.AddField(
+            model_name='proficiency',
+            name='lesson_count',
+            field=models.IntegerField(default=0),
+        ),
+        migrations.AddField(
+            model_name='proficiency',
+            name='verified_count',
+            field=models.IntegerField(default=0),
+        ),
+        migrations.AddField(
+            model_name='subject',
+            name='done_count',
+            field=models.IntegerField(default=0),
+        ),
+        migrations.AddField(
+            model_name='subject',
+            name='lesson_count',
+            field=models.IntegerField(default=0),
+        ),
+        migrations.AddField(
+            model_name='subject',
+            name='verified_count',
+            field=models.IntegerField(default=0),
+        ),
+        migrations.RunPython(count_lessons, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,31 @@
+# Generated by Django 5.1.1 on 2026-10-18 12:11
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('content_management', '0016_lesson_content_hash'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='lesson',
+            index=models.Index(fields=['verified', 'created_at', 'id'], name='lesson_verified_created_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='lesson',
+            index=models.Index(fields=['grade', 'created_at', 'id'], name='lesson_grade_created_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='lesson',
+            index=models.Index(fields=['subject', 'created_at', 'id'], name='lesson_subject_created_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='lesson',
+            index=models.Index(fields=['proficiency', 'created_at', 'id'], name='lesson_proficiency_created_idx'),
+        ),
+    ]
@@ -1,14 +1,58 @@
-from django.db import models
+from django.db import models, transaction
 import uuid
 import json
 from django.conf import settings
 from user_management.models import User
 
-class Campus(models.Model):
+class CurriculumQuerySet(models.QuerySet):
+    def delete(self):
+        # The signal handlers' bookkeeping for everything the delete cascades
+        # to is batched and written once (see signals.deletion_batch).
+        from .signals import deletion_batch
+
+        with deletion_batch():
+            return super().delete()
+
+
+class LessonCounters(models.Model):
+    """Lesson totals under a node, kept current by content_management.counters.
+
+    Grade, subject and proficiency counts follow the lesson's own foreign
+    keys; campus counts follow the lesson's grade.
+    """
+    COUNTER_FIELDS = ('lesson_count', 'done_count', 'verified_count')
+
+    lesson_count = models.IntegerField(default=0)
+    done_count = models.IntegerField(default=0)
+    verified_count = models.IntegerField(default=0)
+
+    objects = CurriculumQuerySet.as_manager()
+
+    class Meta:
+        abstract = True
+
+    def save(self, *args, **kwargs):
+        # Counters only ever change through F() increments; writing back the
+        # values loaded with the instance would undo concurrent increments.
+        if not self._state.adding and kwargs.get('update_fields') is None:
+            kwargs['update_fields'] = [
+                field.name for field in self._meta.concrete_fields
+                if not field.primary_key and field.name not in self.COUNTER_FIELDS
+            ]
+        super().save(*args, **kwargs)
+
+    def delete(self, *args, **kwargs):
+        from .signals import deletion_batch
+
+        with deletion_batch():
+            return super().delete(*args, **kwargs)
+
+class Campus(LessonCounters):
     id = models.UUIDField(primary_key=True, default=uuid.uuid4, editable=False)
     campus_code = models.CharField(max_length=10, unique=True)
     name = models.CharField(max_length=255)
     description = models.TextField()
+    updated_at = models.DateTimeField(auto_now=True)
 
     class Meta:
         verbose_name_plural = "Campuses"
@@ -16,31 +60,34 @@ class Campus(models.Model):
     def __str__(self):
         return self.name
 
-class Grade(models.Model):
+class Grade(LessonCounters):
     id = models.UUIDField(primary_key=True, default=uuid.uuid4, editable=False)
     grade_code = models.CharField(max_length=10)
     name = models.CharField(max_length=255)
     campus = models.ForeignKey(Campus, on_delete=models.CASCADE, related_name='grades')
+    updated_at = models.DateTimeField(auto_now=True)
 
     def __str__(self):
         return self.name
 
-class Subject(models.Model):
+class Subject(LessonCounters):
     id = models.UUIDField(primary_key=True, default=uuid.uuid4, editable=False)
     subject_code = models.CharField(max_length=10)
     name = models.CharField(max_length=255)
     icon = models.URLField()
     grade = models.ForeignKey(Grade, on_delete=models.CASCADE, related_name='subjects')
     colorcode = models.CharField(max_length=10)
+    updated_at = models.DateTimeField(auto_now=True)
 
     def __str__(self):
         return self.name
 
-class Proficiency(models.Model):
+class Proficiency(LessonCounters):
     id = models.UUIDField(primary_key=True, default=uuid.uuid4, editable=False)
     proficiency_code = models.CharField(max_length=10)
     name = models.CharField(max_length=255)
     subject = models.ForeignKey(Subject, on_delete=models.CASCADE, related_name='proficiencies')
+    updated_at = models.DateTimeField(auto_now=True)
 
     class Meta:
         verbose_name_plural = "Proficiencies"
@@ -71,6 +118,60 @@ class Lesson(models.Model):
     created_at = models.DateTimeField(auto_now_add=True)
     completed_at = models.DateTimeField(null=True, blank=True)
     last_update = models.DateTimeField(auto_now=True)
+    # sha256 of the worksheet content last imported; see importer.content_hash
+    content_hash = models.CharField(max_length=64, blank=True, default='')
+
+    objects = CurriculumQuerySet.as_manager()
+
+    class Meta:
+        indexes = [
+            # Keyset pagination order for the admin lesson listing
+            models.Index(fields=['created_at', 'id'], name='lesson_created_id_idx'),
+            models.Index(fields=['is_done', 'verified', 'created_at', 'id'], name='lesson_status_created_idx'),
+            models.Index(fields=['completed_by', 'created_at', 'id'], name='lesson_completer_created_idx'),
+            models.Index(fields=['verified', 'created_at', 'id'], name='lesson_verified_created_idx'),
+            models.Index(fields=['grade', 'created_at', 'id'], name='lesson_grade_created_idx'),
+            models.Index(fields=['subject', 'created_at', 'id'], name='lesson_subject_created_idx'),
+            models.Index(fields=['proficiency', 'created_at', 'id'], name='lesson_proficiency_created_idx'),
+            models.Index(fields=['last_update'], name='lesson_last_update_idx'),
+            # Admin review queue: completed lessons awaiting verification
+            models.Index(
+                fields=['completed_at'],
+                condition=models.Q(is_done=True, verified=False),
+                name='lesson_unverified_queue_idx',
+            ),
+            models.Index(fields=['proficiency', 'lesson_code'], name='lesson_proficiency_code_idx'),
+            models.Index(fields=['grade', 'subject'], name='lesson_grade_subject_idx'),
+            models.Index(fields=['completed_by', 'completed_at'], name='lesson_completer_completed_idx'),
+        ]
+
+    # The progress counters are updated from post_save/post_delete; keep them
+    # in the same transaction as the lesson row.
+    def save(self, *args, **kwargs):
+        with transaction.atomic():
+            super().save(*args, **kwargs)
+
+    def delete(self, *args, **kwargs):
+        from .signals import deletion_batch
+
+        with deletion_batch():
+            return super().delete(*args, **kwargs)
 
     def __str__(self):
         return self.lesson_code
+
+
+class Tombstone(models.Model):
+    """Records a deleted curriculum node so mobile clients can drop it on sync."""
+    node = models.CharField(max_length=20)
+    object_id = models.UUIDField()
+    campus_id = models.UUIDField()
+    deleted_at = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['campus_id', 'deleted_at'], name='tombstone_campus_deleted_idx'),
+        ]
+
+    def __str__(self):
+        return f'{self.node} {self.object_id}'
@@ -0,0 +1,59 @@
+import base64
+import binascii
+import uuid
+from operator import attrgetter
+from django.db.models import Q
+from django.utils.dateparse import parse_datetime
+
+DEFAULT_PAGE_SIZE = 50
+MAX_PAGE_SIZE = 200
+
+
+class InvalidPageRequest(ValueError):
+    pass
+
+
+def encode_cursor(created_at, pk):
+    return base64.urlsafe_b64encode(f'{created_at.isoformat()}|{pk}'.encode()).decode()
+
+
+def decode_cursor(cursor):
+    try:
+        created_at, pk = base64.urlsafe_b64decode(cursor.encode()).decode().split('|')
+        created_at = parse_datetime(created_at)
+        pk = uuid.UUID(pk)
+    except (binascii.Error, UnicodeDecodeError, ValueError):
+        raise InvalidPageRequest('Invalid cursor.')
+    if created_at is None:
+        raise InvalidPageRequest('Invalid cursor.')
+    return created_at, pk
+
+
+def parse_page_size(value):
+    if value in (None, ''):
+        return DEFAULT_PAGE_SIZE
+    try:
+        page_size = int(value)
+    except ValueError:
+        raise InvalidPageRequest('page_size must be an integer.')
+    if page_size < 1:
+        raise InvalidPageRequest('page_size must be positive.')
+    return min(page_size, MAX_PAGE_SIZE)
+
+
+def keyset_page(queryset, cursor=None, page_size=DEFAULT_PAGE_SIZE, key=attrgetter('created_at', 'id')):
+    """Return ``(rows, next_cursor)`` for one page ordered by (created_at, id).
+
+    Pages are found by seeking past the last row of the previous page, so the
+    cost of a page does not depend on how deep into the table it is. ``key``
+    reads (created_at, id) from a row, e.g. ``itemgetter(-2, -1)`` for
+    ``values_list()`` rows.
+    """
+    queryset = queryset.order_by('created_at', 'id')
+    if cursor:
+        created_at, pk = decode_cursor(cursor)
+        queryset = queryset.filter(Q(created_at__gt=created_at) | Q(created_at=created_at, id__gt=pk))
+    rows = list(queryset[:page_size + 1])
+    if len(rows) <= page_size:
+        return rows, None
+    return rows[:page_size], encode_cursor(*key(rows[page_size - 1]))
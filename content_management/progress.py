@@ -0,0 +1,45 @@
+from .models import Campus, Grade, Subject, Proficiency
+
+
+def _counts(node):
+    total, done, verified = node.pop('lesson_count'), node.pop('done_count'), node.pop('verified_count')
+    node.update({
+        'total': total,
+        'done': done,
+        'verified': verified,
+        'done_pct': round(100 * done / total, 1) if total else 0.0,
+        'verified_pct': round(100 * verified / total, 1) if total else 0.0,
+    })
+    return node
+
+
+def campus_progress(campus_id):
+    """Total, done and verified lesson counts for a campus and every grade,
+    subject and proficiency under it, or None if the campus does not exist.
+
+    The counts are read from the counter columns kept up to date by the lesson
+    signals, so the cost depends on the number of nodes, not lessons.
+    """
+    campus = Campus.objects.filter(id=campus_id).values('id', 'campus_code', 'name', *Campus.COUNTER_FIELDS).first()
+    if campus is None:
+        return None
+    grades = {
+        row['id']: {**_counts(row), 'subjects': []}
+        for row in Grade.objects.filter(campus_id=campus_id).order_by('grade_code').values(
+            'id', 'name', 'grade_code', *Grade.COUNTER_FIELDS
+        )
+    }
+    subjects = {}
+    for row in Subject.objects.filter(grade__campus_id=campus_id).order_by('subject_code').values(
+        'id', 'name', 'subject_code', 'grade_id', *Subject.COUNTER_FIELDS
+    ):
+        subject = subjects[row['id']] = {**_counts(row), 'proficiencies': []}
+        grades[subject.pop('grade_id')]['subjects'].append(subject)
+    for row in Proficiency.objects.filter(subject__grade__campus_id=campus_id).order_by('proficiency_code').values(
+        'id', 'name', 'proficiency_code', 'subject_id', *Proficiency.COUNTER_FIELDS
+    ):
+        proficiency = _counts(row)
+        subjects[proficiency.pop('subject_id')]['proficiencies'].append(proficiency)
+    campus = _counts(campus)
+    campus['grades'] = list(grades.values())
+    return campus
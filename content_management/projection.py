@@ -0,0 +1,45 @@
+class Projection:
+    """Builds payload dicts straight from ``values_list()`` tuples, without
+    creating model instances.
+
+    ``shape`` maps payload keys to ORM lookups (``'subject__name'``) or to
+    nested shapes. A nested object whose ``id`` is None, i.e. a null foreign
+    key, renders as None. UUIDs and datetimes are left as they are; the
+    renderer serializes them.
+    """
+
+    def __init__(self, shape):
+        self.lookups = []
+        self._build = self._compile(shape, nested=False)
+
+    def _compile(self, shape, nested):
+        parts = []
+        for key, spec in shape.items():
+            if isinstance(spec, dict):
+                parts.append((key, self._compile(spec, nested=True)))
+            else:
+                parts.append((key, len(self.lookups)))
+                self.lookups.append(spec)
+        null_index = dict(parts).get('id') if nested else None
+        if isinstance(null_index, int):
+            def build(row):
+                if row[null_index] is None:
+                    return None
+                return {key: part(row) if callable(part) else row[part] for key, part in parts}
+        else:
+            def build(row):
+                return {key: part(row) if callable(part) else row[part] for key, part in parts}
+        return build
+
+    def build(self, row):
+        """Build one payload dict. Extra trailing values in ``row`` are ignored."""
+        return self._build(row)
+
+    def rows(self, queryset, *extra):
+        """Evaluate ``queryset`` and return its payload dicts."""
+        return [self._build(row) for row in queryset.values_list(*self.lookups, *extra)]
+
+    def iterator(self, queryset, chunk_size=2000):
+        """Like rows(), but streamed from a server-side cursor."""
+        for row in queryset.values_list(*self.lookups).iterator(chunk_size=chunk_size):
+            yield self._build(row)
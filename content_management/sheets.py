@@ -0,0 +1,93 @@
+import csv
+import os
+
+LESSON_WORKBOOK_URL = 'https://docs.google.com/spreadsheets/d/1nEyg7CFFocOWb4o_rgnUD7aBb1xD0Y44IMtUq4YHQCc'
+CREDENTIALS_FILE = 'belakoo-fdc48-de4dfbe50d3e.json'
+SHEETS_SCOPE = ['https://spreadsheets.google.com/feeds', 'https://www.googleapis.com/auth/drive']
+# Worksheets of the lesson workbook that are not lessons
+SKIPPED_SHEETS = ('Instr & Obj',)
+# Worksheet ranges fetched per values:batchGet request
+FETCH_BATCH_SIZE = 100
+
+
+def pad_rows(rows):
+    """Pad ragged rows with '' to a rectangle, as get_all_values() returns them."""
+    width = max((len(row) for row in rows), default=0)
+    return [list(row) + [''] * (width - len(row)) for row in rows]
+
+
+class WorkbookSource:
+    """Where the importer reads lesson worksheets from.
+
+    ``titles()`` lists the worksheets and ``fetch(titles)`` returns
+    ``{title: rows}`` with each worksheet's cell values as padded lists of
+    strings.
+    """
+
+    def titles(self):
+        raise NotImplementedError
+
+    def fetch(self, titles):
+        raise NotImplementedError
+
+
+class GoogleSheetsSource(WorkbookSource):
+    """Reads a Google Sheets workbook, FETCH_BATCH_SIZE worksheets per
+    values:batchGet request instead of one request per worksheet."""
+
+    def __init__(self, url=LESSON_WORKBOOK_URL, keyfile=CREDENTIALS_FILE, batch_size=FETCH_BATCH_SIZE):
+        self.url = url
+        self.keyfile = keyfile
+        self.batch_size = batch_size
+        self._spreadsheet = None
+
+    @property
+    def spreadsheet(self):
+        if self._spreadsheet is None:
+            import gspread
+            from oauth2client.service_account import ServiceAccountCredentials
+
+            creds = ServiceAccountCredentials.from_json_keyfile_name(self.keyfile, SHEETS_SCOPE)
+            self._spreadsheet = gspread.authorize(creds).open_by_url(self.url)
+        return self._spreadsheet
+
+    def titles(self):
+        return [worksheet.title for worksheet in self.spreadsheet.worksheets()]
+
+    def fetch(self, titles):
+        from gspread.utils import absolute_range_name
+
+        sheets = {}
+        for start in range(0, len(titles), self.batch_size):
+            batch = titles[start:start + self.batch_size]
+            response = self.spreadsheet.values_batch_get([absolute_range_name(title) for title in batch])
+            # valueRanges come back in request order; empty sheets have no 'values'
+            for title, value_range in zip(batch, response.get('valueRanges', [])):
+                sheets[title] = pad_rows(value_range.get('values', []))
+        return sheets
+
+
+class FixtureSource(WorkbookSource):
+    """An in-memory workbook for tests and benchmarks: ``{title: rows}``.
+    ``fetches`` counts fetch() calls."""
+
+    def __init__(self, sheets):
+        self.sheets = sheets
+        self.fetches = 0
+
+    @classmethod
+    def from_directory(cls, path):
+        """One worksheet per ``<title>.csv`` file in ``path``."""
+        sheets = {}
+        for name in sorted(os.listdir(path)):
+            if name.endswith('.csv'):
+                with open(os.path.join(path, name), newline='') as f:
+                    sheets[name[:-len('.csv')]] = list(csv.reader(f))
+        return cls(sheets)
+
+    def titles(self):
+        return list(self.sheets)
+
+    def fetch(self, titles):
+        self.fetches += 1
+        return {title: pad_rows(self.sheets[title]) for title in titles}
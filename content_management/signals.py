@@ -0,0 +1,276 @@
+import threading
+from collections import defaultdict
+from contextlib import contextmanager
+from django.db import transaction
+from django.db.models.signals import pre_save, post_save, post_delete
+from django.dispatch import receiver
+from django.utils import timezone
+from .cache import bump_versions_on_commit
+from .counters import add_counts, apply_counts, lesson_counts, move_grade_counts
+from .models import Campus, Grade, Subject, Proficiency, Lesson, Tombstone
+
+# Parent columns whose old values must also be invalidated when a node moves.
+PARENT_FIELDS = {
+    Grade: ('campus_id',),
+    Subject: ('grade_id',),
+    Proficiency: ('subject_id',),
+    Lesson: ('proficiency_id', 'subject_id', 'grade_id'),
+}
+PARENT_MODELS = {'campus_id': Campus, 'grade_id': Grade, 'subject_id': Subject, 'proficiency_id': Proficiency}
+# Descendants (model, lookup to the node, sync timestamp) of each node.
+SUBTREES = {
+    Grade: (
+        (Subject, 'grade', 'updated_at'),
+        (Proficiency, 'subject__grade', 'updated_at'),
+        (Lesson, 'grade', 'last_update'),
+    ),
+    Subject: ((Proficiency, 'subject', 'updated_at'), (Lesson, 'subject', 'last_update')),
+    Proficiency: ((Lesson, 'proficiency', 'last_update'),),
+    Lesson: (),
+}
+# Further columns snapshotted before a save, for the progress counters.
+COUNTED_FIELDS = {
+    Lesson: ('is_done', 'verified'),
+}
+
+
+_deletions = threading.local()
+
+
+class DeletionBatch:
+    """What one delete removed: the nodes, with their parent columns, and the
+    counts of the removed lessons per (proficiency, subject, grade)."""
+
+    def __init__(self):
+        self.removed = defaultdict(dict)
+        self.lesson_counts = defaultdict(lambda: [0, 0, 0])
+
+    def gone(self, model, pk):
+        return pk in self.removed.get(model, ())
+
+
+def _current_batch():
+    return getattr(_deletions, 'batch', None)
+
+
+@contextmanager
+def deletion_batch():
+    """Run a delete with its bookkeeping batched.
+
+    A cascading delete sends post_delete for every row under the deleted
+    node. Handled row by row, each lesson would cost its own counter
+    updates, campus lookup and tombstone. Inside this block the receivers
+    only note what was removed, and flush_deletions() then updates each
+    surviving node's counters once, resolves the campuses in two queries and
+    writes the tombstones in one. Nodes whose ancestor went in the same
+    delete get no tombstone of their own; the ancestor's covers them.
+    """
+    if _current_batch() is not None:
+        yield
+        return
+    with transaction.atomic():
+        _deletions.batch = batch = DeletionBatch()
+        try:
+            yield
+        finally:
+            _deletions.batch = None
+        flush_deletions(batch)
+
+
+def flush_deletions(batch):
+    removed = batch.removed
+    # Parents that survive the delete are looked up, removed ones are known
+    subject_ids = {values['subject_id'] for values in removed[Proficiency].values()} - set(removed[Subject])
+    subject_grade = dict(Subject.objects.filter(id__in=subject_ids).values_list('id', 'grade_id')) if subject_ids else {}
+    subject_grade.update((pk, values['grade_id']) for pk, values in removed[Subject].items())
+    grade_ids = {grade_id for _, _, grade_id in batch.lesson_counts}
+    grade_ids |= {values['grade_id'] for values in removed[Lesson].values()}
+    grade_ids |= set(subject_grade.values())
+    grade_ids -= set(removed[Grade])
+    grade_campus = dict(Grade.objects.filter(id__in=grade_ids).values_list('id', 'campus_id')) if grade_ids else {}
+    grade_campus.update((pk, values['campus_id']) for pk, values in removed[Grade].items())
+
+    node_counts = defaultdict(lambda: [0, 0, 0])
+    for (proficiency_id, subject_id, grade_id), counts in batch.lesson_counts.items():
+        for node in (
+            (Proficiency, proficiency_id), (Subject, subject_id), (Grade, grade_id), (Campus, grade_campus.get(grade_id)),
+        ):
+            # Counters of removed nodes went with their rows
+            if node[1] is not None and not batch.gone(*node):
+                node_counts[node] = [total + count for total, count in zip(node_counts[node], counts)]
+    for (model, node_id), counts in node_counts.items():
+        add_counts(model, node_id, counts)
+
+    tombstones = []
+    nodes = []
+    for model, rows in removed.items():
+        for pk, values in rows.items():
+            grade_id = subject_grade.get(values['subject_id']) if model is Proficiency else values.get('grade_id')
+            nodes += _affected_nodes(model, values, pk, grade_id=grade_id)
+            if any(batch.gone(PARENT_MODELS[field], parent_id) for field, parent_id in values.items()):
+                continue
+            campus_id = pk if model is Campus else values.get('campus_id', grade_campus.get(grade_id))
+            if campus_id is not None:
+                tombstones.append(Tombstone(node=model.__name__.lower(), object_id=pk, campus_id=campus_id))
+    Tombstone.objects.bulk_create(tombstones)
+    bump_versions_on_commit(nodes)
+
+
+def _campus_of(sender, values):
+    """Campus of a node, from its parent columns (PARENT_FIELDS)."""
+    if sender is Grade:
+        return values['campus_id']
+    if sender is Proficiency:
+        grades = Grade.objects.filter(subjects__id=values['subject_id'])
+    else:
+        grades = Grade.objects.filter(id=values['grade_id'])
+    return grades.values_list('campus_id', flat=True).first()
+
+
+def _affected_nodes(sender, values, pk, grade_id=None):
+    if sender is Campus:
+        return [('campuses', None), ('campus', pk)]
+    if sender is Grade:
+        return [('grade', pk), ('campus', values['campus_id'])]
+    if sender is Subject:
+        return [('subject', pk), ('grade', values['grade_id'])]
+    if sender is Proficiency:
+        if grade_id is None:
+            grade_id = Subject.objects.filter(id=values['subject_id']).values_list('grade_id', flat=True).first()
+        return [('proficiency', pk), ('subject', values['subject_id']), ('grade', grade_id)]
+    return [
+        ('proficiency', values['proficiency_id']),
+        ('subject', values['subject_id']),
+        ('grade', values['grade_id']),
+    ]
+
+
+@receiver(pre_save, sender=Grade)
+@receiver(pre_save, sender=Subject)
+@receiver(pre_save, sender=Proficiency)
+@receiver(pre_save, sender=Lesson)
+def remember_parents(sender, instance, raw=False, **kwargs):
+    if raw or instance._state.adding:
+        return
+    queryset = sender.objects.filter(pk=instance.pk)
+    if sender in COUNTED_FIELDS:
+        # The counter deltas are taken against this snapshot, so hold the row
+        # until the save commits (Lesson.save is atomic); otherwise a status
+        # change committed in between is lost from the counters.
+        queryset = queryset.select_for_update()
+    instance._previous_parents = queryset.values(*PARENT_FIELDS[sender], *COUNTED_FIELDS.get(sender, ())).first()
+
+
+# Registered before invalidate_curriculum_cache, which clears the snapshot.
+@receiver(post_save, sender=Lesson)
+def update_lesson_counters(sender, instance, created, raw=False, **kwargs):
+    if raw:
+        return
+    previous = getattr(instance, '_previous_parents', None)
+    current = (instance.proficiency_id, instance.subject_id, instance.grade_id)
+    if created or not previous:
+        apply_counts(*current, lesson_counts(instance.is_done, instance.verified))
+        return
+    before = (previous['proficiency_id'], previous['subject_id'], previous['grade_id'])
+    if before != current:
+        apply_counts(*before, lesson_counts(previous['is_done'], previous['verified'], sign=-1))
+        apply_counts(*current, lesson_counts(instance.is_done, instance.verified))
+        return
+    apply_counts(*current, (
+        0,
+        bool(instance.is_done) - bool(previous['is_done']),
+        bool(instance.verified) - bool(previous['verified']),
+    ))
+
+
+@receiver(post_delete, sender=Campus)
+@receiver(post_delete, sender=Grade)
+@receiver(post_delete, sender=Subject)
+@receiver(post_delete, sender=Proficiency)
+@receiver(post_delete, sender=Lesson)
+def note_removal(sender, instance, **kwargs):
+    batch = _current_batch()
+    if batch is not None:
+        batch.removed[sender][instance.pk] = {field: getattr(instance, field) for field in PARENT_FIELDS.get(sender, ())}
+
+
+@receiver(post_delete, sender=Lesson)
+def remove_lesson_counts(sender, instance, **kwargs):
+    parents = (instance.proficiency_id, instance.subject_id, instance.grade_id)
+    counts = lesson_counts(instance.is_done, instance.verified, sign=-1)
+    batch = _current_batch()
+    if batch is None:
+        apply_counts(*parents, counts)
+        return
+    batch.lesson_counts[parents] = [total + count for total, count in zip(batch.lesson_counts[parents], counts)]
+
+
+@receiver(post_save, sender=Grade)
+def move_campus_counts(sender, instance, raw=False, **kwargs):
+    previous = getattr(instance, '_previous_parents', None)
+    if not raw and previous and previous['campus_id'] != instance.campus_id:
+        move_grade_counts(instance, previous['campus_id'])
+
+
+@receiver(post_save, sender=Grade)
+@receiver(post_save, sender=Subject)
+@receiver(post_save, sender=Proficiency)
+@receiver(post_save, sender=Lesson)
+def sync_campus_move(sender, instance, raw=False, **kwargs):
+    previous = getattr(instance, '_previous_parents', None)
+    if raw or not previous:
+        return
+    current = {field: getattr(instance, field) for field in PARENT_FIELDS[sender]}
+    if current == {field: previous[field] for field in current}:
+        return
+    old_campus_id = _campus_of(sender, previous)
+    if old_campus_id is None or old_campus_id == _campus_of(sender, current):
+        return
+    # To the old campus's clients the node and its subtree are gone; the new
+    # campus's delta sync must carry the whole subtree, not just the node.
+    Tombstone.objects.create(node=sender.__name__.lower(), object_id=instance.pk, campus_id=old_campus_id)
+    now = timezone.now()
+    for model, path, timestamp in SUBTREES[sender]:
+        model.objects.filter(**{path: instance}).update(**{timestamp: now})
+
+
+@receiver(post_save, sender=Campus)
+@receiver(post_save, sender=Grade)
+@receiver(post_save, sender=Subject)
+@receiver(post_save, sender=Proficiency)
+@receiver(post_save, sender=Lesson)
+@receiver(post_delete, sender=Campus)
+@receiver(post_delete, sender=Grade)
+@receiver(post_delete, sender=Subject)
+@receiver(post_delete, sender=Proficiency)
+@receiver(post_delete, sender=Lesson)
+def invalidate_curriculum_cache(sender, instance, raw=False, signal=None, **kwargs):
+    if raw or (signal is post_delete and _current_batch() is not None):
+        return
+    fields = PARENT_FIELDS.get(sender, ())
+    nodes = _affected_nodes(sender, {f: getattr(instance, f) for f in fields}, instance.pk)
+    previous = getattr(instance, '_previous_parents', None)
+    if previous:
+        nodes += _affected_nodes(sender, previous, instance.pk)
+        instance._previous_parents = None
+    bump_versions_on_commit(nodes)
+
+
+
+
+@receiver(post_delete, sender=Campus)
+@receiver(post_delete, sender=Grade)
+@receiver(post_delete, sender=Subject)
+@receiver(post_delete, sender=Proficiency)
+@receiver(post_delete, sender=Lesson)
+def record_tombstone(sender, instance, **kwargs):
+    if _current_batch() is not None:
+        return
+    if sender is Campus:
+        campus_id = instance.pk
+    else:
+        campus_id = _campus_of(sender, {field: getattr(instance, field) for field in PARENT_FIELDS[sender]})
+    # None only when the parent chain is already gone, in which case the
+    # tombstone of the removed ancestor covers this node.
+    if campus_id is not None:
+        Tombstone.objects.create(node=sender.__name__.lower(), object_id=instance.pk, campus_id=campus_id)
@@ -0,0 +1,66 @@
+from datetime import timedelta
+from django.utils import timezone
+from .models import Grade, Subject, Proficiency, Lesson, Tombstone
+
+# Rows are stamped when their transaction runs, not when it commits, so a
+# write can land slightly behind a cursor already handed out. Every sync
+# re-sends this much history; clients apply changes idempotently.
+SYNC_OVERLAP = timedelta(seconds=5)
+
+SYNC_FIELDS = {
+    'grades': ('id', 'name', 'grade_code', 'updated_at'),
+    'subjects': ('id', 'name', 'subject_code', 'icon', 'colorcode', 'grade_id', 'updated_at'),
+    'proficiencies': ('id', 'name', 'proficiency_code', 'subject_id', 'updated_at'),
+    'lessons': ('id', 'lesson_code', 'name', 'is_done', 'verified',
+                'proficiency_id', 'subject_id', 'grade_id', 'last_update'),
+}
+
+
+def build_sync_payload(campus, since=None):
+    """Everything under ``campus`` created, updated or deleted since ``since``.
+
+    Without ``since`` the whole campus is returned. The returned ``cursor`` is
+    what the client sends as ``since`` next time.
+    """
+    cursor = timezone.now()
+    querysets = {
+        'grades': Grade.objects.filter(campus=campus),
+        'subjects': Subject.objects.filter(grade__campus=campus),
+        'proficiencies': Proficiency.objects.filter(subject__grade__campus=campus),
+        'lessons': Lesson.objects.filter(grade__campus=campus),
+    }
+    changed_since = since - SYNC_OVERLAP if since else None
+    if changed_since:
+        for name, queryset in querysets.items():
+            timestamp = 'last_update' if name == 'lessons' else 'updated_at'
+            querysets[name] = queryset.filter(**{f'{timestamp}__gte': changed_since})
+
+    payload = {
+        'cursor': cursor.isoformat(),
+        'full': since is None,
+        'campus': {
+            'id': campus.id,
+            'campus_code': campus.campus_code,
+            'name': campus.name,
+            'description': campus.description,
+            'updated_at': campus.updated_at,
+        } if changed_since is None or campus.updated_at >= changed_since else None,
+    }
+    for name, queryset in querysets.items():
+        payload[name] = list(queryset.values(*SYNC_FIELDS[name]))
+
+    deleted = {'grades': [], 'subjects': [], 'proficiencies': [], 'lessons': []}
+    if changed_since:
+        tombstones = Tombstone.objects.filter(campus_id=campus.id, deleted_at__gte=changed_since)
+        plural = {'grade': 'grades', 'subject': 'subjects', 'proficiency': 'proficiencies', 'lesson': 'lessons'}
+        for node, object_id in tombstones.values_list('node', 'object_id'):
+            if node in plural:
+                deleted[plural[node]].append(object_id)
+    payload['deleted'] = deleted
+    return payload
+
+
+def campus_deleted_since(campus_id, since):
+    return Tombstone.objects.filter(
+        node='campus', object_id=campus_id, deleted_at__gte=since - SYNC_OVERLAP
+    ).exists()
@@ -1,3 +1,731 @@
-from django.test import TestCase
+import time
+import uuid
+from contextlib import redirect_stdout
+from datetime import timedelta
+from io import StringIO
+from unittest import mock
+from decimal import Decimal
+from django.core.cache import caches
+from django.core.management import call_command
+from django.db import connection, transaction
+from django.forms.models import model_to_dict
+from django.test import TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.utils import timezone
+from django.utils.http import parse_http_date
+from rest_framework.renderers import JSONRenderer
+from rest_framework.test import APIClient
+from admin_management.models import Notification
+from user_management.models import User
+from utils.renderers import ORJSONRenderer
+from .cache import STATS_KEYS, bump_versions, cache_stats, get_version, reset_cache_stats
+from .models import Campus, Grade, Subject, Proficiency, Lesson, Tombstone
+from .conditional import version_last_modified
+from .importer import LessonImporter, content_hash
+from .lesson_parser import SheetFormatError, parse_lesson_code, parse_lesson_sheet
+from .sheets import FixtureSource, pad_rows
+from .tree import load_grade_tree, load_subject_tree
+from .views import ParseCSVView
 
-# Create your tests here.
+
+@override_settings(CACHES={
+    'default': {'BACKEND': 'django.core.cache.backends.locmem.LocMemCache'},
+    'curriculum': {'BACKEND': 'django.core.cache.backends.locmem.LocMemCache', 'LOCATION': 'curriculum-tests'},
+})
+class CurriculumTestCase(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create_user(email='volunteer@belakoo.com', password='pass', name='Volunteer')
+        cls.campus = Campus.objects.create(campus_code='c1', name='Campus 1', description='First campus')
+        cls.grade = Grade.objects.create(grade_code='K1', name='K1', campus=cls.campus)
+        cls.subjects = []
+        for s in range(2):
+            subject = Subject.objects.create(
+                subject_code=f'S{s}', name=f'Subject {s}', icon='https://example.com/icon.png',
+                grade=cls.grade, colorcode='#00FF00'
+            )
+            cls.subjects.append(subject)
+            for p in range(3):
+                proficiency = Proficiency.objects.create(proficiency_code=f'P{p}', name=f'P{p}', subject=subject)
+                for n in range(4):
+                    Lesson.objects.create(
+                        lesson_code=f'S{s}.K1.C{n}.P{p}', name=f'Lesson {n}', subject=subject,
+                        grade=cls.grade, proficiency=proficiency
+                    )
+
+    def setUp(self):
+        caches['curriculum'].clear()
+        reset_cache_stats()
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+
+
+class CurriculumTreeTests(CurriculumTestCase):
+    def test_grade_tree_query_count(self):
+        with self.assertNumQueries(4):
+            tree = load_grade_tree(self.grade.id)
+        subjects = tree['subjects']
+        self.assertEqual(len(subjects), 2)
+        self.assertEqual(sum(len(p['lessons']) for s in subjects for p in s['proficiencies']), 24)
+
+    def test_grade_tree_query_count_is_independent_of_size(self):
+        subject = self.subjects[0]
+        for p in range(3, 8):
+            proficiency = Proficiency.objects.create(proficiency_code=f'P{p}', name=f'P{p}', subject=subject)
+            Lesson.objects.create(
+                lesson_code=f'extra.{p}', name='Extra', subject=subject, grade=self.grade, proficiency=proficiency
+            )
+        with self.assertNumQueries(4):
+            load_grade_tree(self.grade.id)
+
+    def test_subject_tree_query_count(self):
+        with self.assertNumQueries(3):
+            tree = load_subject_tree(self.subjects[0].id)
+        lesson = tree['proficiencies'][0]['lessons'][0]
+        self.assertEqual(set(lesson), {'id', 'lesson_code', 'name', 'is_done', 'verified'})
+
+    def test_tree_not_found(self):
+        response = self.client.get('/api/subjects/00000000-0000-0000-0000-000000000000/')
+        self.assertEqual(response.status_code, 404)
+
+
+class CurriculumCacheTests(CurriculumTestCase):
+    def test_second_request_is_served_from_cache(self):
+        url = f'/api/grades/{self.grade.id}/'
+        first = self.client.get(url)
+        with self.assertNumQueries(0):
+            second = self.client.get(url)
+        self.assertEqual(first.data, second.data)
+        self.assertEqual(cache_stats(), {'hits': 1, 'misses': 1, 'hit_rate': 0.5})
+
+    def test_stats_are_flushed_periodically(self):
+        url = f'/api/grades/{self.grade.id}/'
+        self.client.get(url)
+        with mock.patch('content_management.cache._incr') as incr:
+            self.client.get(url)
+        incr.assert_not_called()
+        with mock.patch('content_management.cache.STATS_FLUSH_INTERVAL', 0):
+            self.client.get(url)
+        self.assertEqual(caches['curriculum'].get_many(STATS_KEYS), {STATS_KEYS[0]: 2, STATS_KEYS[1]: 1})
+
+    def test_lesson_change_invalidates_trees(self):
+        lesson = Lesson.objects.filter(subject=self.subjects[0]).first()
+        self.client.get(f'/api/grades/{self.grade.id}/')
+        self.client.get(f'/api/subjects/{self.subjects[0].id}/')
+        self.client.get(f'/api/proficiencies/{lesson.proficiency_id}/lessons/')
+        lesson.is_done = True
+        with self.captureOnCommitCallbacks(execute=True):
+            lesson.save()
+
+        response = self.client.get(f'/api/subjects/{self.subjects[0].id}/')
+        lessons = [l for p in response.data['proficiencies'] for l in p['lessons'] if l['id'] == str(lesson.id)]
+        self.assertTrue(lessons[0]['is_done'])
+        response = self.client.get(f'/api/proficiencies/{lesson.proficiency_id}/lessons/')
+        self.assertTrue(next(l for l in response.json()['lessons'] if l['id'] == str(lesson.id))['is_done'])
+        self.assertEqual(cache_stats()['hits'], 0)
+
+    def test_moved_proficiency_invalidates_old_and_new_subject(self):
+        proficiency = Proficiency.objects.filter(subject=self.subjects[0]).first()
+        self.client.get(f'/api/subjects/{self.subjects[0].id}/')
+        self.client.get(f'/api/subjects/{self.subjects[1].id}/')
+        proficiency.subject = self.subjects[1]
+        with self.captureOnCommitCallbacks(execute=True):
+            proficiency.save()
+
+        old = self.client.get(f'/api/subjects/{self.subjects[0].id}/')
+        new = self.client.get(f'/api/subjects/{self.subjects[1].id}/')
+        self.assertEqual(len(old.data['proficiencies']), 2)
+        self.assertEqual(len(new.data['proficiencies']), 4)
+
+    def test_campus_changes_invalidate_campus_list(self):
+        self.client.get('/api/campuses/')
+        with self.captureOnCommitCallbacks(execute=True):
+            Campus.objects.create(campus_code='c2', name='Campus 2', description='Second campus')
+        self.assertEqual(len(self.client.get('/api/campuses/').data), 2)
+
+    def test_bumps_write_a_new_version_even_on_a_coarse_clock(self):
+        versions = set()
+        with mock.patch('content_management.cache.time.time_ns', return_value=1):
+            for _ in range(3):
+                bump_versions([('grade', self.grade.id)])
+                versions.add(get_version('grade', self.grade.id))
+        self.assertEqual(len(versions), 3)
+
+    def test_versions_are_bumped_on_commit(self):
+        version = get_version('grade', self.grade.id)
+        with self.captureOnCommitCallbacks(execute=True):
+            self.grade.save()
+            # Other connections cannot see the new row before the commit
+            self.assertEqual(get_version('grade', self.grade.id), version)
+        self.assertNotEqual(get_version('grade', self.grade.id), version)
+
+    def test_deleted_grade_invalidates_campus_detail(self):
+        self.client.get(f'/api/campuses/{self.campus.id}/')
+        with self.captureOnCommitCallbacks(execute=True):
+            self.grade.delete()
+        self.assertEqual(self.client.get(f'/api/campuses/{self.campus.id}/').data['grades'], [])
+
+
+class ConditionalGetTests(CurriculumTestCase):
+    def test_lesson_etag_answers_304_without_loading_the_lesson(self):
+        lesson = Lesson.objects.first()
+        url = f'/api/lessons/{lesson.id}/'
+        response = self.client.get(url)
+        self.assertIn('Last-Modified', response)
+        with self.assertNumQueries(1):
+            response = self.client.get(url, HTTP_IF_NONE_MATCH=response['ETag'])
+        self.assertEqual(response.status_code, 304)
+
+    def test_lesson_etag_changes_with_lesson_and_parent_names(self):
+        lesson = Lesson.objects.first()
+        url = f'/api/lessons/{lesson.id}/'
+        etag = self.client.get(url)['ETag']
+        Subject.objects.filter(id=lesson.subject_id).update(name='Renamed')
+        self.assertEqual(self.client.get(url, HTTP_IF_NONE_MATCH=etag).status_code, 200)
+
+    def test_lesson_if_modified_since(self):
+        lesson = Lesson.objects.first()
+        url = f'/api/lessons/{lesson.id}/'
+        last_modified = self.client.get(url)['Last-Modified']
+        self.assertEqual(self.client.get(url, HTTP_IF_MODIFIED_SINCE=last_modified).status_code, 304)
+
+    def test_tree_etag_answers_304_without_queries(self):
+        url = f'/api/grades/{self.grade.id}/'
+        etag = self.client.get(url)['ETag']
+        with self.assertNumQueries(0):
+            response = self.client.get(url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 304)
+        self.assertEqual(response['ETag'], etag)
+
+    def test_tree_etag_changes_when_a_lesson_changes(self):
+        url = f'/api/subjects/{self.subjects[0].id}/'
+        etag = self.client.get(url)['ETag']
+        lesson = Lesson.objects.filter(subject=self.subjects[0]).first()
+        lesson.verified = True
+        with self.captureOnCommitCallbacks(execute=True):
+            lesson.save()
+        response = self.client.get(url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 200)
+        self.assertNotEqual(response['ETag'], etag)
+
+    def test_tree_last_modified_follows_renames_and_deletes(self):
+        url = f'/api/subjects/{self.subjects[0].id}/'
+        now = time.time()
+        # Seen from 100s ahead, so the versions bumped below are not in the current second
+        with mock.patch('content_management.conditional.time.time', return_value=now + 100):
+            last_modified = self.client.get(url)['Last-Modified']
+            for offset, change in (
+                (10, lambda: Proficiency.objects.filter(subject=self.subjects[0]).first().save()),
+                (20, lambda: Lesson.objects.filter(subject=self.subjects[0]).first().delete()),
+            ):
+                bumped_at = int((now + offset) * 10 ** 9)
+                with mock.patch('content_management.cache.time.time_ns', return_value=bumped_at), \
+                        self.captureOnCommitCallbacks(execute=True):
+                    change()
+                response = self.client.get(url, HTTP_IF_MODIFIED_SINCE=last_modified)
+                self.assertEqual(response.status_code, 200)
+                self.assertGreater(parse_http_date(response['Last-Modified']), parse_http_date(last_modified))
+                last_modified = response['Last-Modified']
+
+    def test_tree_last_modified_is_withheld_within_the_bump_second(self):
+        with mock.patch('content_management.conditional.time.time', return_value=1000.5):
+            self.assertIsNone(version_last_modified(1000_200_000_000))
+            self.assertEqual(version_last_modified(999_900_000_000).timestamp(), 999)
+
+    def test_missing_lesson_is_still_404(self):
+        response = self.client.get('/api/lessons/00000000-0000-0000-0000-000000000000/')
+        self.assertEqual(response.status_code, 404)
+
+
+class SyncViewTests(CurriculumTestCase):
+    def sync(self, since=None, campus=None):
+        params = {'campus': str(campus or self.campus.id)}
+        if since:
+            params['since'] = since
+        response = self.client.get('/api/sync/', params)
+        self.assertEqual(response.status_code, 200)
+        return response.data
+
+    def age(self, days=1):
+        # Push everything well outside the sync overlap window.
+        past = timezone.now() - timedelta(days=days)
+        Campus.objects.update(updated_at=past)
+        Grade.objects.update(updated_at=past)
+        Subject.objects.update(updated_at=past)
+        Proficiency.objects.update(updated_at=past)
+        Lesson.objects.update(last_update=past)
+        Tombstone.objects.update(deleted_at=past)
+
+    def test_full_sync_returns_the_whole_campus(self):
+        data = self.sync()
+        self.assertTrue(data['full'])
+        self.assertEqual(data['campus']['campus_code'], 'c1')
+        self.assertEqual((len(data['subjects']), len(data['proficiencies']), len(data['lessons'])), (2, 6, 24))
+
+    def test_incremental_sync_returns_only_changes(self):
+        self.age()
+        cursor = (timezone.now() - timedelta(hours=1)).isoformat()
+        lesson = Lesson.objects.first()
+        lesson.is_done = True
+        lesson.save()
+        proficiency = Proficiency.objects.exclude(id=lesson.proficiency_id).first()
+        proficiency.name = 'Renamed'
+        proficiency.save()
+        deleted = Lesson.objects.exclude(id=lesson.id).first()
+        deleted_id = deleted.id
+        deleted.delete()
+
+        data = self.sync(cursor)
+        self.assertFalse(data['full'])
+        self.assertIsNone(data['campus'])
+        self.assertEqual([l['id'] for l in data['lessons']], [lesson.id])
+        self.assertEqual([p['name'] for p in data['proficiencies']], ['Renamed'])
+        self.assertEqual(data['grades'], [])
+        self.assertEqual(data['deleted']['lessons'], [deleted_id])
+        self.assertTrue(data['cursor'])
+
+    def test_unchanged_campus_syncs_nothing(self):
+        self.age()
+        data = self.sync((timezone.now() - timedelta(hours=1)).isoformat())
+        self.assertEqual(
+            [data[name] for name in ('grades', 'subjects', 'proficiencies', 'lessons')], [[], [], [], []]
+        )
+
+    def test_grade_moved_to_another_campus(self):
+        other = Campus.objects.create(campus_code='c2', name='Campus 2', description='Second campus')
+        self.age()
+        cursor = (timezone.now() - timedelta(hours=1)).isoformat()
+        self.grade.campus = other
+        self.grade.save()
+
+        old = self.sync(cursor)
+        self.assertEqual(old['grades'], [])
+        self.assertEqual(old['deleted']['grades'], [self.grade.id])
+        new = self.sync(cursor, other.id)
+        self.assertEqual([grade['id'] for grade in new['grades']], [self.grade.id])
+        self.assertEqual((len(new['subjects']), len(new['proficiencies']), len(new['lessons'])), (2, 6, 24))
+        self.assertEqual(new['deleted']['grades'], [])
+
+    def move_to_other_campus(self, move):
+        other = Campus.objects.create(campus_code='c2', name='Campus 2', description='Second campus')
+        grade = Grade.objects.create(grade_code='K1', name='K1', campus=other)
+        subject = Subject.objects.create(
+            subject_code='S9', name='Subject 9', icon='https://example.com/icon.png', grade=grade, colorcode='#00FF00'
+        )
+        proficiency = Proficiency.objects.create(proficiency_code='P9', name='P9', subject=subject)
+        self.age()
+        cursor = (timezone.now() - timedelta(hours=1)).isoformat()
+        move(grade, subject, proficiency)
+        return self.sync(cursor), self.sync(cursor, other.id)
+
+    def test_lesson_moved_to_another_campus(self):
+        lesson = Lesson.objects.first()
+
+        def move(grade, subject, proficiency):
+            lesson.grade, lesson.subject, lesson.proficiency = grade, subject, proficiency
+            lesson.save()
+
+        old, new = self.move_to_other_campus(move)
+        self.assertEqual(old['deleted']['lessons'], [lesson.id])
+        self.assertEqual([l['id'] for l in new['lessons']], [lesson.id])
+
+    def test_subject_moved_to_another_campus(self):
+        subject = self.subjects[0]
+
+        def move(grade, *_):
+            subject.grade = grade
+            subject.save()
+
+        old, new = self.move_to_other_campus(move)
+        self.assertEqual(old['deleted']['subjects'], [subject.id])
+        self.assertEqual({s['id'] for s in new['subjects']}, {subject.id})
+        self.assertEqual(len(new['proficiencies']), 3)
+
+    def test_proficiency_moved_to_another_campus(self):
+        proficiency = Proficiency.objects.filter(subject=self.subjects[0]).first()
+
+        def move(grade, subject, _):
+            proficiency.subject = subject
+            proficiency.save()
+
+        old, new = self.move_to_other_campus(move)
+        self.assertEqual(old['deleted']['proficiencies'], [proficiency.id])
+        self.assertEqual([p['id'] for p in new['proficiencies']], [proficiency.id])
+
+    def test_move_within_a_campus_writes_no_tombstone(self):
+        proficiency = Proficiency.objects.filter(subject=self.subjects[0]).first()
+        proficiency.subject = self.subjects[1]
+        proficiency.save()
+        self.assertFalse(Tombstone.objects.exists())
+
+    def test_cascading_delete_tombstones_only_the_deleted_node(self):
+        self.age()
+        cursor = (timezone.now() - timedelta(hours=1)).isoformat()
+        subject = Subject.objects.get(id=self.subjects[0].id)
+        with CaptureQueriesContext(connection) as queries:
+            subject.delete()
+        self.assertEqual(sum(query['sql'].startswith('INSERT') for query in queries), 1)
+        deleted = self.sync(cursor)['deleted']
+        self.assertEqual(deleted['subjects'], [self.subjects[0].id])
+        self.assertEqual((deleted['proficiencies'], deleted['lessons']), ([], []))
+
+    def test_bulk_lesson_delete_tombstones_every_lesson(self):
+        self.age()
+        cursor = (timezone.now() - timedelta(hours=1)).isoformat()
+        lessons = Lesson.objects.filter(subject=self.subjects[1])
+        lesson_ids = set(lessons.values_list('id', flat=True))
+        lessons.delete()
+        self.assertEqual(set(self.sync(cursor)['deleted']['lessons']), lesson_ids)
+
+    def test_deleted_campus(self):
+        cursor = (timezone.now() - timedelta(hours=1)).isoformat()
+        campus_id = self.campus.id
+        self.campus.delete()
+        self.assertTrue(self.sync(cursor, campus_id)['campus_deleted'])
+
+    def test_invalid_parameters(self):
+        self.assertEqual(self.client.get('/api/sync/').status_code, 400)
+        self.assertEqual(self.client.get('/api/sync/', {'campus': str(self.campus.id), 'since': 'x'}).status_code, 400)
+
+
+class LessonBatchViewTests(CurriculumTestCase):
+    def test_batch_preserves_order_and_reports_missing(self):
+        lessons = list(Lesson.objects.order_by('lesson_code')[:5])
+        missing = '00000000-0000-0000-0000-000000000000'
+        ids = [str(lessons[3].id), missing, str(lessons[0].id), 'not-a-uuid', str(lessons[4].id)]
+        with self.assertNumQueries(1):
+            response = self.client.get('/api/lessons/batch/', {'ids': ','.join(ids)})
+        data = response.json()['lessons']
+        self.assertEqual([entry['id'] for entry in data], ids)
+        self.assertEqual(data[0]['lesson_code'], lessons[3].lesson_code)
+        self.assertEqual(data[0]['subject'], lessons[3].subject.name)
+        self.assertEqual(data[1]['error'], 'Lesson not found')
+        self.assertEqual(data[3]['error'], 'Lesson not found')
+
+    def test_batch_by_lesson_code(self):
+        response = self.client.get('/api/lessons/batch/', {'lesson_codes': 'S1.K1.C0.P2,nope', 'fields': 'name'})
+        data = response.data['lessons']
+        self.assertEqual(set(data[0]), {'id', 'name'})
+        self.assertEqual(data[1], {'lesson_code': 'nope', 'error': 'Lesson not found'})
+
+    def test_batch_limits(self):
+        ids = ','.join(['00000000-0000-0000-0000-000000000000'] * 51)
+        self.assertEqual(self.client.get('/api/lessons/batch/', {'ids': ids}).status_code, 400)
+        self.assertEqual(self.client.get('/api/lessons/batch/').status_code, 400)
+
+
+class MarkLessonDoneTests(CurriculumTestCase):
+    def post(self, lesson, action):
+        with CaptureQueriesContext(connection) as queries, self.captureOnCommitCallbacks(execute=True):
+            response = self.client.post(f'/api/lessons/{lesson.id}/{action}/')
+        self.assertEqual(response.status_code, 200)
+        return response, [query['sql'] for query in queries]
+
+    def test_transition_updates_only_status_columns(self):
+        lesson = Lesson.objects.first()
+        response, sql = self.post(lesson, 'mark-done')
+        self.assertEqual(response.data['message'], 'Lesson marked as done')
+        update = next(query for query in sql if query.startswith('UPDATE "content_management_lesson"'))
+        self.assertIn('"is_done"', update)
+        self.assertNotIn('"activate"', update)
+        self.assertNotIn('"objective"', update)
+        lesson.refresh_from_db()
+        self.assertEqual((lesson.is_done, lesson.completed_by_id), (True, self.user.id))
+
+    def test_repeated_mark_done_is_a_no_op(self):
+        lesson = Lesson.objects.first()
+        self.post(lesson, 'mark-done')
+        completed_at = Lesson.objects.get(id=lesson.id).completed_at
+        response, _ = self.post(lesson, 'mark-done')
+        self.assertEqual(response.data['message'], 'Lesson already marked as done')
+        self.assertEqual(Notification.objects.count(), 1)
+        self.assertEqual(Lesson.objects.get(id=lesson.id).completed_at, completed_at)
+        self.grade.refresh_from_db()
+        self.assertEqual(self.grade.done_count, 1)
+
+    def test_transitions_keep_counters_and_trees_current(self):
+        lesson = Lesson.objects.filter(subject=self.subjects[0]).first()
+        url = f'/api/subjects/{self.subjects[0].id}/'
+        self.client.get(url)
+        self.post(lesson, 'mark-done')
+        lessons = [l for p in self.client.get(url).data['proficiencies'] for l in p['lessons']]
+        self.assertTrue(next(l for l in lessons if l['id'] == str(lesson.id))['is_done'])
+        self.post(lesson, 'mark-not-done')
+        response, _ = self.post(lesson, 'mark-not-done')
+        self.assertEqual(response.data['message'], 'Lesson already marked as not done')
+        for node in (self.campus, self.grade, self.subjects[0]):
+            node.refresh_from_db()
+            self.assertEqual((node.done_count, node.verified_count), (0, 0))
+
+    def test_unknown_lesson(self):
+        response = self.client.post(f'/api/lessons/{uuid.uuid4()}/mark-done/')
+        self.assertEqual(response.status_code, 404)
+        self.assertFalse(Notification.objects.exists())
+
+
+class BulkMarkLessonsDoneTests(CurriculumTestCase):
+    def test_marks_lessons_and_reports_each_id(self):
+        lessons = list(Lesson.objects.order_by('lesson_code')[:3])
+        Lesson.objects.filter(id=lessons[0].id).update(is_done=True)
+        missing = str(uuid.uuid4())
+        requested = [str(lesson.id) for lesson in lessons] + [missing, 'nope']
+        response = self.client.post('/api/lessons/mark-done/', {'lesson_ids': requested}, format='json')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(
+            [entry['result'] for entry in response.data['results']],
+            ['already_done', 'marked_done', 'marked_done', 'not_found', 'not_found'],
+        )
+        self.assertEqual(response.data['marked_done'], 2)
+        self.assertEqual(Lesson.objects.filter(is_done=True, completed_by=self.user).count(), 2)
+        self.grade.refresh_from_db()
+        self.assertEqual(self.grade.done_count, 2)
+
+    def test_one_notification_for_the_batch(self):
+        lessons = list(Lesson.objects.all()[:5])
+        self.client.post('/api/lessons/mark-done/', {'lesson_ids': [str(l.id) for l in lessons]}, format='json')
+        notification = Notification.objects.get()
+        self.assertEqual(notification.kind, Notification.Kind.LESSON_DIGEST)
+        self.assertEqual(set(notification.payload['lesson_ids']), {str(l.id) for l in lessons})
+        self.client.post('/api/lessons/mark-done/', {'lesson_ids': [str(l.id) for l in lessons]}, format='json')
+        self.assertEqual(Notification.objects.count(), 1)
+
+    def test_query_count_does_not_grow_with_batch(self):
+        lessons = list(Lesson.objects.filter(subject=self.subjects[0])[:10])
+        with CaptureQueriesContext(connection) as queries:
+            self.client.post('/api/lessons/mark-done/', {'lesson_ids': [str(l.id) for l in lessons]}, format='json')
+        updates = [q['sql'] for q in queries if q['sql'].startswith('UPDATE "content_management_lesson"')]
+        self.assertEqual(len(updates), 1)
+
+    def test_invalid_requests(self):
+        self.assertEqual(self.client.post('/api/lessons/mark-done/', {}, format='json').status_code, 400)
+        too_many = {'lesson_ids': [str(uuid.uuid4()) for _ in range(51)]}
+        self.assertEqual(self.client.post('/api/lessons/mark-done/', too_many, format='json').status_code, 400)
+
+
+class ORJSONRendererTests(TestCase):
+    def test_matches_drf_json_renderer(self):
+        data = {
+            'id': uuid.uuid4(),
+            'created_at': timezone.now(),
+            'plain': timezone.now().replace(microsecond=0),
+            'price': Decimal('1.50'),
+            'name': 'Lección',
+            'nested': [{'ok': True, 'none': None}],
+        }
+        self.assertEqual(ORJSONRenderer().render(data), JSONRenderer().render(data))
+
+
+class LessonIndexUsageTests(CurriculumTestCase):
+    """EXPLAIN each hot lesson query and check it is served by its index."""
+
+    def assertUsesIndex(self, queryset, index_name):
+        with transaction.atomic():
+            if connection.vendor == 'postgresql':
+                # The fixture tables are tiny; make Postgres show the index
+                # path it would take on a real-sized table.
+                with connection.cursor() as cursor:
+                    cursor.execute('SET LOCAL enable_seqscan = off')
+            plan = queryset.explain()
+        self.assertIn(index_name, plan)
+
+    def test_unverified_queue_uses_partial_index(self):
+        queryset = Lesson.objects.filter(is_done=True, verified=False).order_by('completed_at')
+        self.assertUsesIndex(queryset, 'lesson_unverified_queue_idx')
+
+    def test_proficiency_lesson_code_lookup(self):
+        proficiency = Proficiency.objects.first()
+        queryset = Lesson.objects.filter(proficiency=proficiency).order_by('lesson_code')
+        self.assertUsesIndex(queryset, 'lesson_proficiency_code_idx')
+
+    def test_grade_subject_listing(self):
+        queryset = Lesson.objects.filter(grade=self.grade, subject=self.subjects[0])
+        self.assertUsesIndex(queryset, 'lesson_grade_subject_idx')
+
+    def test_completed_by_history(self):
+        queryset = Lesson.objects.filter(completed_by=self.user).order_by('completed_at')
+        self.assertUsesIndex(queryset, 'lesson_completer_completed_idx')
+
+    def test_filtered_listing_pages(self):
+        proficiency = Proficiency.objects.first()
+        for filters, index_name in (
+            ({'grade': self.grade}, 'lesson_grade_created_idx'),
+            ({'subject': self.subjects[0]}, 'lesson_subject_created_idx'),
+            ({'proficiency': proficiency}, 'lesson_proficiency_created_idx'),
+            ({'verified': True}, 'lesson_verified_created_idx'),
+        ):
+            with self.subTest(index_name):
+                if 'verified' in filters and connection.vendor != 'postgresql':
+                    # Django writes the filter as a bare WHERE "verified",
+                    # which SQLite (unlike Postgres) never matches to an index
+                    self.skipTest('boolean index conditions need PostgreSQL')
+                queryset = Lesson.objects.filter(**filters).order_by('created_at', 'id')[:50]
+                self.assertUsesIndex(queryset, index_name)
+
+
+def lesson_sheet(lesson_code, objective='Objective'):
+    """Cell values of a lesson worksheet, laid out like the lesson workbook."""
+    rows = [
+        ['LESSON CODE', lesson_code, ''],
+        ['OBJECTIVE', objective, ''],
+        ['Duration', '40 minutes'],
+        ['Specific Learning Outcome ', 'Outcome', ''],
+        ['Behavioural Outcome', 'Behaviour', ''],
+        ['Materials Required', 'Paper, pencils', ''],
+    ]
+    for title in ('HOOK', 'ASSESS', 'INFORM', 'ENGAGE', 'TEACH', 'GUIDED PRACTICE',
+                  'INDEPENDENT PRACTICE', 'ASSESSMENT', 'SHARE'):
+        rows.append(['', title, f'{title.lower()} for {lesson_code}'])
+    rows.append(['RESOURCES', '', 'https://example.com/resource'])
+    return rows
+
+
+class SheetImportTests(CurriculumTestCase):
+    def run_import(self, sheets, **params):
+        source = FixtureSource(sheets)
+        # The importer narrates every step with print()
+        with mock.patch.object(ParseCSVView, 'get_source', return_value=source), redirect_stdout(StringIO()):
+            response = self.client.get('/api/sheets/parse/', params)
+        return source, response
+
+    def test_import_fetches_all_worksheets_in_one_call(self):
+        sheets = {'Instr & Obj': [['Instructions']]}
+        sheets.update({f'LI.K1.C{n}.P1': lesson_sheet(f'LI.K1.C{n}.P1') for n in range(3)})
+        source, response = self.run_import(sheets)
+        self.assertEqual(response.status_code, 201)
+        self.assertEqual(source.fetches, 1)
+        self.assertEqual(response.data['total_sheets'], 3)
+        self.assertEqual(len(response.data['created_lessons']), 3)
+        lesson = Lesson.objects.get(lesson_code='LI.K1.C1.P1')
+        self.assertEqual(lesson.name, 'Lesson C1')
+        self.assertEqual(lesson.duration, '40 minutes')
+        self.assertEqual(lesson.resources, 'https://example.com/resource')
+        self.assertEqual(lesson.activate[0], {'title': 'HOOK', 'desc': 'hook for LI.K1.C1.P1'})
+        self.assertEqual([item['title'] for item in lesson.assess], ['ASSESSMENT', 'SHARE'])
+
+    def test_bad_worksheets_are_reported(self):
+        _, response = self.run_import({'LI.K1.C1.P1': lesson_sheet('LI.K1.C1.P1'), 'Notes': [['x']]})
+        self.assertEqual(len(response.data['created_lessons']), 1)
+        self.assertEqual(response.data['error_details'], [{'sheet': 'Notes', 'error': 'Invalid LESSON CODE format'}])
+
+    def test_existing_lesson_codes_are_reported_per_sheet(self):
+        _, response = self.run_import({'S0.K1.C0.P0': lesson_sheet('S0.K1.C0.P0'), 'LI.K1.C1.P1': lesson_sheet('LI.K1.C1.P1')})
+        self.assertEqual(response.data['created_lessons'], [{'sheet': 'LI.K1.C1.P1', 'lesson_code': 'LI.K1.C1.P1'}])
+        self.assertEqual(response.data['error_details'], [{
+            'sheet': 'S0.K1.C0.P0', 'lesson_code': 'S0.K1.C0.P0', 'error': 'Lesson with this lesson code already exists.'
+        }])
+
+    def test_existing_hierarchy_is_reused(self):
+        self.run_import({'S1.K1.C9.P2': lesson_sheet('S1.K1.C9.P2'), 'L1.K1.C9.P1': lesson_sheet('L1.K1.C9.P1')})
+        self.assertEqual(Lesson.objects.get(lesson_code='S1.K1.C9.P2').proficiency.subject, self.subjects[1])
+        self.assertEqual(Grade.objects.filter(campus=self.campus).count(), 1)
+        # The workbook's L1 typo goes under the LI subject
+        self.assertEqual(Lesson.objects.get(lesson_code='L1.K1.C9.P1').subject.subject_code, 'LI')
+
+    def test_new_hierarchy_invalidates_the_grade_tree_without_lessons(self):
+        self.client.get(f'/api/grades/{self.grade.id}/')
+        importer = LessonImporter(self.campus)
+        with self.captureOnCommitCallbacks(execute=True):
+            importer.resolve_hierarchy({('K1', 'S0', 'P9'), ('K1', 'NEW', 'P1')})
+        response = self.client.get(f'/api/grades/{self.grade.id}/')
+        self.assertIn('NEW', [subject['subject_code'] for subject in response.data['subjects']])
+        self.assertEqual(cache_stats()['hits'], 0)
+
+    def test_import_updates_progress_counters(self):
+        self.run_import({f'S0.K1.C{n}.P0': lesson_sheet(f'S0.K1.C{n}.P0') for n in range(4, 7)})
+        self.assertEqual(Proficiency.objects.get(subject=self.subjects[0], proficiency_code='P0').lesson_count, 7)
+        self.assertEqual(Subject.objects.get(pk=self.subjects[0].pk).lesson_count, 15)
+        self.assertEqual(Campus.objects.get(pk=self.campus.pk).lesson_count, 27)
+
+    def test_import_queries_do_not_grow_with_sheets(self):
+        def count_queries(lesson_codes):
+            sheets = {code: pad_rows(lesson_sheet(code)) for code in lesson_codes}
+            with CaptureQueriesContext(connection) as queries:
+                created_lessons, _ = LessonImporter(self.campus, batch_size=50).run(sheets)
+            self.assertEqual(len(created_lessons), len(lesson_codes))
+            return len(queries)
+
+        few = count_queries([f'LI.K2.C{n}.P1' for n in range(2)])
+        many = count_queries([f'LI.K3.C{n}.P1' for n in range(40)])
+        self.assertEqual(few, many)
+
+    def test_upsert_updates_changed_lessons_only(self):
+        sheets = {code: lesson_sheet(code) for code in ('LI.K1.C1.P1', 'LI.K1.C2.P1')}
+        self.run_import(sheets)
+        Lesson.objects.filter(lesson_code='LI.K1.C1.P1').update(is_done=True, verified=True)
+        sheets['LI.K1.C1.P1'] = lesson_sheet('LI.K1.C1.P1', objective='Corrected objective')
+        sheets['LI.K1.C3.P1'] = lesson_sheet('LI.K1.C3.P1')
+
+        _, response = self.run_import(sheets, mode='upsert')
+        self.assertEqual(response.data['error_details'], [])
+        self.assertEqual(response.data['created_lessons'], [{'sheet': 'LI.K1.C3.P1', 'lesson_code': 'LI.K1.C3.P1'}])
+        self.assertEqual(response.data['updated_lessons'], [{'sheet': 'LI.K1.C1.P1', 'lesson_code': 'LI.K1.C1.P1'}])
+        self.assertEqual(response.data['unchanged_lessons'], 1)
+        lesson = Lesson.objects.get(lesson_code='LI.K1.C1.P1')
+        self.assertEqual(lesson.objective, 'Corrected objective')
+        self.assertTrue(lesson.is_done and lesson.verified)
+
+    def test_upsert_of_unchanged_workbook_writes_nothing(self):
+        sheets = {f'LI.K1.C{n}.P1': pad_rows(lesson_sheet(f'LI.K1.C{n}.P1')) for n in range(5)}
+        LessonImporter(self.campus).run(sheets)
+        importer = LessonImporter(self.campus, upsert=True)
+        with CaptureQueriesContext(connection) as queries:
+            created_lessons, error_details = importer.run(sheets)
+        self.assertEqual((created_lessons, error_details, importer.updated_lessons), ([], [], []))
+        self.assertEqual(len(importer.unchanged_lessons), 5)
+        self.assertEqual(len(queries), 1)
+
+    def test_upsert_fills_missing_content_hashes(self):
+        # Lessons imported before content hashes were stored have none
+        importer = LessonImporter(self.campus, upsert=True)
+        importer.run({'S0.K1.C0.P0': pad_rows(lesson_sheet('S0.K1.C0.P0'))})
+        self.assertEqual(len(importer.updated_lessons), 1)
+        lesson = Lesson.objects.get(lesson_code='S0.K1.C0.P0')
+        self.assertEqual(lesson.name, 'Lesson C0')
+        self.assertEqual(lesson.content_hash, content_hash(model_to_dict(lesson)))
+
+    def test_import_lessons_command(self):
+        source = FixtureSource({'Instr & Obj': [['Instructions']], 'S0.K1.C0.P0': lesson_sheet('S0.K1.C0.P0')})
+        out = StringIO()
+        with mock.patch('content_management.management.commands.import_lessons.GoogleSheetsSource', return_value=source):
+            call_command('import_lessons', stdout=out)
+        self.assertIn('0 created, 1 updated, 0 unchanged, 0 failed', out.getvalue())
+
+    def test_pad_rows(self):
+        self.assertEqual(pad_rows([['a'], ['b', 'c']]), [['a', ''], ['b', 'c']])
+
+
+class LessonParserTests(TestCase):
+    def test_extracts_every_field(self):
+        fields = parse_lesson_sheet(pad_rows(lesson_sheet('LI.K1.C1.P1', objective='Count to ten')))
+        self.assertEqual(fields['objective'], 'Count to ten')
+        self.assertEqual(fields['specific_learning_outcome'], 'Outcome')
+        self.assertEqual(fields['resources'], 'https://example.com/resource')
+        self.assertEqual([item['title'] for item in fields['activate']], ['HOOK', 'ASSESS', 'INFORM'])
+        self.assertEqual(fields['apply'][1], {'title': 'INDEPENDENT PRACTICE', 'desc': 'independent practice for LI.K1.C1.P1'})
+
+    def test_matches_first_usable_occurrence(self):
+        rows = [
+            ['x', 'x', 'OBJECTIVE'],
+            ['OBJECTIVE', 'second', 'OBJECTIVE'],
+            ['HOOK', '', ''],
+            ['RESOURCES', 'label only', ''],
+        ]
+        fields = parse_lesson_sheet(rows)
+        self.assertEqual(fields['objective'], 'second')
+        self.assertEqual(fields['activate'], [{'title': 'HOOK', 'desc': ''}])
+        self.assertEqual(fields['acquire'], [])
+        self.assertEqual(fields['resources'], '')
+        self.assertEqual(fields['duration'], '')
+
+    def test_empty_sheet(self):
+        self.assertEqual(parse_lesson_sheet([])['objective'], '')
+
+    def test_ragged_rows(self):
+        fields = parse_lesson_sheet([['OBJECTIVE', 'x', ''], ['Duration', '40'], ['HOOK']])
+        self.assertEqual((fields['objective'], fields['duration']), ('x', '40'))
+        self.assertEqual(fields['activate'], [{'title': 'HOOK', 'desc': ''}])
+
+    def test_lesson_codes(self):
+        self.assertEqual(parse_lesson_code('LI.K1.C3.P1'), ('LI', 'K1', 'C3', 'P1'))
+        with self.assertRaisesMessage(SheetFormatError, 'Invalid LESSON CODE format'):
+            parse_lesson_code('Notes')
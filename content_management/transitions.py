@@ -0,0 +1,77 @@
+from collections import defaultdict
+from django.db import transaction
+from django.utils import timezone
+from .cache import bump_versions_on_commit
+from .counters import apply_counts
+from .models import Lesson
+
+# Columns a status change needs to know about a lesson: its parents, for the
+# counters and cached payloads, and its flags before the change.
+LESSON_STATE_FIELDS = ('id', 'lesson_code', 'name', 'proficiency_id', 'subject_id', 'grade_id', 'is_done', 'verified')
+
+
+def after_status_update(lessons, changes):
+    """Counters and cache versions for lessons changed by a queryset update(),
+    which sends no signals. ``lessons`` carry their flags from before the
+    update and ``changes`` the values it wrote."""
+    deltas = defaultdict(lambda: [0, 0, 0])
+    for lesson in lessons:
+        counts = deltas[(lesson.proficiency_id, lesson.subject_id, lesson.grade_id)]
+        counts[1] += bool(changes.get('is_done', lesson.is_done)) - bool(lesson.is_done)
+        counts[2] += bool(changes.get('verified', lesson.verified)) - bool(lesson.verified)
+    for parents, counts in deltas.items():
+        apply_counts(*parents, counts)
+    bump_versions_on_commit(
+        (node, node_id) for parents in deltas for node, node_id in zip(('proficiency', 'subject', 'grade'), parents)
+    )
+
+
+def set_lesson_done(lesson_id, is_done, user=None):
+    """Mark a lesson done (by ``user``) or not done.
+
+    The transition is one conditional UPDATE of the status columns, so it
+    neither rewrites the content columns nor overwrites a concurrent edit of
+    them. Returns the lesson if its state changed and None if it was already
+    in the requested state; raises Lesson.DoesNotExist.
+    """
+    now = timezone.now()
+    changes = {'is_done': is_done, 'last_update': now}
+    if is_done:
+        changes.update(completed_by=user, completed_at=now)
+    with transaction.atomic():
+        if not Lesson.objects.filter(id=lesson_id, is_done=not is_done).update(**changes):
+            if not Lesson.objects.filter(id=lesson_id).exists():
+                raise Lesson.DoesNotExist
+            return None
+        # The row is locked by the UPDATE until the transaction ends
+        lesson = Lesson.objects.only(*LESSON_STATE_FIELDS).get(id=lesson_id)
+        lesson.is_done = not is_done
+        after_status_update([lesson], changes)
+        lesson.is_done = is_done
+    return lesson
+
+
+def transition_lessons(queryset, changes):
+    """Apply ``changes`` to every lesson of ``queryset`` with one UPDATE.
+
+    ``queryset`` should filter on the state being left. Its rows are locked
+    first so the counters and the caller see exactly the lessons the UPDATE
+    changes. Returns those lessons, with their flags from before the change.
+    """
+    changes = {'last_update': timezone.now(), **changes}
+    with transaction.atomic():
+        lessons = list(queryset.select_for_update(of=('self',)).only(*LESSON_STATE_FIELDS).order_by())
+        if lessons:
+            queryset.filter(id__in=[lesson.id for lesson in lessons]).update(**changes)
+            after_status_update(lessons, changes)
+    return lessons
+
+
+def mark_lessons_done(lesson_ids, user):
+    """Mark the given lessons done by ``user``; returns those that were not
+    done before."""
+    now = timezone.now()
+    return transition_lessons(
+        Lesson.objects.filter(id__in=lesson_ids, is_done=False),
+        {'is_done': True, 'completed_by': user, 'completed_at': now, 'last_update': now},
+    )
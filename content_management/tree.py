@@ -0,0 +1,68 @@
+from django.db.models import Prefetch
+from django.shortcuts import get_object_or_404
+from .models import Grade, Subject, Proficiency, Lesson
+
+# Only the lesson columns the curriculum tree shows. The phase JSON and long
+# text fields are never read here.
+TREE_LESSON_FIELDS = ('id', 'lesson_code', 'name', 'is_done', 'verified', 'proficiency')
+
+
+def _proficiencies_prefetch():
+    lessons = Lesson.objects.only(*TREE_LESSON_FIELDS)
+    return Prefetch(
+        'proficiencies',
+        queryset=Proficiency.objects.prefetch_related(Prefetch('lessons', queryset=lessons))
+    )
+
+
+def serialize_proficiency_node(proficiency):
+    return {
+        'id': str(proficiency.id),
+        'name': proficiency.name,
+        'proficiency_code': proficiency.proficiency_code,
+        'lessons': [{
+            'id': str(lesson.id),
+            'lesson_code': lesson.lesson_code,
+            'name': lesson.name,
+            'is_done': lesson.is_done,
+            'verified': lesson.verified,
+        } for lesson in proficiency.lessons.all()]
+    }
+
+
+def load_grade_tree(grade_id):
+    """Grade -> Subject -> Proficiency -> Lesson in four queries."""
+    queryset = Grade.objects.prefetch_related(
+        Prefetch('subjects', queryset=Subject.objects.prefetch_related(_proficiencies_prefetch()))
+    )
+    grade = get_object_or_404(queryset, id=grade_id)
+    return {
+        'id': str(grade.id),
+        'name': grade.name,
+        'grade_code': grade.grade_code,
+        'subjects': [{
+            'id': str(subject.id),
+            'name': subject.name,
+            'icon': subject.icon,
+            'colorcode': subject.colorcode,
+            'subject_code': subject.subject_code,
+            'proficiencies': [
+                serialize_proficiency_node(proficiency) for proficiency in subject.proficiencies.all()
+            ]
+        } for subject in grade.subjects.all()]
+    }
+
+
+def load_subject_tree(subject_id):
+    """Subject -> Proficiency -> Lesson in three queries."""
+    queryset = Subject.objects.prefetch_related(_proficiencies_prefetch())
+    subject = get_object_or_404(queryset, id=subject_id)
+    return {
+        'id': str(subject.id),
+        'name': subject.name,
+        'icon': subject.icon,
+        'colorcode': subject.colorcode,
+        'proficiencies': [
+            serialize_proficiency_node(proficiency) for proficiency in subject.proficiencies.all()
+        ]
+    }
@@ -8,8 +8,11 @@ urlpatterns = [
     path('subjects/<uuid:subject_id>/', views.SubjectDetailView.as_view(), name='subject-detail'),
     path('proficiencies/<uuid:proficiency_id>/lessons/', views.ProficiencyLessonsView.as_view(), name='proficiency-lessons'),
     path('lessons/<uuid:lesson_id>/', views.LessonDetailView.as_view(), name='lesson-detail'),
+    path('lessons/batch/', views.LessonBatchView.as_view(), name='lesson-batch'),
     path('lessons/<uuid:lesson_id>/mark-done/', views.MarkLessonDoneView.as_view(), name='mark-lesson-done'),
     path('lessons/<uuid:lesson_id>/mark-not-done/', views.MarkLessonNotDoneView.as_view(), name='mark-lesson-not-done'),
+    path('lessons/mark-done/', views.BulkMarkLessonsDoneView.as_view(), name='bulk-mark-lessons-done'),
+    path('sync/', views.SyncView.as_view(), name='sync'),
     path('parse/', views.ParseCSVView.as_view(), name='test'),
     path('sheets/', views.GetAllSheetsView.as_view(), name='get-all-sheets'),
     path('sheets/parse/', views.ParseCSVView.as_view(), name='parse-csv'),
@@ -1,42 +1,51 @@
 from django.shortcuts import render, get_object_or_404
+from django.db import transaction
 from rest_framework.views import APIView
 from rest_framework.response import Response
 from rest_framework import status
-from .models import Campus, Subject, Grade, Proficiency, Lesson
+from .models import Campus, Subject, Proficiency, Lesson
+from .tree import load_grade_tree, load_subject_tree
+from .cache import get_or_build
+from .conditional import conditional_get, node_validators, lesson_validators
+from .fieldsets import InvalidFieldset, LessonFieldset
+from .projection import Projection
+from .sync import build_sync_payload, campus_deleted_since
+from .transitions import mark_lessons_done, set_lesson_done
+from .sheets import GoogleSheetsSource, SKIPPED_SHEETS
 from rest_framework.permissions import IsAuthenticated
 from rest_framework.decorators import permission_classes
 from rest_framework_simplejwt.authentication import JWTAuthentication
-import pandas as pd
 import math
 import os
 import glob
-from utils.notifications import notify_admins_lesson_completed
+from utils.notifications import notify_admins_lesson_completed, notify_admins_lessons_completed
 from django.utils import timezone
-import gspread
-from oauth2client.service_account import ServiceAccountCredentials
-import json
+from django.utils.dateparse import parse_datetime
+import uuid
+
+CAMPUS_PROJECTION = Projection({
+    'id': 'id',
+    'campus_code': 'campus_code',
+    'name': 'name',
+    'description': 'description',
+})
 
 class CampusListView(APIView):
     authentication_classes = [JWTAuthentication]
     permission_classes = [IsAuthenticated]
 
+    @conditional_get(node_validators('campuses'))
     def get(self, request):
-        campuses = Campus.objects.all()
-        data = [{
-            'id': str(campus.id),
-            'campus_code': campus.campus_code,
-            'name': campus.name,
-            'description': campus.description,
-        } for campus in campuses]
-        return Response(data)
+        return Response(get_or_build('campuses', None, lambda: CAMPUS_PROJECTION.rows(Campus.objects.all())))
 
 class CampusDetailView(APIView):
     permission_classes = [IsAuthenticated]
 
+    @conditional_get(node_validators('campus'))
     def get(self, request, campus_id):
-        try:
+        def build():
             campus = Campus.objects.get(id=campus_id)
-            data = {
+            return {
                 'id': str(campus.id),
                 'campus_code': campus.campus_code,
                 'name': campus.name,
@@ -47,143 +56,230 @@ class CampusDetailView(APIView):
                     'grade_code': grade.grade_code,
                 } for grade in campus.grades.all()]
             }
-            return Response(data)
+        try:
+            return Response(get_or_build('campus', campus_id, build))
         except Campus.DoesNotExist:
             return Response({'error': 'Campus not found'}, status=status.HTTP_404_NOT_FOUND)
 
 class GradeDetailView(APIView):
     permission_classes = [IsAuthenticated]
 
+    @conditional_get(node_validators('grade'))
     def get(self, request, grade_id):
-        grade = get_object_or_404(Grade, id=grade_id)
-        subjects = grade.subjects.all()
-        data = {
-            'id': str(grade.id),
-            'name': grade.name,
-            'grade_code': grade.grade_code,
-            'subjects': [{
-                'id': str(subject.id),
-                'name': subject.name,
-                'icon': subject.icon,
-                'colorcode': subject.colorcode,
-                'subject_code': subject.subject_code,
-                'proficiencies': [{
-                    'id': str(proficiency.id),
-                    'name': proficiency.name,
-                    'proficiency_code': proficiency.proficiency_code,
-                    'lessons': [{
-                        'id': str(lesson.id),
-                        'lesson_code': lesson.lesson_code,
-                        'name': lesson.name,
-                        'is_done': lesson.is_done
-                    } for lesson in proficiency.lessons.all()]
-                } for proficiency in subject.proficiencies.all()]
-            } for subject in subjects]
-        }
-        return Response(data)
+        return Response(get_or_build('grade', grade_id, lambda: load_grade_tree(grade_id)))
 
 class SubjectDetailView(APIView):
     permission_classes = [IsAuthenticated]
 
+    @conditional_get(node_validators('subject'))
     def get(self, request, subject_id):
-        subject = get_object_or_404(Subject, id=subject_id)
-        proficiencies = subject.proficiencies.all()
-        data = {
-            'id': str(subject.id),
-            'name': subject.name,
-            'icon': subject.icon,
-            'colorcode': subject.colorcode,
-            'proficiencies': [{
-                'id': str(proficiency.id),
-                'name': proficiency.name,
-                'proficiency_code': proficiency.proficiency_code,
-                'lessons': [{
-                    'id': str(lesson.id),
-                    'lesson_code': lesson.lesson_code,
-                    'name': lesson.name,
-                    'is_done': lesson.is_done,
-                    'verified':lesson.verified,
-                } for lesson in proficiency.lessons.all()]
-            } for proficiency in proficiencies]
-        }
-        return Response(data)
+        return Response(get_or_build('subject', subject_id, lambda: load_subject_tree(subject_id)))
+
+PROFICIENCY_LESSON_PROJECTION = Projection({
+    'id': 'id',
+    'lesson_code': 'lesson_code',
+    'name': 'name',
+    'is_done': 'is_done',
+    'verified': 'verified',
+    'created_at': 'created_at',
+})
 
 class ProficiencyLessonsView(APIView):
     permission_classes = [IsAuthenticated]
 
+    @conditional_get(node_validators('proficiency'))
     def get(self, request, proficiency_id):
-        proficiency = get_object_or_404(Proficiency, id=proficiency_id)
-        lessons = proficiency.lessons.all()
-        data = {
-            'proficiency_id': str(proficiency.id),
-            'proficiency_name': proficiency.name,
-            'proficiency_code': proficiency.proficiency_code,
-            'lessons': [{
-                'id': str(lesson.id),
-                'lesson_code': lesson.lesson_code,
-                'name': lesson.name,
-                'is_done': lesson.is_done,
-                'verified':lesson.verified,
-                'created_at':lesson.created_at
-            } for lesson in lessons]
-        }
-        return Response(data)
+        def build():
+            proficiency = get_object_or_404(Proficiency, id=proficiency_id)
+            return {
+                'proficiency_id': str(proficiency.id),
+                'proficiency_name': proficiency.name,
+                'proficiency_code': proficiency.proficiency_code,
+                'lessons': PROFICIENCY_LESSON_PROJECTION.rows(proficiency.lessons.all())
+            }
+        return Response(get_or_build('proficiency', proficiency_id, build))
+
+LESSON_DETAIL_FIELDSET = LessonFieldset({
+    'id': 'id',
+    'lesson_code': 'lesson_code',
+    'name': 'name',
+    'subject': 'subject__name',
+    'grade': 'grade__name',
+    'proficiency': 'proficiency__name',
+    'is_done': 'is_done',
+    'verified': 'verified',
+    'objective': 'objective',
+    'duration': 'duration',
+    'specific_learning_outcome': 'specific_learning_outcome',
+    'behavioral_outcome': 'behavioral_outcome',
+    'materials_required': 'materials_required',
+    'resources': 'resources',
+    'activate': 'activate',
+    'acquire': 'acquire',
+    'apply': 'apply',
+    'assess': 'assess',
+    'created_at': 'created_at',
+})
 
 class LessonDetailView(APIView):
     permission_classes = [IsAuthenticated]
 
+    @conditional_get(lesson_validators)
     def get(self, request, lesson_id):
-        lesson = get_object_or_404(Lesson, id=lesson_id)
-        data = {
-            'id': str(lesson.id),
-            'lesson_code': lesson.lesson_code,
-            'name': lesson.name,
-            'subject': lesson.subject.name,
-            'grade': lesson.grade.name,
-            'proficiency': lesson.proficiency.name,
-            'is_done': lesson.is_done,
-            'verified': lesson.verified,
-            'objective': lesson.objective,
-            'duration': lesson.duration,
-            'specific_learning_outcome': lesson.specific_learning_outcome,
-            'behavioral_outcome': lesson.behavioral_outcome,
-            'materials_required': lesson.materials_required,
-            'resources': lesson.resources,
-            'verified': lesson.verified,
-            'activate': lesson.activate,
-            'acquire': lesson.acquire,
-            'apply': lesson.apply,
-            'assess': lesson.assess,
-            'created_at': lesson.created_at
-        }
-        return Response(data)
+        try:
+            selected = LESSON_DETAIL_FIELDSET.select(request.query_params)
+        except InvalidFieldset as e:
+            return Response({'error': str(e)}, status=status.HTTP_400_BAD_REQUEST)
+        projection = LESSON_DETAIL_FIELDSET.projection(selected)
+        row = get_object_or_404(Lesson.objects.values_list(*projection.lookups), id=lesson_id)
+        return Response(projection.build(row))
+
+MAX_LESSON_BATCH = 50
+
+class LessonBatchView(APIView):
+    """Full details for several lessons at once: ``?ids=`` or ``?lesson_codes=``
+    (comma separated). Entries come back in the requested order, with an
+    error entry for each one that does not exist."""
+    permission_classes = [IsAuthenticated]
+
+    def get(self, request):
+        ids = request.query_params.get('ids')
+        codes = request.query_params.get('lesson_codes')
+        if bool(ids) == bool(codes):
+            return Response({'error': 'Provide either ids or lesson_codes'}, status=status.HTTP_400_BAD_REQUEST)
+        key = 'id' if ids else 'lesson_code'
+        requested = [value.strip() for value in (ids or codes).split(',') if value.strip()]
+        if len(requested) > MAX_LESSON_BATCH:
+            return Response({'error': f'At most {MAX_LESSON_BATCH} lessons per request'}, status=status.HTTP_400_BAD_REQUEST)
+        try:
+            selected = LESSON_DETAIL_FIELDSET.select(request.query_params)
+        except InvalidFieldset as e:
+            return Response({'error': str(e)}, status=status.HTTP_400_BAD_REQUEST)
+
+        lookups = {}
+        for value in requested:
+            if key == 'id':
+                try:
+                    lookups[value] = uuid.UUID(value)
+                except ValueError:
+                    continue
+            else:
+                lookups[value] = value
+
+        found = {}
+        if lookups:
+            projection = LESSON_DETAIL_FIELDSET.projection(selected)
+            queryset = Lesson.objects.filter(**{f'{key}__in': set(lookups.values())})
+            # The lookup key trails the projected columns to match rows back.
+            for row in queryset.values_list(*projection.lookups, key):
+                found[row[-1]] = projection.build(row)
+
+        data = []
+        for value in requested:
+            lesson = found.get(lookups.get(value))
+            data.append(lesson if lesson is not None else {key: value, 'error': 'Lesson not found'})
+        return Response({'lessons': data})
+
+class SyncView(APIView):
+    permission_classes = [IsAuthenticated]
+
+    def get(self, request):
+        campus_id = request.query_params.get('campus')
+        since = request.query_params.get('since')
+        if not campus_id:
+            return Response({'error': 'campus is required'}, status=status.HTTP_400_BAD_REQUEST)
+        try:
+            campus_id = uuid.UUID(campus_id)
+        except ValueError:
+            return Response({'error': 'Invalid campus'}, status=status.HTTP_400_BAD_REQUEST)
+        if since:
+            since = parse_datetime(since)
+            if since is None:
+                return Response({'error': 'Invalid since cursor'}, status=status.HTTP_400_BAD_REQUEST)
+            if timezone.is_naive(since):
+                since = timezone.make_aware(since)
+
+        campus = Campus.objects.filter(id=campus_id).first()
+        if campus is None:
+            if since and campus_deleted_since(campus_id, since):
+                return Response({'cursor': timezone.now().isoformat(), 'campus_deleted': True})
+            return Response({'error': 'Campus not found'}, status=status.HTTP_404_NOT_FOUND)
+        return Response(build_sync_payload(campus, since or None))
 
 class MarkLessonDoneView(APIView):
     permission_classes = [IsAuthenticated]
 
     def post(self, request, lesson_id):
-        lesson = get_object_or_404(Lesson, id=lesson_id)
-        lesson.is_done = True
-        lesson.completed_by = request.user
-        lesson.completed_at = timezone.now()
-        lesson.save()
-        
-        # Send notification to admins
-        notify_admins_lesson_completed(lesson, request.user)
-        
+        try:
+            with transaction.atomic():
+                lesson = set_lesson_done(lesson_id, True, request.user)
+                if lesson:
+                    # Queued for the send_notifications worker
+                    notify_admins_lesson_completed(lesson, request.user)
+        except Lesson.DoesNotExist:
+            return Response({'error': 'Lesson not found'}, status=status.HTTP_404_NOT_FOUND)
+        if lesson is None:
+            return Response({'message': 'Lesson already marked as done'}, status=status.HTTP_200_OK)
         return Response({'message': 'Lesson marked as done'}, status=status.HTTP_200_OK)
 
 class MarkLessonNotDoneView(APIView):
     permission_classes = [IsAuthenticated]
 
     def post(self, request, lesson_id):
-        lesson = get_object_or_404(Lesson, id=lesson_id)
-        lesson.is_done = False
-        lesson.save()
+        try:
+            lesson = set_lesson_done(lesson_id, False)
+        except Lesson.DoesNotExist:
+            return Response({'error': 'Lesson not found'}, status=status.HTTP_404_NOT_FOUND)
+        if lesson is None:
+            return Response({'message': 'Lesson already marked as not done'}, status=status.HTTP_200_OK)
         return Response({'message': 'Lesson marked as not done'}, status=status.HTTP_200_OK)
 
+class BulkMarkLessonsDoneView(APIView):
+    """Mark up to MAX_LESSON_BATCH lessons done at once from ``lesson_ids``.
+    Admins get a single notification for all the lessons that changed."""
+    permission_classes = [IsAuthenticated]
+
+    def post(self, request):
+        requested = request.data.get('lesson_ids')
+        if not isinstance(requested, list) or not requested:
+            return Response({'error': 'lesson_ids must be a non-empty list'}, status=status.HTTP_400_BAD_REQUEST)
+        if len(requested) > MAX_LESSON_BATCH:
+            return Response({'error': f'At most {MAX_LESSON_BATCH} lessons per request'}, status=status.HTTP_400_BAD_REQUEST)
+
+        requested = [str(value) for value in requested]
+        lookups = {}
+        for value in requested:
+            try:
+                lookups[value] = uuid.UUID(value)
+            except ValueError:
+                continue
+
+        with transaction.atomic():
+            changed = mark_lessons_done(set(lookups.values()), request.user)
+            if changed:
+                # Queued for the send_notifications worker
+                notify_admins_lessons_completed(changed, request.user)
+            changed_ids = {lesson.id for lesson in changed}
+            existing = set(Lesson.objects.filter(id__in=set(lookups.values())).values_list('id', flat=True))
+
+        results = []
+        for value in requested:
+            lesson_id = lookups.get(value)
+            if lesson_id in changed_ids:
+                result = 'marked_done'
+            elif lesson_id in existing:
+                result = 'already_done'
+            else:
+                result = 'not_found'
+            results.append({'id': value, 'result': result})
+        return Response({'results': results, 'marked_done': len(changed_ids)}, status=status.HTTP_200_OK)
+
 class GetAllSheetsView(APIView):
     def get(self, request):
+        # Imported here so worker boot does not pay for the Sheets client
+        import gspread
+        from oauth2client.service_account import ServiceAccountCredentials
+
         # Define the scope
         scope = ["https://spreadsheets.google.com/feeds", "https://www.googleapis.com/auth/drive"]
 
@@ -206,197 +302,45 @@ class GetAllSheetsView(APIView):
         return Response({"sheets": sheet_names}, status=status.HTTP_200_OK)
     
 class ParseCSVView(APIView):
+    def get_source(self):
+        return GoogleSheetsSource()
+
     def get(self, request):
-        created_lessons = []
+        # Imported here to keep numpy out of worker boot
+        from .importer import LessonImporter
+
         not_found_content = []
-        error_details = []
 
         try:
-            # Setup Google Sheets authentication
-            scope = ['https://spreadsheets.google.com/feeds', 'https://www.googleapis.com/auth/drive']
-            creds = ServiceAccountCredentials.from_json_keyfile_name(
-                'belakoo-fdc48-de4dfbe50d3e.json', 
-                scope
-            )
-            client = gspread.authorize(creds)
-
-            # Open the spreadsheet
-            sheet_url = 'https://docs.google.com/spreadsheets/d/1nEyg7CFFocOWb4o_rgnUD7aBb1xD0Y44IMtUq4YHQCc'
-            spreadsheet = client.open_by_url(sheet_url)
+            source = self.get_source()
 
             # Get all worksheets except 'Instr & Obj'
-            worksheets = [sheet for sheet in spreadsheet.worksheets() if sheet.title != 'Instr & Obj']
+            worksheets = [title for title in source.titles() if title not in SKIPPED_SHEETS]
             if not worksheets:
                 return Response({"error": "No valid worksheets found"}, status=status.HTTP_404_NOT_FOUND)
             
             print(f"Found {len(worksheets)} worksheets to process")
+
+            # Fetch every worksheet up front, in a few batched requests
+            sheets = source.fetch(worksheets)
             
             # Get campus
             campus = Campus.objects.get(campus_code='c1')
             print(f"Found campus: {campus.name}")
 
-            # Process each worksheet
-            for worksheet in worksheets:
-                try:
-                    print(f"\nProcessing worksheet: {worksheet.title}")
-                    
-                    # Convert to DataFrame
-                    data = worksheet.get_all_values()
-                    df = pd.DataFrame(data)
-                    print(f"Created DataFrame for {worksheet.title}")
-
-                    lesson_code = worksheet.title
-                    print(f"Using lesson_code from filename: {lesson_code}")
-
-                    if not lesson_code:
-                        raise Exception("LESSON CODE not found")
-
-                    # Split lesson code
-                    code_parts = lesson_code.split('.')
-                    if len(code_parts) != 4:
-                        raise Exception("Invalid LESSON CODE format")
-
-                    subject_code, grade_code, lesson_number, proficiency_code = code_parts
-                    print(f"Parsed codes - Subject: {subject_code}, Grade: {grade_code}, Lesson: {lesson_number}, Proficiency: {proficiency_code}")
-
-                    # Check for spelling mistake in subject code
-                    if subject_code == 'L1':
-                        print(f"Spelling mistake found in subject code: {subject_code} for lesson: {lesson_code}")
-
-                    # Helper functions
-                    def get_field_value(field_name):
-                        for i, row in df.iterrows():
-                            if field_name in row.values:
-                                col_index = row.tolist().index(field_name)
-                                if col_index + 1 < len(row):
-                                    return row[col_index + 1]
-                        return ''
-
-                    def get_structured_field_value(field_name):
-                        for i, row in df.iterrows():
-                            if field_name in row.values:
-                                col_index = row.tolist().index(field_name)
-                                if col_index + 1 < len(row):
-                                    return [{
-                                        "title": field_name,
-                                        "desc": row[col_index + 1]
-                                    }]
-                        return []
-
-                    def get_resources_value(field_name):
-                        for i, row in df.iterrows():
-                            if field_name in row.values:
-                                col_index = row.tolist().index(field_name)
-                                if col_index + 2 < len(row):
-                                    return row[col_index + 2]
-                        return ''
-
-                    # Process Grade
-                    grade = Grade.objects.filter(grade_code=grade_code, campus=campus).first()
-                    if not grade:
-                        grade = Grade.objects.create(
-                            grade_code=grade_code,
-                            campus=campus,
-                            name=grade_code
-                        )
-                        print(f"Created new grade: {grade.name}")
-                    else:
-                        print(f"Found existing grade: {grade.name}")
-
-                    # Process Subject
-                    subject = Subject.objects.filter(subject_code=subject_code, grade=grade).first()
-                    if not subject:
-                        subject = Subject.objects.create(
-                            subject_code="LI",
-                            grade=grade,
-                            name="Learning and Innovation",
-                            icon='https://drive.google.com/file/d/17MXDDSH42Xsfj7Q7pJqEaiTYAUKJlmUk/view?usp=drive_link',
-                            colorcode='#00FF00'
-                        )
-                        print(f"Created new subject: {subject.name}")
-                    else:
-                        print(f"Found existing subject: {subject.name}")
-
-                    # Process Proficiency
-                    proficiency = Proficiency.objects.filter(proficiency_code=proficiency_code, subject=subject).first()
-                    if not proficiency:
-                        proficiency = Proficiency.objects.create(
-                            proficiency_code=proficiency_code,
-                            subject=subject,
-                            name=proficiency_code
-                        )
-                        print(f"Created new proficiency: {proficiency.name}")
-                    else:
-                        print(f"Found existing proficiency: {proficiency.name}")
-
-                    # Create structured JSON fields
-                    activate_data = []
-                    for field in ['HOOK','ASSESS','INFORM']:
-                        field_data = get_structured_field_value(field)
-                        if field_data:
-                            activate_data.extend(field_data)
-                    
-                    acquire_data = []
-                    for field in ['ENGAGE', 'TEACH']:
-                        field_data = get_structured_field_value(field)
-                        if field_data:
-                            acquire_data.extend(field_data)
-                    
-                    apply_data = []
-                    for field in ['GUIDED PRACTICE', 'INDEPENDENT PRACTICE']:
-                        field_data = get_structured_field_value(field)
-                        if field_data:
-                            apply_data.extend(field_data)
-                    
-                    assess_data = []
-                    for field in ['ASSESSMENT', 'SHARE']:
-                        field_data = get_structured_field_value(field)
-                        if field_data:
-                            assess_data.extend(field_data)
-
-                    # Create Lesson
-                    try:
-                        lesson = Lesson.objects.create(
-                            lesson_code=lesson_code,
-                            name=f"Lesson {lesson_number}",
-                            subject=subject,
-                            grade=grade,
-                            proficiency=proficiency,
-                            objective=get_field_value('OBJECTIVE'),
-                            duration=get_field_value('Duration'),
-                            specific_learning_outcome=get_field_value('Specific Learning Outcome '),
-                            behavioral_outcome=get_field_value('Behavioural Outcome'),
-                            materials_required=get_field_value('Materials Required'),
-                            activate=json.dumps(activate_data),
-                            acquire=json.dumps(acquire_data),
-                            apply=json.dumps(apply_data),
-                            assess=json.dumps(assess_data),
-                            resources=get_resources_value('RESOURCES')
-                        )
-                        print(f"Created lesson: {lesson.name} with structured JSON fields")
-                        created_lessons.append({'sheet': worksheet.title, 'lesson_code': lesson.lesson_code})
-
-                    except Exception as e:
-                        error_details.append({
-                            'sheet': worksheet.title,
-                            'lesson_code': lesson_code,
-                            'error': str(e)
-                        })
-                        print(f"Error creating lesson: {str(e)}")
-                        continue
-
-                except Exception as worksheet_error:
-                    error_details.append({
-                        'sheet': worksheet.title,
-                        'error': str(worksheet_error)
-                    })
-                    print(f"Error processing worksheet {worksheet.title}: {str(worksheet_error)}")
-                    continue
+            importer = LessonImporter(campus, upsert=request.query_params.get('mode') == 'upsert')
+            created_lessons, error_details = importer.run(sheets)
+            print(
+                f"Created {len(created_lessons)} lessons, updated {len(importer.updated_lessons)}, "
+                f"{len(importer.unchanged_lessons)} unchanged, {len(error_details)} worksheets with errors"
+            )
 
             response_data = {
                 "message": "All sheets processed",
                 "total_sheets": len(worksheets),
                 "created_lessons": created_lessons,
+                "updated_lessons": importer.updated_lessons,
+                "unchanged_lessons": len(importer.unchanged_lessons),
                 "not_found_content": not_found_content,
                 "error_details": error_details
             }
@@ -407,204 +351,41 @@ class ParseCSVView(APIView):
             return Response({"error": str(e)}, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
 
 class ParseSpecificLessonView(APIView):
+    def get_source(self):
+        return GoogleSheetsSource()
+
     def get(self, request):
-        created_lessons = []
+        # Imported here to keep numpy out of worker boot
+        from .importer import LessonImporter
+
         not_found_content = []
-        error_details = []
 
         try:
-            # Setup Google Sheets authentication
-            scope = ['https://spreadsheets.google.com/feeds', 'https://www.googleapis.com/auth/drive']
-            creds = ServiceAccountCredentials.from_json_keyfile_name(
-                'belakoo-fdc48-de4dfbe50d3e.json', 
-                scope
-            )
-            print("Google Sheets authentication setup complete.")
-            client = gspread.authorize(creds)
-            print("Authorized Google Sheets client.")
-
-            # Open the spreadsheet
-            sheet_url = 'https://docs.google.com/spreadsheets/d/1nEyg7CFFocOWb4o_rgnUD7aBb1xD0Y44IMtUq4YHQCc'
-            spreadsheet = client.open_by_url(sheet_url)
-            print("Spreadsheet opened successfully.")
+            source = self.get_source()
 
             # Get all worksheets except 'Instr & Obj'
-            worksheets = [sheet for sheet in spreadsheet.worksheets() if sheet.title != 'Instr & Obj']
+            worksheets = [title for title in source.titles() if title not in SKIPPED_SHEETS]
             print(f"Found {len(worksheets)} worksheets to process.")
             if not worksheets:
                 return Response({"error": "No valid worksheets found"}, status=status.HTTP_404_NOT_FOUND)
+
+            # Only the specific lesson's worksheet is fetched
+            sheets = source.fetch([title for title in worksheets if title == 'LI.K1.C3.P1'])
             
             # Get campus
             campus = Campus.objects.get(campus_code='c1')
             print(f"Found campus: {campus.name}")
 
             # Process only the specific worksheet
-            for worksheet in worksheets:
-                if worksheet.title != 'LI.K1.C3.P1':  # Only process the specific lesson
-                    print(f"Skipping worksheet: {worksheet.title}")
-                    continue
-                
-                try:
-                    print(f"\nProcessing worksheet: {worksheet.title}")
-                    
-                    # Convert to DataFrame
-                    data = worksheet.get_all_values()
-                    df = pd.DataFrame(data)
-                    print(f"Created DataFrame for {worksheet.title}")
-
-                    lesson_code = worksheet.title
-                    print(f"Using lesson_code from filename: {lesson_code}")
-
-                    if not lesson_code:
-                        raise Exception("LESSON CODE not found")
-
-                    # Split lesson code
-                    code_parts = lesson_code.split('.')
-                    print(f"Split lesson code into parts: {code_parts}")
-                    if len(code_parts) != 4:
-                        raise Exception("Invalid LESSON CODE format")
-
-                    subject_code, grade_code, lesson_number, proficiency_code = code_parts
-                    print(f"Parsed codes - Subject: {subject_code}, Grade: {grade_code}, Lesson: {lesson_number}, Proficiency: {proficiency_code}")
-
-                    # Helper functions
-                    def get_field_value(field_name):
-                        for i, row in df.iterrows():
-                            if field_name in row.values:
-                                col_index = row.tolist().index(field_name)
-                                if col_index + 1 < len(row):
-                                    return row[col_index + 1]
-                        return ''
-
-                    def get_structured_field_value(field_name):
-                        for i, row in df.iterrows():
-                            if field_name in row.values:
-                                col_index = row.tolist().index(field_name)
-                                if col_index + 1 < len(row):
-                                    return [{
-                                        "title": field_name,
-                                        "desc": row[col_index + 1]
-                                    }]
-                        return []
-
-                    def get_resources_value(field_name):
-                        for i, row in df.iterrows():
-                            if field_name in row.values:
-                                col_index = row.tolist().index(field_name)
-                                if col_index + 2 < len(row):
-                                    return row[col_index + 2]
-                        return ''
-
-                    # Process Grade
-                    grade = Grade.objects.filter(grade_code=grade_code, campus=campus).first()
-                    if not grade:
-                        grade = Grade.objects.create(
-                            grade_code=grade_code,
-                            campus=campus,
-                            name=grade_code
-                        )
-                        print(f"Created new grade: {grade.name}")
-                    else:
-                        print(f"Found existing grade: {grade.name}")
-
-                    # Process Subject
-                    subject = Subject.objects.filter(subject_code=subject_code, grade=grade).first()
-                    if not subject:
-                        subject = Subject.objects.create(
-                            subject_code=subject_code,
-                            grade=grade,
-                            name="Learning and Innovation",
-                            icon='https://drive.google.com/file/d/17MXDDSH42Xsfj7Q7pJqEaiTYAUKJlmUk/view?usp=drive_link',
-                            colorcode='#00FF00'
-                        )
-                        print(f"Created new subject: {subject.name}")
-                    else:
-                        print(f"Found existing subject: {subject.name}")
-
-                    # Process Proficiency
-                    proficiency = Proficiency.objects.filter(proficiency_code=proficiency_code, subject=subject).first()
-                    if not proficiency:
-                        proficiency = Proficiency.objects.create(
-                            proficiency_code=proficiency_code,
-                            subject=subject,
-                            name=proficiency_code
-                        )
-                        print(f"Created new proficiency: {proficiency.name}")
-                    else:
-                        print(f"Found existing proficiency: {proficiency.name}")
-
-                    # Create structured JSON fields
-                    activate_data = []
-                    for field in ['HOOK','ASSESS','INFORM']:
-                        field_data = get_structured_field_value(field)
-                        if field_data:
-                            activate_data.extend(field_data)
-                            print(f"Added structured field data for {field}: {field_data}")
-                    
-                    acquire_data = []
-                    for field in ['ENGAGE', 'TEACH']:
-                        field_data = get_structured_field_value(field)
-                        if field_data:
-                            acquire_data.extend(field_data)
-                            print(f"Added structured field data for {field}: {field_data}")
-                    
-                    apply_data = []
-                    for field in ['GUIDED PRACTICE', 'INDEPENDENT PRACTICE']:
-                        field_data = get_structured_field_value(field)
-                        if field_data:
-                            apply_data.extend(field_data)
-                            print(f"Added structured field data for {field}: {field_data}")
-                    
-                    assess_data = []
-                    for field in ['ASSESSMENT', 'SHARE']:
-                        field_data = get_structured_field_value(field)
-                        if field_data:
-                            assess_data.extend(field_data)
-                            print(f"Added structured field data for {field}: {field_data}")
-
-                    # Create Lesson
-                    try:
-                        lesson = Lesson.objects.create(
-                            lesson_code=lesson_code,
-                            name=f"Lesson {lesson_number}",
-                            subject=subject,
-                            grade=grade,
-                            proficiency=proficiency,
-                            objective=get_field_value('OBJECTIVE'),
-                            duration=get_field_value('Duration'),
-                            specific_learning_outcome=get_field_value('Specific Learning Outcome '),
-                            behavioral_outcome=get_field_value('Behavioural Outcome'),
-                            materials_required=get_field_value('Materials Required'),
-                            activate=json.dumps(activate_data),
-                            acquire=json.dumps(acquire_data),
-                            apply=json.dumps(apply_data),
-                            assess=json.dumps(assess_data),
-                            resources=get_resources_value('RESOURCES')
-                        )
-                        print(f"Created lesson: {lesson.name} with structured JSON fields")
-                        created_lessons.append({'sheet': worksheet.title, 'lesson_code': lesson.lesson_code})
-
-                    except Exception as e:
-                        error_details.append({
-                            'sheet': worksheet.title,
-                            'lesson_code': lesson_code,
-                            'error': str(e)
-                        })
-                        print(f"Error creating lesson: {str(e)}")
-                        continue
-
-                except Exception as worksheet_error:
-                    error_details.append({
-                        'sheet': worksheet.title,
-                        'error': str(worksheet_error)
-                    })
-                    print(f"Error processing worksheet {worksheet.title}: {str(worksheet_error)}")
-                    continue
+            importer = LessonImporter(campus, upsert=request.query_params.get('mode') == 'upsert')
+            created_lessons, error_details = importer.run(sheets)
 
             response_data = {
                 "message": "Specific lesson processed",
                 "total_sheets": len(worksheets),
                 "created_lessons": created_lessons,
+                "updated_lessons": importer.updated_lessons,
+                "unchanged_lessons": len(importer.unchanged_lessons),
                 "not_found_content": not_found_content,
                 "error_details": error_details
             }
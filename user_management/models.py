@@ -1,8 +1,6 @@
 from django.contrib.auth.models import AbstractBaseUser, BaseUserManager, PermissionsMixin
 from django.db import models
 import uuid
-from exponent_server_sdk import PushClient
-from exponent_server_sdk import PushMessage
 
 class CustomUserManager(BaseUserManager):
     def create_user(self, email, password=None, **extra_fields):
@@ -44,6 +42,9 @@ class User(AbstractBaseUser, PermissionsMixin):
         return self.email
 
 def send_push_notification(expo_token, title, message):
+    from exponent_server_sdk import PushClient
+    from exponent_server_sdk import PushMessage
+
     try:
         response = PushClient().publish(
             PushMessage(to=expo_token,
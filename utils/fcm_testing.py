@@ -0,0 +1,93 @@
+"""A local stand-in for the FCM v1 send endpoint, for tests and benchmarks.
+
+    with FakeFCMServer(latency=0.02, dead_tokens={'old-phone'}) as server:
+        transport = FirebaseTransport(app=server.app)
+"""
+import json
+import threading
+import time
+import uuid
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import firebase_admin
+from firebase_admin import credentials, messaging
+from google.auth.credentials import AnonymousCredentials
+
+
+class _AnonymousCredential(credentials.Base):
+    def get_credential(self):
+        return AnonymousCredentials()
+
+
+class FakeFCMServer:
+    """Answers each send after ``latency`` seconds; tokens in ``dead_tokens``
+    get FCM's UNREGISTERED error and those in ``invalid_tokens`` get
+    INVALID_ARGUMENT. ``requests`` counts the HTTP calls received and
+    ``delivered`` lists the tokens that were accepted."""
+
+    def __init__(self, latency=0.0, dead_tokens=(), invalid_tokens=()):
+        self.latency = latency
+        self.dead_tokens = set(dead_tokens)
+        self.invalid_tokens = set(invalid_tokens)
+        self.requests = 0
+        self.delivered = []
+        self._lock = threading.Lock()
+        self._httpd = ThreadingHTTPServer(('127.0.0.1', 0), self._handler())
+        self._httpd.daemon_threads = True
+        self.app = None
+
+    def _handler(self):
+        server = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = 'HTTP/1.1'
+
+            def do_POST(self):
+                body = json.loads(self.rfile.read(int(self.headers['Content-Length'])))
+                status, payload = server.respond(body['message'].get('token'))
+                data = json.dumps(payload).encode()
+                self.send_response(status)
+                self.send_header('Content-Type', 'application/json')
+                self.send_header('Content-Length', str(len(data)))
+                self.end_headers()
+                self.wfile.write(data)
+
+            def log_message(self, *args):
+                pass
+
+        return Handler
+
+    def respond(self, token):
+        time.sleep(self.latency)
+        with self._lock:
+            self.requests += 1
+            if token in self.dead_tokens:
+                return 404, _error(404, 'NOT_FOUND', 'UNREGISTERED')
+            if token in self.invalid_tokens:
+                return 400, _error(400, 'INVALID_ARGUMENT', 'INVALID_ARGUMENT')
+            self.delivered.append(token)
+        return 200, {'name': f'projects/fake/messages/{uuid.uuid4()}'}
+
+    def __enter__(self):
+        threading.Thread(target=self._httpd.serve_forever, daemon=True).start()
+        self.app = firebase_admin.initialize_app(
+            _AnonymousCredential(), {'projectId': 'fake'}, name=f'fake-fcm-{uuid.uuid4()}'
+        )
+        messaging._get_messaging_service(self.app)._fcm_url = (
+            f'http://127.0.0.1:{self._httpd.server_port}/v1/projects/fake/messages:send'
+        )
+        return self
+
+    def __exit__(self, *exc):
+        firebase_admin.delete_app(self.app)
+        self._httpd.shutdown()
+        self._httpd.server_close()
+
+
+def _error(code, status, error_code):
+    return {'error': {
+        'code': code,
+        'message': error_code,
+        'status': status,
+        'details': [{'@type': 'type.googleapis.com/google.firebase.fcm.v1.FcmError', 'errorCode': error_code}],
+    }}
@@ -0,0 +1,33 @@
+import functools
+import threading
+
+
+def lazy_client(factory):
+    """Return an accessor that builds ``factory()`` on first call and then
+    keeps returning the same object.
+
+    Use it for clients that are slow to import or construct, or that need
+    credentials, so they are set up by the first request that uses them
+    rather than when the worker boots. The accessor is thread-safe, and
+    ``accessor.reset()`` drops the cached object.
+    """
+    lock = threading.Lock()
+    missing = object()
+    client = missing
+
+    @functools.wraps(factory)
+    def get():
+        nonlocal client
+        if client is missing:
+            with lock:
+                if client is missing:
+                    client = factory()
+        return client
+
+    def reset():
+        nonlocal client
+        with lock:
+            client = missing
+
+    get.reset = reset
+    return get
@@ -1,25 +1,40 @@
 import os
 import json
-import firebase_admin
-from firebase_admin import credentials, messaging
+import math
+from collections import namedtuple
+from datetime import datetime, timezone as dt_timezone
 from django.conf import settings
+from django.utils import timezone
+from django.utils.module_loading import import_string
 from user_management.models import User
+from admin_management.models import Notification
+from .lazy import lazy_client
+
+
+class DeliveryError(Exception):
+    pass
 
 def initialize_firebase():
+    import firebase_admin
+    from firebase_admin import credentials
+
     try:
         # Check if already initialized
-        firebase_admin.get_app()
+        app = firebase_admin.get_app()
         print("Firebase already initialized")
     except ValueError:
         # Use credentials from settings
-        cred = credentials.Certificate(settings.FIREBASE_ADMIN_CREDENTIALS)
-        firebase_admin.initialize_app(cred)
+        cred = credentials.Certificate(settings.FIREBASE_ADMIN_CREDENTIALS_PATH)
+        app = firebase_admin.initialize_app(cred)
         print("Firebase initialized")
+    return app
 
-# Initialize Firebase when module loads
-initialize_firebase()
+# Firebase is initialized by the first notification sent, not when the module loads
+firebase_app = lazy_client(initialize_firebase)
 
 def send_push_notification(fcm_token, title, message, data=None):
+    from firebase_admin import messaging
+
     try:
         message = messaging.Message(
             notification=messaging.Notification(
@@ -30,28 +45,187 @@ def send_push_notification(fcm_token, title, message, data=None):
             token=fcm_token,
         )
         
-        response = messaging.send(message)
+        response = messaging.send(message, app=firebase_app())
         print(f"Successfully sent message: {response}")
         return True
     except Exception as e:
         print(f"Error sending notification: {str(e)}")
         return False
 
+# FCM accepts at most this many tokens in one multicast message.
+FCM_MULTICAST_LIMIT = 500
+
+TokenResult = namedtuple('TokenResult', ['token', 'success', 'error_code', 'error'])
+
+def fcm_error_code(exception):
+    from firebase_admin import messaging
+
+    if isinstance(exception, messaging.UnregisteredError):
+        return 'UNREGISTERED'
+    return getattr(exception, 'code', None) or 'UNKNOWN'
+
+class FirebaseTransport:
+    """Sends one multicast batch through the Firebase Admin SDK, which posts
+    the per-token requests concurrently over a shared session."""
+
+    def __init__(self, app=None):
+        self.app = app
+
+    def send(self, tokens, title, message, data):
+        from firebase_admin import messaging
+
+        response = messaging.send_each_for_multicast(
+            messaging.MulticastMessage(
+                tokens=tokens,
+                notification=messaging.Notification(title=title, body=message),
+                data=data,
+            ),
+            app=self.app or firebase_app(),
+        )
+        return [
+            TokenResult(token, True, None, None) if result.success
+            else TokenResult(token, False, fcm_error_code(result.exception), str(result.exception))
+            for token, result in zip(tokens, response.responses)
+        ]
+
+def get_transport():
+    return import_string(settings.PUSH_NOTIFICATION_TRANSPORT)()
+
+def send_multicast(tokens, title, message, data=None, transport=None):
+    """Send one notification to every token, FCM_MULTICAST_LIMIT tokens per
+    batch, and return a TokenResult per token.
+
+    ``transport`` is any object with ``send(tokens, title, message, data)``
+    returning TokenResults; it defaults to PUSH_NOTIFICATION_TRANSPORT.
+    Errors affecting a whole batch are raised.
+    """
+    transport = transport or get_transport()
+    results = []
+    for start in range(0, len(tokens), FCM_MULTICAST_LIMIT):
+        results += transport.send(tokens[start:start + FCM_MULTICAST_LIMIT], title, message, data or {})
+    return results
+
+def digest_due_at(now, window):
+    """End of the ``window``-second digest period containing ``now``."""
+    return datetime.fromtimestamp(math.ceil(now.timestamp() / window) * window, tz=dt_timezone.utc)
+
 def notify_admins_lesson_completed(lesson, completed_by):
-    admins = User.objects.filter(
+    """Queue the completion notification for the admins.
+
+    Call inside the transaction that marks the lesson done; the
+    send_notifications worker does the actual delivery. With
+    NOTIFICATION_DIGEST_WINDOW set, the completion waits for the end of the
+    current window and goes out in one digest with the others from it.
+    """
+    payload = {
+        "lesson_id": str(lesson.id),
+        "lesson_code": lesson.lesson_code,
+        "lesson_name": lesson.name,
+        "completed_by_id": str(completed_by.id),
+        "completed_by_name": completed_by.name,
+    }
+    window = settings.NOTIFICATION_DIGEST_WINDOW
+    if window:
+        return Notification.objects.create(
+            kind=Notification.Kind.LESSON_DIGEST,
+            payload=payload,
+            available_at=digest_due_at(timezone.now(), window),
+        )
+    return Notification.objects.create(kind=Notification.Kind.LESSON_COMPLETION, payload=payload)
+
+def notify_admins_lessons_completed(lessons, completed_by):
+    """Queue one notification for several lessons completed together."""
+    if len(lessons) == 1:
+        return notify_admins_lesson_completed(lessons[0], completed_by)
+    window = settings.NOTIFICATION_DIGEST_WINDOW
+    return Notification.objects.create(
+        kind=Notification.Kind.LESSON_DIGEST,
+        payload={
+            "lesson_ids": [str(lesson.id) for lesson in lessons],
+            "completed_by_id": str(completed_by.id),
+            "completed_by_name": completed_by.name,
+        },
+        available_at=digest_due_at(timezone.now(), window) if window else timezone.now(),
+    )
+
+# FCM error codes after which a token will never be accepted again
+DEAD_TOKEN_ERRORS = ('UNREGISTERED',)
+# Also returned for a malformed message, so these only count against a token
+# when another token in the same fan-out got through
+SUSPECT_TOKEN_ERRORS = ('INVALID_ARGUMENT',)
+
+def dead_tokens(results):
+    """Tokens FCM rejected for good."""
+    errors = DEAD_TOKEN_ERRORS
+    if any(result.success for result in results):
+        errors += SUSPECT_TOKEN_ERRORS
+    return {result.token for result in results if result.error_code in errors}
+
+def prune_dead_tokens(tokens):
+    """Clear the fcm_token of every user with one of ``tokens``."""
+    if not tokens:
+        return 0
+    return User.objects.filter(fcm_token__in=tokens).update(fcm_token=None)
+
+def send_to_admins(title, message, data):
+    """Fan a notification out to every admin device, then drop dead tokens.
+
+    Raises DeliveryError when no device accepted it for a reason that a
+    retry could fix.
+    """
+    tokens = list(User.objects.filter(
         role='ADMIN',
         fcm_token__isnull=False
+    ).exclude(fcm_token='').values_list('fcm_token', flat=True))
+
+    results = send_multicast(tokens, title, message, data)
+    failed = [result for result in results if not result.success]
+    if not failed:
+        return results
+    dead = dead_tokens(results)
+    pruned = prune_dead_tokens(dead)
+    print(f"Failed to notify {len(failed)} of {len(results)} admin devices "
+          f"({', '.join(sorted({result.error_code for result in failed}))}); "
+          f"cleared {pruned} dead tokens")
+    if len(failed) == len(results) and any(result.token not in dead for result in failed):
+        raise DeliveryError(f"No admin device accepted the notification ({len(results)} tried)")
+    return results
+
+def send_lesson_completion(payload):
+    return send_to_admins(
+        title="Lesson Completion Review Required",
+        message=f"{payload['completed_by_name']} has completed lesson: {payload['lesson_name']}",
+        data={
+            "lesson_id": payload["lesson_id"],
+            "lesson_code": payload["lesson_code"],
+            "completed_by_id": payload["completed_by_id"],
+            "notification_type": "lesson_completion"
+        }
     )
-    
-    for admin in admins:
-        send_push_notification(
-            fcm_token=admin.fcm_token,
-            title="Lesson Completion Review Required",
-            message=f"{completed_by.name} has completed lesson: {lesson.name}",
-            data={
-                "lesson_id": str(lesson.id),
-                "lesson_code": lesson.lesson_code,
-                "completed_by_id": str(completed_by.id),
-                "notification_type": "lesson_completion"
-            }
-        )
\ No newline at end of file
+
+# Lesson ids beyond this are left out of a digest's data to stay well under
+# FCM's 4KB data payload limit; the count still covers them.
+DIGEST_MAX_LESSON_IDS = 50
+
+def send_lesson_digest(payloads):
+    lesson_ids = list(dict.fromkeys(
+        lesson_id for payload in payloads for lesson_id in payload.get("lesson_ids", [payload.get("lesson_id")])
+    ))
+    count = len(lesson_ids)
+    return send_to_admins(
+        title="Lesson Completion Review Required",
+        message=f"{count} lesson{'s' if count != 1 else ''} awaiting review",
+        data={
+            "lesson_ids": json.dumps(lesson_ids[:DIGEST_MAX_LESSON_IDS]),
+            "count": str(count),
+            "notification_type": "lesson_completion_digest"
+        }
+    )
+
+def deliver_notifications(notifications):
+    """Send one group of outbox rows; raises if they should be retried."""
+    if notifications[0].kind == Notification.Kind.LESSON_DIGEST:
+        send_lesson_digest([notification.payload for notification in notifications])
+        return
+    for notification in notifications:
+        send_lesson_completion(notification.payload)
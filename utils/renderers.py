@@ -0,0 +1,27 @@
+import orjson
+from rest_framework.renderers import BaseRenderer
+from rest_framework.utils.encoders import JSONEncoder
+
+_fallback = JSONEncoder()
+
+
+class ORJSONRenderer(BaseRenderer):
+    """JSON renderer backed by orjson.
+
+    UUIDs and datetimes are serialized natively, in the same format as DRF's
+    JSONRenderer (UTC as ``Z``). Anything orjson doesn't know (Decimal, lazy
+    translation strings, querysets...) goes through DRF's encoder.
+    """
+    media_type = 'application/json'
+    format = 'json'
+    charset = None
+    options = orjson.OPT_UTC_Z | orjson.OPT_NON_STR_KEYS
+
+    def render(self, data, accepted_media_type=None, renderer_context=None):
+        if data is None:
+            return b''
+        return orjson.dumps(data, default=_fallback.default, option=self.options)
+
+
+def dumps(data):
+    return ORJSONRenderer().render(data)